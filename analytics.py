@@ -0,0 +1,210 @@
+"""
+Portfolio Analytics Aggregates for Siddhi Credit Scoring
+
+The dashboard endpoints (/kpi_summary, /loan_analytics, /risk_analytics and
+/portfolio_trends) all summarise the same beneficiaries table in different
+shapes. Instead of scanning the table once per query, this module reads it in
+a single pass into a small aggregate "cube" grouped by every dimension the
+dashboards use, then rolls the cube up into each endpoint's payload.
+"""
+
+import sqlite3
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Dimensions every dashboard breakdown is derived from
+CUBE_DIMENSIONS = ['grade', 'purpose', 'term', 'home_ownership', 'credit_range']
+
+# FICO buckets used by the risk analytics (upper bounds are exclusive)
+CREDIT_RANGES = [
+    (580, 'Poor (< 580)'),
+    (670, 'Fair (580-669)'),
+    (740, 'Good (670-739)'),
+    (800, 'Very Good (740-799)'),
+]
+CREDIT_RANGE_TOP = 'Excellent (800+)'
+
+
+def credit_range_sql(column: str = 'initial_fico_score') -> str:
+    """SQL CASE expression that buckets a FICO score into CREDIT_RANGES."""
+    cases = " ".join(f"WHEN {column} < {bound} THEN '{label}'" for bound, label in CREDIT_RANGES)
+    return f"CASE {cases} ELSE '{CREDIT_RANGE_TOP}' END"
+
+
+def load_aggregate_cube(conn: sqlite3.Connection, table_name: str) -> pd.DataFrame:
+    """
+    Scan the table once and return per-group partial aggregates.
+
+    Sums are kept next to non-null counts so averages can be rolled up
+    exactly the way SQLite's AVG() ignores NULLs.
+    """
+    query = f"""
+        SELECT grade, purpose, term, home_ownership,
+               {credit_range_sql()} AS credit_range,
+               COUNT(*) AS n,
+               SUM(loan_amnt) AS loan_sum,
+               COUNT(loan_amnt) AS loan_cnt,
+               MIN(loan_amnt) AS loan_min,
+               MAX(loan_amnt) AS loan_max,
+               SUM(initial_fico_score) AS fico_sum,
+               COUNT(initial_fico_score) AS fico_cnt,
+               MIN(initial_fico_score) AS fico_min,
+               SUM(is_defaulted) AS default_sum,
+               COUNT(is_defaulted) AS default_cnt,
+               SUM(is_defaulted = 1) AS default_flagged,
+               SUM(int_rate) AS int_rate_sum,
+               COUNT(int_rate) AS int_rate_cnt,
+               SUM(annual_inc) AS income_sum,
+               COUNT(annual_inc) AS income_cnt
+        FROM {table_name}
+        GROUP BY grade, purpose, term, home_ownership, credit_range
+    """
+    return pd.read_sql(query, conn)
+
+
+def _ratio(numerator: pd.Series, denominator: pd.Series, scale: float = 1.0) -> pd.Series:
+    """Divide two aggregate columns, yielding NaN where the denominator is zero."""
+    denominator = denominator.astype(float).replace(0, np.nan)
+    return numerator.astype(float) / denominator * scale
+
+
+def _rollup(cube: pd.DataFrame, key: str) -> pd.DataFrame:
+    """Collapse the cube to one row per value of `key` (NULL keys kept, like SQL GROUP BY)."""
+    return cube.groupby(key, dropna=False, sort=False).agg(
+        n=('n', 'sum'),
+        loan_sum=('loan_sum', 'sum'),
+        loan_cnt=('loan_cnt', 'sum'),
+        loan_min=('loan_min', 'min'),
+        loan_max=('loan_max', 'max'),
+        fico_sum=('fico_sum', 'sum'),
+        fico_cnt=('fico_cnt', 'sum'),
+        fico_min=('fico_min', 'min'),
+        default_sum=('default_sum', 'sum'),
+        default_cnt=('default_cnt', 'sum'),
+        int_rate_sum=('int_rate_sum', 'sum'),
+        int_rate_cnt=('int_rate_cnt', 'sum'),
+        income_sum=('income_sum', 'sum'),
+        income_cnt=('income_cnt', 'sum'),
+    ).reset_index()
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Convert a result frame to JSON-ready records (numpy scalars and NaN become Python values)."""
+    records = df.astype(object).where(df.notna(), None).to_dict('records')
+    return [
+        {key: value.item() if hasattr(value, 'item') else value for key, value in record.items()}
+        for record in records
+    ]
+
+
+def build_analytics_snapshot(cube: pd.DataFrame) -> Dict[str, Any]:
+    """Roll the aggregate cube up into every dashboard payload."""
+    total_beneficiaries = int(cube['n'].sum())
+    loan_sum = float(cube['loan_sum'].sum())
+    loan_cnt = int(cube['loan_cnt'].sum())
+    fico_cnt = int(cube['fico_cnt'].sum())
+    default_cnt = int(cube['default_cnt'].sum())
+    default_flagged = int(cube['default_flagged'].sum())
+
+    avg_credit = float(cube['fico_sum'].sum()) / fico_cnt if fico_cnt else None
+    avg_loan_amount = loan_sum / loan_cnt if loan_cnt else None
+    default_rate = (default_flagged / total_beneficiaries * 100) if total_beneficiaries > 0 else 0
+    avg_default_rate = float(cube['default_sum'].sum()) / default_cnt * 100 if default_cnt else None
+
+    by_grade = _rollup(cube, 'grade').sort_values('grade', na_position='first', kind='mergesort')
+    by_purpose = _rollup(cube, 'purpose').sort_values('n', ascending=False, kind='mergesort')
+    by_home = _rollup(cube, 'home_ownership')
+    by_term = _rollup(cube, 'term').sort_values('term', na_position='first', kind='mergesort')
+    by_credit = _rollup(cube, 'credit_range').sort_values('fico_min', na_position='first', kind='mergesort')
+
+    kpi_summary = {
+        "overview": {
+            "total_beneficiaries": total_beneficiaries,
+            "total_loan_amount": loan_sum,
+            "avg_loan_amount": float(avg_loan_amount or 0),
+            "avg_credit_score": float(avg_credit or 0),
+            "default_rate_percent": float(default_rate)
+        },
+        "distributions": {
+            "grade": _records(by_grade[['grade', 'n']].rename(columns={'n': 'count'})),
+            "purpose": _records(by_purpose[['purpose', 'n']].rename(columns={'n': 'count'}).head(5)),
+            "home_ownership": _records(
+                by_home[['home_ownership', 'n']].rename(columns={'n': 'count'})
+                .sort_values('count', ascending=False, kind='mergesort')
+            )
+        },
+        "risk_metrics": {
+            "total_defaults": default_flagged,
+            "default_rate": float(default_rate)
+        }
+    }
+
+    loan_analytics = {
+        "loan_by_grade": _records(pd.DataFrame({
+            "grade": by_grade['grade'],
+            "loan_count": by_grade['n'],
+            "avg_amount": _ratio(by_grade['loan_sum'], by_grade['loan_cnt']),
+            "total_amount": by_grade['loan_sum'],
+            "min_amount": by_grade['loan_min'],
+            "max_amount": by_grade['loan_max'],
+        })),
+        "purpose_analysis": _records(pd.DataFrame({
+            "purpose": by_purpose['purpose'],
+            "loan_count": by_purpose['n'],
+            "avg_amount": _ratio(by_purpose['loan_sum'], by_purpose['loan_cnt']),
+            "avg_credit": _ratio(by_purpose['fico_sum'], by_purpose['fico_cnt']),
+            "default_rate": _ratio(by_purpose['default_sum'], by_purpose['default_cnt'], 100),
+        }).head(10)),
+        "term_analysis": _records(pd.DataFrame({
+            "term": by_term['term'],
+            "loan_count": by_term['n'],
+            "avg_amount": _ratio(by_term['loan_sum'], by_term['loan_cnt']),
+            "avg_interest_rate": _ratio(by_term['int_rate_sum'], by_term['int_rate_cnt']),
+        }))
+    }
+
+    home_risk = pd.DataFrame({
+        "home_ownership": by_home['home_ownership'],
+        "total_loans": by_home['n'],
+        "default_rate": _ratio(by_home['default_sum'], by_home['default_cnt'], 100),
+        "avg_loan_amount": _ratio(by_home['loan_sum'], by_home['loan_cnt']),
+        "avg_income": _ratio(by_home['income_sum'], by_home['income_cnt']),
+    }).sort_values('default_rate', ascending=False, na_position='last', kind='mergesort')
+
+    risk_analytics = {
+        "default_by_grade": _records(pd.DataFrame({
+            "grade": by_grade['grade'],
+            "total_loans": by_grade['n'],
+            "defaults": by_grade['default_sum'],
+            "default_rate": _ratio(by_grade['default_sum'], by_grade['default_cnt'], 100),
+            "avg_credit": _ratio(by_grade['fico_sum'], by_grade['fico_cnt']),
+        })),
+        "credit_risk_analysis": _records(pd.DataFrame({
+            "credit_range": by_credit['credit_range'],
+            "loan_count": by_credit['n'],
+            "default_rate": _ratio(by_credit['default_sum'], by_credit['default_cnt'], 100),
+            "avg_loan_amount": _ratio(by_credit['loan_sum'], by_credit['loan_cnt']),
+        })),
+        "home_ownership_risk": _records(home_risk)
+    }
+
+    portfolio_base = {
+        "avg_credit_score": avg_credit,
+        "default_rate": avg_default_rate,
+        "total_loans": total_beneficiaries,
+        "avg_loan_amount": avg_loan_amount,
+        "grade_health": _records(pd.DataFrame({
+            "grade": by_grade['grade'],
+            "count": by_grade['n'],
+            "default_rate": _ratio(by_grade['default_sum'], by_grade['default_cnt'], 100),
+        }))
+    }
+
+    return {
+        "kpi_summary": kpi_summary,
+        "loan_analytics": loan_analytics,
+        "risk_analytics": risk_analytics,
+        "portfolio_base": portfolio_base,
+    }
@@ -0,0 +1,255 @@
+"""
+Columnar In-Memory Analytics for Siddhi Credit Scoring
+
+Holds the columns the dashboards read as NumPy arrays: the dimension columns
+are dictionary-encoded as small integer codes and the measures as float64
+with NaN for NULL. Group-by aggregates are then answered with vectorized
+bincount/reduceat over the codes instead of SQLite's row-at-a-time VM.
+
+ColumnarStore.aggregate_cube() returns the same frame as
+analytics.load_aggregate_cube(), so build_analytics_snapshot() can roll up
+either one.
+
+Ingestion also saves the store as a versioned snapshot: one .npy file per
+column plus a manifest holding the dictionaries, row count and generation.
+API workers np.load() it memory-mapped and read-only, so several workers
+share one page-cache copy of the data instead of each building their own.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from analytics import CREDIT_RANGES, CREDIT_RANGE_TOP
+
+# Dimensions stored as dictionary codes, and the measures aggregated over them
+DIMENSION_COLUMNS = ['grade', 'purpose', 'term', 'home_ownership']
+MEASURE_COLUMNS = ['loan_amnt', 'initial_fico_score', 'is_defaulted', 'int_rate', 'annual_inc']
+
+# Rows fetched from SQLite at a time while loading
+LOAD_CHUNK_SIZE = 100000
+
+# Snapshot layout: <directory>/manifest.json points at <directory>/<generation>/
+SNAPSHOT_FORMAT_VERSION = 1
+SNAPSHOT_MANIFEST = "manifest.json"
+
+# Aggregates produced per measure: (cube prefix, measure column)
+CUBE_MEASURES = [
+    ('loan', 'loan_amnt'),
+    ('fico', 'initial_fico_score'),
+    ('default', 'is_defaulted'),
+    ('int_rate', 'int_rate'),
+    ('income', 'annual_inc'),
+]
+
+
+def _dictionary_key(value):
+    """Dictionary key for a raw value; every flavour of NULL maps to None."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _code_dtype(size: int):
+    return np.int8 if size <= 127 else np.int16 if size <= 32767 else np.int32
+
+
+class ColumnarStore:
+    """Dictionary-encoded dimension codes plus float measure arrays."""
+
+    def __init__(self, columns: Dict[str, np.ndarray], dictionaries: Dict[str, List[Any]],
+                 row_count: int, generation: Optional[str] = None):
+        self.columns = columns
+        self.dictionaries = dictionaries
+        self.row_count = row_count
+        self.generation = generation
+
+    @classmethod
+    def from_sqlite(cls, conn: sqlite3.Connection, table_name: str,
+                    chunk_size: int = LOAD_CHUNK_SIZE) -> "ColumnarStore":
+        """Stream the dimension and measure columns out of SQLite into arrays."""
+        table_columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})").fetchall()]
+        missing = [col for col in DIMENSION_COLUMNS + MEASURE_COLUMNS if col not in table_columns]
+        if missing:
+            raise ValueError(f"Columns missing from {table_name}: {missing}")
+
+        lookups = {col: {} for col in DIMENSION_COLUMNS}
+        parts = {col: [] for col in DIMENSION_COLUMNS + MEASURE_COLUMNS}
+        row_count = 0
+
+        query = f"SELECT {', '.join(DIMENSION_COLUMNS + MEASURE_COLUMNS)} FROM {table_name}"
+        for chunk in pd.read_sql_query(query, conn, chunksize=chunk_size):
+            row_count += len(chunk)
+            for col in DIMENSION_COLUMNS:
+                # Factorize the chunk, then translate its uniques to global codes
+                codes, uniques = pd.factorize(chunk[col], use_na_sentinel=False)
+                lookup = lookups[col]
+                global_codes = np.array(
+                    [lookup.setdefault(_dictionary_key(value), len(lookup)) for value in uniques],
+                    dtype=np.int32
+                )
+                parts[col].append(global_codes[codes] if len(codes) else np.empty(0, dtype=np.int32))
+            for col in MEASURE_COLUMNS:
+                parts[col].append(pd.to_numeric(chunk[col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan))
+
+        columns = {}
+        dictionaries = {}
+        for col in DIMENSION_COLUMNS:
+            dictionaries[col] = list(lookups[col])
+            codes = np.concatenate(parts[col]) if parts[col] else np.empty(0, dtype=np.int32)
+            columns[col] = codes.astype(_code_dtype(len(dictionaries[col])))
+        for col in MEASURE_COLUMNS:
+            columns[col] = np.concatenate(parts[col]) if parts[col] else np.empty(0, dtype=np.float64)
+
+        return cls(columns, dictionaries, row_count)
+
+    def credit_range_codes(self) -> np.ndarray:
+        """
+        Bucket FICO scores into CREDIT_RANGES (code i is the i-th range, the
+        last code CREDIT_RANGE_TOP). NaN sorts past every bound, so NULL scores
+        land in the top bucket exactly like the SQL CASE expression.
+        """
+        bounds = np.array([bound for bound, _ in CREDIT_RANGES], dtype=np.float64)
+        return np.searchsorted(bounds, self.columns['initial_fico_score'], side='right')
+
+    def aggregate_cube(self) -> pd.DataFrame:
+        """
+        Per-group partial aggregates over every dashboard dimension, matching
+        analytics.load_aggregate_cube() column for column.
+        """
+        credit_labels = [label for _, label in CREDIT_RANGES] + [CREDIT_RANGE_TOP]
+        dimensions = [(col, self.columns[col], self.dictionaries[col]) for col in DIMENSION_COLUMNS]
+        dimensions.append(('credit_range', self.credit_range_codes(), credit_labels))
+
+        # Combine the per-dimension codes into one dense group code
+        sizes = [max(len(labels), 1) for _, _, labels in dimensions]
+        group_codes = np.ravel_multi_index(
+            [codes.astype(np.int64) for _, codes, _ in dimensions], sizes
+        ) if self.row_count else np.empty(0, dtype=np.int64)
+
+        # Only keep the groups that occur, renumbered densely
+        present, group_codes = np.unique(group_codes, return_inverse=True)
+        group_count = len(present)
+        n = np.bincount(group_codes, minlength=group_count)
+
+        # Sorted order and group boundaries for the min/max reductions
+        order = np.argsort(group_codes, kind='stable')
+        starts = np.concatenate(([0], np.cumsum(n)[:-1])) if group_count else np.empty(0, dtype=np.int64)
+
+        cube = {}
+        for (name, _, labels), dim_codes in zip(dimensions, np.unravel_index(present, sizes)):
+            cube[name] = [labels[code] for code in dim_codes]
+        cube['n'] = n
+
+        for prefix, col in CUBE_MEASURES:
+            values = self.columns[col]
+            valid = ~np.isnan(values)
+            count = np.bincount(group_codes, weights=valid, minlength=group_count)
+            total = np.bincount(group_codes, weights=np.where(valid, values, 0.0), minlength=group_count)
+            # SUM() over only NULLs is NULL in SQLite
+            cube[f'{prefix}_sum'] = np.where(count > 0, total, np.nan)
+            cube[f'{prefix}_cnt'] = count.astype(np.int64)
+
+            if prefix in ('loan', 'fico') and group_count:
+                sorted_values = values[order]
+                cube[f'{prefix}_min'] = np.fmin.reduceat(sorted_values, starts)
+                if prefix == 'loan':
+                    cube['loan_max'] = np.fmax.reduceat(sorted_values, starts)
+            elif prefix in ('loan', 'fico'):
+                cube[f'{prefix}_min'] = np.empty(0)
+                if prefix == 'loan':
+                    cube['loan_max'] = np.empty(0)
+
+            if prefix == 'default':
+                cube['default_flagged'] = np.bincount(
+                    group_codes, weights=(values == 1), minlength=group_count
+                ).astype(np.int64)
+
+        columns = ['grade', 'purpose', 'term', 'home_ownership', 'credit_range', 'n',
+                   'loan_sum', 'loan_cnt', 'loan_min', 'loan_max',
+                   'fico_sum', 'fico_cnt', 'fico_min',
+                   'default_sum', 'default_cnt', 'default_flagged',
+                   'int_rate_sum', 'int_rate_cnt', 'income_sum', 'income_cnt']
+        return pd.DataFrame(cube)[columns]
+
+    def memory_bytes(self) -> int:
+        return int(sum(array.nbytes for array in self.columns.values()))
+
+    def save_snapshot(self, directory: str, generation: str) -> str:
+        """
+        Write every column to <directory>/<generation>/<column>.npy, then
+        atomically point the top-level manifest at it. Readers never see a
+        half-written snapshot, and older versions are pruned (keeping the
+        previous one, which running workers may still have mapped).
+        """
+        version_dir = os.path.join(directory, str(generation))
+        os.makedirs(version_dir, exist_ok=True)
+
+        manifest = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "generation": str(generation),
+            "path": str(generation),
+            "row_count": self.row_count,
+            "columns": {},
+            "dictionaries": self.dictionaries,
+        }
+        for col, array in self.columns.items():
+            file_name = f"{col}.npy"
+            np.save(os.path.join(version_dir, file_name), np.ascontiguousarray(array))
+            manifest["columns"][col] = {"file": file_name, "dtype": str(array.dtype)}
+
+        with open(os.path.join(version_dir, SNAPSHOT_MANIFEST), "w") as f:
+            json.dump(manifest, f)
+        manifest_path = os.path.join(directory, SNAPSHOT_MANIFEST)
+        with open(manifest_path + ".tmp", "w") as f:
+            json.dump(manifest, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+        prune_snapshots(directory, keep=2)
+        return version_dir
+
+    @classmethod
+    def load_snapshot(cls, directory: str, mmap: bool = True) -> "ColumnarStore":
+        """Open the current snapshot, memory-mapping the column files read-only by default."""
+        manifest = read_snapshot_manifest(directory)
+        if manifest is None:
+            raise FileNotFoundError(f"No column snapshot found in {directory}")
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported column snapshot format: {manifest.get('format_version')}")
+
+        version_dir = os.path.join(directory, manifest["path"])
+        columns = {}
+        for col, info in manifest["columns"].items():
+            array = np.load(os.path.join(version_dir, info["file"]), mmap_mode='r' if mmap else None,
+                            allow_pickle=False)
+            if len(array) != manifest["row_count"]:
+                raise ValueError(f"Column snapshot file for '{col}' has {len(array)} rows, "
+                                 f"expected {manifest['row_count']}")
+            columns[col] = array
+
+        return cls(columns, manifest["dictionaries"], manifest["row_count"], generation=manifest["generation"])
+
+
+def read_snapshot_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    """The current snapshot manifest, or None if no snapshot has been written."""
+    try:
+        with open(os.path.join(directory, SNAPSHOT_MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def prune_snapshots(directory: str, keep: int = 2):
+    """Delete all but the newest `keep` snapshot versions."""
+    versions = sorted(
+        (entry for entry in os.scandir(directory) if entry.is_dir()),
+        key=lambda entry: entry.stat().st_mtime_ns, reverse=True
+    )
+    for entry in versions[keep:]:
+        # Mapped files can't be removed on every platform; try again next time
+        shutil.rmtree(entry.path, ignore_errors=True)
@@ -0,0 +1,185 @@
+"""
+Response Compression for Siddhi Credit Scoring
+
+ASGI middleware that compresses response bodies with brotli or gzip,
+whichever the client accepts (brotli preferred). Bodies smaller than
+COMPRESSION_MIN_SIZE are sent as is, since the framing costs more than it
+saves. Streamed responses (exports) are compressed chunk by chunk with each
+chunk flushed, so the stream stays incremental.
+
+Brotli needs the brotli package, which is optional; without it only gzip is
+offered.
+"""
+
+import gzip
+import zlib
+from typing import List, Optional
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Bodies below this many bytes are not compressed
+COMPRESSION_MIN_SIZE = 1024
+
+# Fast settings: JSON rows compress well even at low levels
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+# Content types worth compressing (Arrow IPC streams are uncompressed columns)
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/",
+                      "application/vnd.apache.arrow.stream")
+
+
+def supported_encodings() -> List[str]:
+    """Encodings this server can produce, most preferred first."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the best encoding the client accepts from an Accept-Encoding header,
+    honouring q=0 exclusions. Returns None for identity.
+    """
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+
+    for encoding in supported_encodings():
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+class _Compressor:
+    """Incremental compressor with the same interface for gzip and brotli."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits=31: zlib writes a gzip header and trailer
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it so the client can decode it right away."""
+        if self.encoding == "br":
+            return self.compressor.process(data) + self.compressor.flush()
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """Compress a complete body in one call."""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """Compresses eligible HTTP responses according to the request's Accept-Encoding."""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder)
+
+
+class _CompressionResponder:
+    """Wraps `send`, holding back the response start until the first body chunk decides."""
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = {name.lower(): value for name, value in message.get("headers", [])}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            # Leave alone anything already encoded, without a body, or not worth compressing
+            self.passthrough = (
+                b"content-encoding" in headers
+                or message["status"] in (204, 304)
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            # First body chunk: decide, then send the (possibly rewritten) start
+            start = self.start_message
+            self.start_message = None
+            if not more_body and len(body) < self.minimum_size:
+                await self.send(start)
+                await self.send(message)
+                self.passthrough = True
+                return
+
+            vary = [value for name, value in start.get("headers", []) if name.lower() == b"vary"]
+            headers = [(name, value) for name, value in start.get("headers", [])
+                       if name.lower() not in (b"content-length", b"vary")]
+            headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+            headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+
+            if not more_body:
+                body = compress_body(body, self.encoding)
+                headers.append((b"content-length", str(len(body)).encode("latin-1")))
+                await self.send({**start, "headers": headers})
+                await self.send({"type": "http.response.body", "body": body, "more_body": False})
+                return
+
+            self.compressor = _Compressor(self.encoding)
+            await self.send({**start, "headers": headers})
+
+        if more_body:
+            await self.send({"type": "http.response.body", "body": self.compressor.compress(body), "more_body": True})
+        else:
+            await self.send({"type": "http.response.body",
+                             "body": self.compressor.compress(body) + self.compressor.finish(),
+                             "more_body": False})
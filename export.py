@@ -0,0 +1,113 @@
+"""
+Streaming Exports for Siddhi Credit Scoring
+
+Encoders that turn batches of SQLite cursor rows into NDJSON, CSV or Arrow
+IPC stream bytes, one batch at a time, so a whole cohort can be streamed in a
+single response with bounded memory.
+
+Arrow output needs pyarrow, which is optional.
+"""
+
+import csv
+import io
+import json
+from typing import Dict, Iterable, Iterator, List
+
+try:
+    import orjson
+except ImportError:  # optional: NDJSON falls back to the json module
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: only needed for format=arrow
+    pa = None
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+def iter_ndjson(columns: List[str], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """One JSON object per line."""
+    for rows in batches:
+        if orjson is not None:
+            lines = [orjson.dumps(dict(zip(columns, row))) for row in rows]
+        else:
+            lines = [json.dumps(dict(zip(columns, row)), ensure_ascii=False).encode("utf-8") for row in rows]
+        lines.append(b"")
+        yield b"\n".join(lines)
+
+
+def iter_csv(columns: List[str], batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """A header row followed by the data; NULLs become empty fields."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def arrow_type(declared_type: str):
+    """Arrow type for a column's declared SQLite type (same rules as SQLite affinity)."""
+    declared_type = (declared_type or "").upper()
+    if "INT" in declared_type:
+        return pa.int64()
+    if any(name in declared_type for name in ("REAL", "FLOA", "DOUB")):
+        return pa.float64()
+    return pa.string()
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last take()."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_arrow(columns: List[str], declared_types: Dict[str, str],
+               batches: Iterable[List[tuple]]) -> Iterator[bytes]:
+    """An Arrow IPC stream with one record batch per cursor batch."""
+    schema = pa.schema([(col, arrow_type(declared_types.get(col))) for col in columns])
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        for rows in batches:
+            arrays = [
+                pa.array(values, type=field.type, from_pandas=True)
+                for values, field in zip(zip(*rows), schema)
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
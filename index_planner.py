@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Index Planner for Siddhi Credit Scoring
+
+Derives composite and covering indexes from the query shapes the API issues
+(filters, keyset sorts, dashboard aggregates and id lookups), creates them,
+refreshes the planner statistics with ANALYZE and reports how SQLite plans
+each shape with EXPLAIN QUERY PLAN.
+
+Run it directly to apply the planned indexes to an existing database and
+print the report:
+
+    python index_planner.py [path/to/siddhi_db.sqlite]
+"""
+
+import sqlite3
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+# Per-month columns returned by /beneficiary/{id}/timeline
+TIMELINE_COLUMNS = [
+    "principal_remaining",
+    "interest_paid_this_month",
+    "financial_state",
+    "consumption_stability_last_6m",
+    "missed_payments_last_3m",
+    "synthetic_payment_status",
+]
+
+# Query shapes issued by main.py. Each shape lists the columns it compares
+# with '=', the column it compares with a range (or sorts by), the columns it
+# groups by, and any other columns it reads (for covering indexes).
+# Keyset page shapes ("keyset": True) page through rows in (sort key, rowid)
+# order, so they need an index on exactly their equality columns and sort
+# key: SQLite appends rowid to every index, which then serves the tie-break
+# and the cursor predicate. A longer index with the same prefix does not.
+# Range-filtered pages are sorted by their range column (see
+# main.filter_sort_column), the others by rowid.
+WORKLOAD = [
+    {
+        "name": "filter_grade_purpose_default_fico",
+        "endpoint": "/filter_beneficiaries",
+        "equality": ["grade", "purpose", "is_defaulted"],
+        "range": "initial_fico_score",
+        "keyset": True,
+    },
+    {
+        "name": "filter_grade_fico",
+        "endpoint": "/filter_beneficiaries",
+        "equality": ["grade"],
+        "range": "initial_fico_score",
+        "keyset": True,
+    },
+    {
+        "name": "filter_purpose_default_fico",
+        "endpoint": "/filter_beneficiaries",
+        "equality": ["purpose", "is_defaulted"],
+        "range": "initial_fico_score",
+        "keyset": True,
+    },
+    {
+        "name": "filter_default_fico",
+        "endpoint": "/filter_beneficiaries",
+        "equality": ["is_defaulted"],
+        "range": "initial_fico_score",
+        "keyset": True,
+    },
+    {
+        "name": "filter_home_ownership_grade",
+        "endpoint": "/filter_beneficiaries",
+        "equality": ["home_ownership", "grade"],
+        "keyset": True,
+    },
+    {
+        "name": "page_grade_purpose_default",
+        "endpoint": "/filter_beneficiaries",
+        "equality": ["grade", "purpose", "is_defaulted"],
+        "keyset": True,
+    },
+    {
+        "name": "page_purpose_default",
+        "endpoint": "/filter_beneficiaries",
+        "equality": ["purpose", "is_defaulted"],
+        "keyset": True,
+    },
+    {
+        "name": "filter_loan_amount",
+        "endpoint": "/filter_beneficiaries",
+        "range": "loan_amnt",
+        "keyset": True,
+    },
+    {
+        "name": "sort_loan_amount",
+        "endpoint": "/beneficiaries",
+        "order": "loan_amnt",
+        "keyset": True,
+    },
+    {
+        "name": "sort_id",
+        "endpoint": "/beneficiaries",
+        "order": "id",
+        "keyset": True,
+    },
+    {
+        "name": "beneficiary_timeline",
+        "endpoint": "/beneficiary/{id}/timeline",
+        "equality": ["id"],
+        "order": "month_of_loan",
+        "covers": TIMELINE_COLUMNS,
+    },
+    {
+        "name": "dashboard_aggregates",
+        "endpoint": "/kpi_summary, /loan_analytics, /risk_analytics",
+        "group_by": ["grade", "purpose", "term", "home_ownership"],
+        "covers": ["initial_fico_score", "loan_amnt", "is_defaulted", "int_rate", "annual_inc"],
+    },
+]
+
+
+def keyset_clauses(sort_by: Optional[str], sort_order: str) -> Tuple[str, str]:
+    """
+    Return (cursor condition, ORDER BY clause) for a keyset page sorted by
+    `sort_by` (rowid when None). The condition takes the cursor's sort value
+    and rowid as parameters, or just the rowid when unsorted.
+    """
+    direction = "DESC" if sort_order == "desc" else "ASC"
+    comparison = "<" if sort_order == "desc" else ">"
+    if sort_by:
+        return f"({sort_by}, rowid) {comparison} (?, ?)", f" ORDER BY {sort_by} {direction}, rowid {direction}"
+    return f"rowid {comparison} ?", f" ORDER BY rowid {direction}"
+
+
+def index_columns_for(shape: Dict[str, Any]) -> List[str]:
+    """
+    Key columns for a shape: equality columns first, then the range or sort
+    column, then grouping columns, then any extra columns it reads so the
+    index covers the query.
+    """
+    columns = list(shape.get("equality", []))
+    for key in ("range", "order"):
+        if shape.get(key):
+            columns.append(shape[key])
+    columns += shape.get("group_by", [])
+    columns += shape.get("covers", [])
+
+    # Keep the first occurrence of each column
+    seen = set()
+    return [col for col in columns if not (col in seen or seen.add(col))]
+
+
+def plan_indexes(table_columns: List[str], existing: List[List[str]] = ()) -> List[Dict[str, Any]]:
+    """
+    Work out which indexes the workload needs.
+
+    An index is skipped when its columns are a prefix of an existing or
+    already planned index, because that index can serve the same lookups.
+    Keyset page indexes are only skipped when an index with exactly the same
+    columns exists, since the page order relies on the implicit rowid after
+    the last column.
+    """
+    candidates = []
+    for shape in WORKLOAD:
+        columns = index_columns_for(shape)
+        if columns and all(col in table_columns for col in columns):
+            candidates.append({"name": f"idx_plan_{shape['name']}", "columns": columns, "shape": shape["name"],
+                           "keyset": bool(shape.get("keyset"))})
+
+    # Longest first, so shorter prefixes are recognised as redundant
+    candidates.sort(key=lambda index: len(index["columns"]), reverse=True)
+    planned = []
+    for index in candidates:
+        covering = [list(cols) for cols in existing] + [other["columns"] for other in planned]
+        if index["keyset"]:
+            if any(cols == index["columns"] for cols in covering):
+                continue
+        elif any(cols[:len(index["columns"])] == index["columns"] for cols in covering):
+            continue
+        planned.append(index)
+    return planned
+
+
+def existing_index_columns(conn: sqlite3.Connection, table_name: str) -> List[List[str]]:
+    """Column lists of the indexes already defined on the table."""
+    indexes = []
+    for row in conn.execute(f"PRAGMA index_list({table_name})").fetchall():
+        index_name = row[1]
+        columns = [info[2] for info in conn.execute(f"PRAGMA index_info({index_name})").fetchall()]
+        indexes.append(columns)
+    return indexes
+
+
+def create_planned_indexes(conn: sqlite3.Connection, table_name: str) -> List[Dict[str, Any]]:
+    """Create the workload's composite/covering indexes and refresh planner statistics."""
+    table_columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})").fetchall()]
+    planned = plan_indexes(table_columns, existing_index_columns(conn, table_name))
+    for index in planned:
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {index['name']} ON {table_name} ({', '.join(index['columns'])})"
+        )
+    conn.execute("ANALYZE")
+    return planned
+
+
+def workload_sql(shape: Dict[str, Any], table_name: str) -> str:
+    """
+    Representative SQL for a shape, written the way main.py writes it. Paged
+    shapes are the continuation of a keyset page, with the same cursor
+    predicate and ORDER BY that main.fetch_keyset_page issues.
+    """
+    conditions = [f"{col} = ?" for col in shape.get("equality", [])]
+    if shape.get("range"):
+        conditions.append(f"{shape['range']} >= ? AND {shape['range']} <= ?")
+
+    if shape.get("group_by"):
+        aggregates = ", ".join(f"SUM({col})" for col in shape.get("covers", []))
+        group_columns = ", ".join(shape["group_by"])
+        sql = f"SELECT {group_columns}, COUNT(*), {aggregates} FROM {table_name}"
+        order_clause = f" GROUP BY {', '.join(shape['group_by'])}"
+    elif shape.get("covers"):
+        sql = f"SELECT {', '.join(index_columns_for(shape))} FROM {table_name}"
+        order_clause = f" ORDER BY {shape['order']}" if shape.get("order") else ""
+    else:
+        sort_by = shape.get("order") or shape.get("range")
+        keyset_condition, order_clause = keyset_clauses(sort_by, "asc")
+        hidden_columns = ["rowid AS _rowid"] + ([f"{sort_by} AS _sort_value"] if sort_by else [])
+        sql = f"SELECT {', '.join(hidden_columns)}, * FROM {table_name}"
+        conditions.append(keyset_condition)
+        order_clause += " LIMIT ? OFFSET ?"
+
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return sql + order_clause
+
+
+def explain_workload(conn: sqlite3.Connection, table_name: str) -> List[Dict[str, Any]]:
+    """
+    EXPLAIN QUERY PLAN for every workload shape, flagging full table scans
+    and sorts through a temporary B-tree (the index does not give the order).
+    """
+    table_columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})").fetchall()]
+    report = []
+    for shape in WORKLOAD:
+        sql = workload_sql(shape, table_name)
+        if not all(col in table_columns for col in index_columns_for(shape)):
+            report.append({"name": shape["name"], "endpoint": shape["endpoint"], "sql": sql,
+                           "plan": [], "full_scan": None, "temp_b_tree": None, "error": "columns not in table"})
+            continue
+
+        params = [None] * sql.count("?")
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+        full_scan = any(
+            detail.startswith(f"SCAN {table_name}") and "INDEX" not in detail
+            for detail in plan
+        )
+        temp_b_tree = any(detail.startswith("USE TEMP B-TREE") for detail in plan)
+        report.append({
+            "name": shape["name"],
+            "endpoint": shape["endpoint"],
+            "sql": sql,
+            "plan": plan,
+            "full_scan": full_scan,
+            "temp_b_tree": temp_b_tree,
+        })
+    return report
+
+
+def print_report(report: List[Dict[str, Any]]):
+    for entry in report:
+        if entry["full_scan"]:
+            status = "FULL SCAN"
+        elif entry["temp_b_tree"]:
+            status = "TEMP B-TREE SORT"
+        else:
+            status = "indexed"
+        print(f"\n[{status}] {entry['name']} ({entry['endpoint']})")
+        print(f"  {entry['sql']}")
+        for detail in entry["plan"]:
+            print(f"    -> {detail}")
+
+
+if __name__ == "__main__":
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "siddhi_db.sqlite"
+    conn = sqlite3.connect(db_path)
+    try:
+        created = create_planned_indexes(conn, "beneficiaries")
+        conn.commit()
+        print(f"Planned indexes: {[index['name'] for index in created]}")
+        print_report(explain_workload(conn, "beneficiaries"))
+    finally:
+        conn.close()
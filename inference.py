@@ -0,0 +1,271 @@
+"""
+Model Inference Pool for Siddhi Credit Scoring
+
+Runs the credit model in dedicated worker processes so scoring scales across
+cores instead of sharing the API process's GIL. Each worker loads the model
+through the model registry once when it starts, and the pool is warmed up at
+API startup so no request pays the load latency.
+
+Concurrent single predictions are merged into micro-batches (up to
+MICRO_BATCH_MAX_ROWS rows or MICRO_BATCH_MAX_WAIT seconds, whichever comes
+first) and scored with one model call.
+
+Explanations come in two kinds. The global importance ranking is computed
+once per model load, aligned with the model's training feature order. The
+per-application contributions are tree-path attributions computed for a whole
+batch in one vectorized pass.
+"""
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from model_registry import LoadedModel, load_model
+
+# Micro-batching window for concurrent /predict calls
+MICRO_BATCH_MAX_ROWS = 64
+MICRO_BATCH_MAX_WAIT = 0.002  # seconds
+
+# Rows per model call
+PREDICT_CHUNK_SIZE = 2000
+
+# Workers start from a clean interpreter rather than a fork of the threaded
+# API process, which could copy locks held by other threads at fork time
+WORKER_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# The model held by a worker process, loaded by _init_worker
+_worker_model = None
+
+
+def describe_model(loaded: LoadedModel) -> Dict[str, Any]:
+    """What the API process needs to know about a model it does not hold itself."""
+    model = loaded.model
+    importances = getattr(model, 'feature_importances_', None)
+    feature_names = loaded.feature_names or getattr(model, 'feature_names_in_', None)
+    feature_names = None if feature_names is None else [str(name) for name in feature_names]
+
+    # The global ranking never changes for a model, so sort it once here
+    feature_ranking = None
+    if importances is not None and feature_names is not None and len(importances) == len(feature_names):
+        order = np.argsort(importances, kind='stable')[::-1]
+        feature_ranking = [(feature_names[idx], float(importances[idx])) for idx in order]
+
+    return {
+        "model_type": type(model).__name__,
+        "feature_importances": None if importances is None else np.asarray(importances, dtype=float).tolist(),
+        "feature_names": feature_names,
+        "feature_ranking": feature_ranking,
+        "explanation_method": explanation_method(loaded),
+        **loaded.describe(),
+    }
+
+
+def explanation_method(loaded: LoadedModel):
+    if loaded.explainer is not None:
+        return "tree_path"
+    if hasattr(loaded.model, 'get_booster'):
+        return "xgboost_contribs"
+    return None
+
+
+def predict_probabilities(model, df: pd.DataFrame, chunk_size: int = PREDICT_CHUNK_SIZE) -> np.ndarray:
+    """
+    Score a feature frame, calling the model once per chunk of rows.
+    Returns the probability of default for every row.
+    """
+    probabilities = np.empty(len(df), dtype=float)
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        if hasattr(model, 'predict_proba'):
+            # Assuming binary classification: [prob_no_default, prob_default]
+            probabilities[start:start + len(chunk)] = model.predict_proba(chunk)[:, 1]
+        else:
+            probabilities[start:start + len(chunk)] = model.predict(chunk)
+    return probabilities
+
+
+def explain_probabilities(loaded: LoadedModel, df: pd.DataFrame, chunk_size: int = PREDICT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Score a feature frame and attribute every row's prediction to the
+    features. Tree-path contributions are in probability units and sum with
+    `bias` to the probability; XGBoost's are in log-odds units.
+    """
+    method = explanation_method(loaded)
+    if method is None:
+        raise ValueError(f"No per-application explanations for {type(loaded.model).__name__}")
+
+    probabilities = predict_probabilities(loaded.model, df, chunk_size)
+    if method == "tree_path":
+        feature_names = [str(name) for name in loaded.explainer.feature_names_in_]
+        parts = [loaded.explainer.contributions(df.iloc[start:start + chunk_size])
+                 for start in range(0, len(df), chunk_size)]
+        bias = parts[0][0] if parts else None
+        contributions = np.vstack([part[1] for part in parts]) if parts else np.empty((0, len(feature_names)))
+    else:
+        import xgboost
+        feature_names = loaded.feature_names or list(df.columns)
+        raw = loaded.model.get_booster().predict(xgboost.DMatrix(df[feature_names]), pred_contribs=True)
+        bias = float(raw[0, -1]) if len(raw) else None
+        contributions = raw[:, :-1]
+
+    return {
+        "method": method,
+        "probabilities": probabilities,
+        "feature_names": feature_names,
+        "bias": bias,
+        "contributions": contributions,
+    }
+
+
+def _init_worker(artifact_dir: str, pickle_path: str):
+    global _worker_model
+    _worker_model = load_model(artifact_dir, pickle_path)
+
+
+def _worker_describe() -> Dict[str, Any]:
+    return describe_model(_worker_model)
+
+
+def _worker_predict(df: pd.DataFrame) -> np.ndarray:
+    return predict_probabilities(_worker_model.model, df)
+
+
+def _worker_explain(df: pd.DataFrame) -> Dict[str, Any]:
+    return explain_probabilities(_worker_model, df)
+
+
+class InferencePool:
+    """A process pool whose workers each hold a preloaded copy of the model."""
+
+    def __init__(self, artifact_dir: str, pickle_path: str, workers: int):
+        self.artifact_dir = artifact_dir
+        self.pickle_path = pickle_path
+        self.workers = workers
+        self.executor = None
+        self.load_seconds = None
+
+    def start(self) -> Dict[str, Any]:
+        """
+        Start the workers and block until every one has loaded the model.
+        Returns the model description; raises if the workers cannot load it.
+        """
+        started = time.time()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context(WORKER_START_METHOD),
+            initializer=_init_worker, initargs=(self.artifact_dir, self.pickle_path)
+        )
+        # One concurrent task per worker makes the pool start all of them now
+        futures = [self.executor.submit(_worker_describe) for _ in range(self.workers)]
+        wait(futures)
+        info = futures[0].result()
+        self.load_seconds = time.time() - started
+        return info
+
+    def predict(self, df: pd.DataFrame, chunk_size: int = PREDICT_CHUNK_SIZE) -> np.ndarray:
+        """Score a frame, spreading its chunks across the workers."""
+        if len(df) <= chunk_size:
+            return self.executor.submit(_worker_predict, df).result()
+        futures = [
+            self.executor.submit(_worker_predict, df.iloc[start:start + chunk_size])
+            for start in range(0, len(df), chunk_size)
+        ]
+        return np.concatenate([future.result() for future in futures])
+
+    def explain(self, df: pd.DataFrame, chunk_size: int = PREDICT_CHUNK_SIZE) -> Dict[str, Any]:
+        """Score and explain a frame, spreading its chunks across the workers."""
+        futures = [
+            self.executor.submit(_worker_explain, df.iloc[start:start + chunk_size])
+            for start in range(0, len(df), chunk_size)
+        ]
+        parts = [future.result() for future in futures]
+        explained = dict(parts[0])
+        explained["probabilities"] = np.concatenate([part["probabilities"] for part in parts])
+        explained["contributions"] = np.vstack([part["contributions"] for part in parts])
+        return explained
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+
+class MicroBatcher:
+    """
+    Merges concurrent submissions into one call of `score(records)`, which runs
+    on `executor` and returns one probability per record.
+    """
+
+    def __init__(self, score: Callable[[List[Dict[str, Any]]], np.ndarray], executor: Executor,
+                 max_rows: int = MICRO_BATCH_MAX_ROWS, max_wait: float = MICRO_BATCH_MAX_WAIT):
+        self.score = score
+        self.executor = executor
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self.loop = None
+        self.queue = None
+        self.task = None
+        self.pending = set()
+
+    async def submit(self, records: List[Dict[str, Any]]) -> List[float]:
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.loop is not loop:
+            # (Re)start the collector on the running event loop
+            self.loop = loop
+            self.queue = asyncio.Queue()
+            self.task = loop.create_task(self._run())
+        future = loop.create_future()
+        await self.queue.put((records, future))
+        return await future
+
+    async def _collect(self) -> List[tuple]:
+        """Wait for one submission, then take more until the window closes or the batch is full."""
+        batch = [await self.queue.get()]
+        rows = len(batch[0][0])
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while rows < self.max_rows:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            records = [record for submitted, _ in batch for record in submitted]
+            # Score in the background so the next window can fill meanwhile
+            task = loop.create_task(self._score_batch(batch, records))
+            self.pending.add(task)
+            task.add_done_callback(self.pending.discard)
+
+    async def _score_batch(self, batch: List[tuple], records: List[Dict[str, Any]]):
+        try:
+            probabilities = await asyncio.get_running_loop().run_in_executor(self.executor, self.score, records)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for submitted, future in batch:
+            if not future.done():
+                future.set_result(probabilities[offset:offset + len(submitted)].tolist())
+            offset += len(submitted)
+
+    def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
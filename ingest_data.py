@@ -6,18 +6,67 @@ One-Time Data Ingestion Script for Siddhi Credit Scoring
 This script reads the superdataset_definitive.csv file and converts it
 into a SQLite database for fast querying by the web application.
 
-Run this script ONCE to set up your database.
+Run this script ONCE to set up your database. Later refreshes can use
+--incremental to apply only new or changed rows.
+
+The database is always built in a shadow file next to the live one and
+swapped in atomically, so the API never sees a half-built table.
 """
 
 import pandas as pd
-from sqlalchemy import create_engine
+import numpy as np
+import argparse
 import sqlite3
+import time
 import os
 
+from index_planner import create_planned_indexes, TIMELINE_COLUMNS
+from columnar import ColumnarStore
+
 # Define the path to the CSV file and the SQLite database
 CSV_FILE_PATH = r"D:\Datasets\NEW\superdataset_definitive.csv"
 DB_FILE_PATH = "siddhi_db.sqlite"
 TABLE_NAME = "beneficiaries"
+SHADOW_DB_FILE_PATH = DB_FILE_PATH + ".shadow"
+
+# Content hashes of every ingested row, used by incremental ingestion
+ROW_HASHES_TABLE = "ingest_row_hashes"
+KEY_COLUMNS = ["id", "month_of_loan"]
+
+# Ingestion metadata (generation stamp, mode, row counts)
+META_TABLE = "ingest_meta"
+
+# Memory-mapped column snapshot the API workers share (see columnar.py)
+COLUMN_SNAPSHOT_DIR = "siddhi_db_columns"
+
+# FTS5 index used by /search_beneficiaries
+SEARCH_TABLE_NAME = f"{TABLE_NAME}_fts"
+SEARCH_COLUMNS = ["purpose", "home_ownership", "grade"]
+
+# Rows read from the CSV (and written to SQLite) at a time
+CHUNK_SIZE = 50000
+
+# Values kept per numeric column to approximate its median in streaming mode
+MEDIAN_SAMPLE_SIZE = 100000
+
+# Page cache used while bulk loading (KiB)
+BULK_LOAD_CACHE_SIZE_KB = 512 * 1024
+
+# Indexes created after the data is loaded: (index name, columns).
+# idx_timeline is keyed on (id, month_of_loan) and carries the timeline
+# columns, so one beneficiary's history is a single contiguous index range
+# read without touching the table. idx_id is kept alongside it: SQLite keys
+# it on (id, rowid), which is the order /beneficiaries?sort_by=id pages in.
+INDEXES = [
+    ("idx_id", ["id"]),
+    ("idx_timeline", ["id", "month_of_loan"] + TIMELINE_COLUMNS),
+    ("idx_loan_amnt", ["loan_amnt"]),
+    ("idx_grade", ["grade"]),
+    ("idx_is_defaulted", ["is_defaulted"]),
+    ("idx_credit_score", ["initial_fico_score"]),
+    ("idx_purpose", ["purpose"]),
+    ("idx_home_ownership", ["home_ownership"]),
+]
 
 def validate_csv_file():
     """Check if the CSV file exists and is accessible."""
@@ -29,6 +78,325 @@ def validate_csv_file():
     print(f"File size: {file_size:.2f} MB")
     return True
 
+def clean_column_names(columns):
+    """Remove spaces and special characters from column names."""
+    return pd.Index(columns).str.strip().str.replace(' ', '_').str.replace('-', '_')
+
+def scan_csv_statistics():
+    """
+    First streaming pass over the CSV, one chunk at a time.
+
+    Works out a stable dtype for every column and the values used to fill
+    missing data: the median for numeric columns (exact for small columns,
+    otherwise estimated from a fixed-size reservoir sample) and 'Unknown'
+    for string columns. Memory use is bounded by CHUNK_SIZE and
+    MEDIAN_SAMPLE_SIZE, not by the file size.
+    """
+    print("Scanning CSV for column types and fill values...")
+    rng = np.random.default_rng(0)
+    kinds = {}          # column -> 'int', 'float' or 'string'
+    has_nulls = {}      # column -> True if any value is missing
+    samples = {}        # column -> reservoir of non-null numeric values
+    sample_sizes = {}   # column -> number of filled reservoir slots
+    seen = {}           # column -> non-null values seen so far
+    total_rows = 0
+
+    for chunk in pd.read_csv(CSV_FILE_PATH, chunksize=CHUNK_SIZE, low_memory=False):
+        total_rows += len(chunk)
+        for col in chunk.columns:
+            series = chunk[col]
+            if pd.api.types.is_bool_dtype(series):
+                kind = 'bool'
+            elif pd.api.types.is_integer_dtype(series):
+                kind = 'int'
+            elif pd.api.types.is_float_dtype(series):
+                kind = 'float'
+            else:
+                kind = 'string'
+
+            # A column is only numeric if it is numeric in every chunk
+            previous = kinds.get(col, kind)
+            if previous != kind:
+                if 'string' in (previous, kind) or 'bool' in (previous, kind):
+                    kind = 'string'
+                else:
+                    kind = 'float'
+            kinds[col] = kind
+            has_nulls[col] = has_nulls.get(col, False) or bool(series.isnull().any())
+
+            if kind in ('string', 'bool'):
+                samples.pop(col, None)
+                continue
+
+            values = series.dropna().to_numpy(dtype=float)
+            if col not in samples:
+                samples[col] = np.empty(MEDIAN_SAMPLE_SIZE)
+                sample_sizes[col] = 0
+                seen[col] = 0
+
+            # Fill free reservoir slots first, then replace slots at random (Algorithm R)
+            free = min(MEDIAN_SAMPLE_SIZE - sample_sizes[col], len(values))
+            samples[col][sample_sizes[col]:sample_sizes[col] + free] = values[:free]
+            sample_sizes[col] += free
+            rest = values[free:]
+            if len(rest):
+                positions = seen[col] + free + np.arange(1, len(rest) + 1)
+                keep = rng.random(len(rest)) < MEDIAN_SAMPLE_SIZE / positions
+                slots = rng.integers(0, MEDIAN_SAMPLE_SIZE, size=int(keep.sum()))
+                samples[col][slots] = rest[keep]
+            seen[col] += len(values)
+
+        print(f"Scanned {total_rows} rows...")
+
+    dtypes = {}
+    fill_values = {}
+    for col, kind in kinds.items():
+        if kind == 'bool':
+            # Leave boolean columns to pandas' own parsing, as the in-memory path does
+            continue
+        elif kind == 'string':
+            dtypes[col] = 'object'
+            if has_nulls[col]:
+                fill_values[col] = 'Unknown'
+        else:
+            # Integer columns with missing values are read as floats, as pandas would
+            dtypes[col] = 'int64' if kind == 'int' and not has_nulls[col] else 'float64'
+            if has_nulls[col] and sample_sizes[col] > 0:
+                fill_values[col] = float(np.median(samples[col][:sample_sizes[col]]))
+
+    print(f"Found {total_rows} rows and {len(kinds)} columns")
+    return dtypes, fill_values, total_rows
+
+def iter_clean_chunks(dtypes, fill_values):
+    """
+    Second streaming pass: yield cleaned chunks read with explicit dtypes.
+    """
+    for chunk in pd.read_csv(CSV_FILE_PATH, chunksize=CHUNK_SIZE, dtype=dtypes, low_memory=False):
+        chunk = chunk.fillna(fill_values)
+        chunk.columns = clean_column_names(chunk.columns)
+        yield chunk
+
+def sqlite_column_type(dtype):
+    """Map a pandas dtype to the SQLite column affinity declared for it."""
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+def open_bulk_load_connection(db_path):
+    """
+    Open a connection tuned for loading a brand new database file.
+
+    There is no rollback journal and no fsync: if the load fails the file is
+    simply rebuilt, so durability during the load buys nothing.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA locking_mode=EXCLUSIVE")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute(f"PRAGMA cache_size=-{BULK_LOAD_CACHE_SIZE_KB}")
+    # Lets SQLite sort with helper threads while building indexes
+    conn.execute(f"PRAGMA threads={os.cpu_count() or 1}")
+    return conn
+
+def create_table(conn, chunk):
+    """Create the table with every column's type affinity declared up front."""
+    column_defs = ", ".join(f'"{col}" {sqlite_column_type(dtype)}' for col, dtype in chunk.dtypes.items())
+    conn.execute(f"CREATE TABLE {TABLE_NAME} ({column_defs})")
+
+def bulk_insert(conn, chunk):
+    """Insert a chunk with executemany, passing plain Python values (NaN becomes NULL)."""
+    placeholders = ", ".join("?" for _ in chunk.columns)
+    rows = zip(*(chunk[col].tolist() for col in chunk.columns))
+    conn.executemany(f"INSERT INTO {TABLE_NAME} VALUES ({placeholders})", rows)
+
+def create_indexes(conn, columns):
+    """
+    Build all indexes once the data is in place, each on the longest prefix
+    of its columns present in the table.
+    """
+    for index_name, index_columns in INDEXES:
+        present = []
+        for column in index_columns:
+            if column not in columns:
+                break
+            present.append(column)
+        if present:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {TABLE_NAME} ({', '.join(present)})")
+
+def search_index_exists(conn):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE_NAME,)
+    ).fetchone()
+    return row is not None
+
+def create_search_index(conn, columns):
+    """
+    Build an FTS5 index over the searchable text columns.
+
+    The index uses the table itself as external content, so it stores only
+    the token index, and triggers keep it in sync when incremental ingestion
+    rewrites rows. The trigram tokenizer gives the same substring matching
+    as LIKE '%q%'; SQLite builds without it fall back to word matching.
+    """
+    search_columns = [col for col in SEARCH_COLUMNS if col in columns]
+    if not search_columns:
+        return
+    column_list = ", ".join(search_columns)
+    new_values = ", ".join(f"new.{col}" for col in search_columns)
+    old_values = ", ".join(f"old.{col}" for col in search_columns)
+
+    try:
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE {SEARCH_TABLE_NAME} USING fts5(
+                {column_list}, content='{TABLE_NAME}', content_rowid='rowid', tokenize='trigram'
+            )
+        """)
+    except sqlite3.OperationalError:
+        print("SQLite has no trigram tokenizer - building a word-based search index instead")
+        conn.execute(f"""
+            CREATE VIRTUAL TABLE {SEARCH_TABLE_NAME} USING fts5(
+                {column_list}, content='{TABLE_NAME}', content_rowid='rowid'
+            )
+        """)
+    conn.execute(f"INSERT INTO {SEARCH_TABLE_NAME}({SEARCH_TABLE_NAME}) VALUES ('rebuild')")
+
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE_NAME}_insert AFTER INSERT ON {TABLE_NAME} BEGIN
+            INSERT INTO {SEARCH_TABLE_NAME} (rowid, {column_list}) VALUES (new.rowid, {new_values});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE_NAME}_delete AFTER DELETE ON {TABLE_NAME} BEGIN
+            INSERT INTO {SEARCH_TABLE_NAME} ({SEARCH_TABLE_NAME}, rowid, {column_list})
+            VALUES ('delete', old.rowid, {old_values});
+        END
+    """)
+
+def row_hashes(chunk):
+    """Stable 64-bit content hash of every row in the chunk."""
+    return pd.util.hash_pandas_object(chunk, index=False).to_numpy().view(np.int64)
+
+def create_row_hashes_table(conn):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ROW_HASHES_TABLE} (
+            id INTEGER,
+            month_of_loan INTEGER,
+            row_hash INTEGER,
+            PRIMARY KEY (id, month_of_loan)
+        ) WITHOUT ROWID
+    """)
+
+def store_row_hashes(conn, chunk, hashes):
+    """Remember the content hash of each (id, month_of_loan) row."""
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {ROW_HASHES_TABLE} (id, month_of_loan, row_hash) VALUES (?, ?, ?)",
+        zip(chunk["id"].tolist(), chunk["month_of_loan"].tolist(), hashes.tolist())
+    )
+
+def upsert_changed_rows(conn, chunk):
+    """
+    Write only the rows of the chunk whose (id, month_of_loan) is new or whose
+    content hash changed since the last ingestion. Returns the number written.
+    """
+    hashes = row_hashes(chunk)
+    conn.execute("DELETE FROM temp.incoming_hashes")
+    conn.executemany(
+        "INSERT INTO temp.incoming_hashes (pos, id, month_of_loan, row_hash) VALUES (?, ?, ?, ?)",
+        zip(range(len(chunk)), chunk["id"].tolist(), chunk["month_of_loan"].tolist(), hashes.tolist())
+    )
+    changed = [pos for (pos,) in conn.execute(f"""
+        SELECT i.pos
+        FROM temp.incoming_hashes i
+        LEFT JOIN {ROW_HASHES_TABLE} h ON h.id = i.id AND h.month_of_loan = i.month_of_loan
+        WHERE h.row_hash IS NULL OR h.row_hash != i.row_hash
+        ORDER BY i.pos
+    """)]
+    if not changed:
+        return 0
+
+    changed_chunk = chunk.iloc[changed]
+    conn.executemany(
+        f"DELETE FROM {TABLE_NAME} WHERE id = ? AND month_of_loan = ?",
+        zip(changed_chunk["id"].tolist(), changed_chunk["month_of_loan"].tolist())
+    )
+    bulk_insert(conn, changed_chunk)
+    store_row_hashes(conn, changed_chunk, hashes[changed])
+    return len(changed)
+
+def write_ingest_meta(conn, mode, rows_written):
+    """Record a new generation stamp for this ingestion run."""
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {META_TABLE} (key TEXT PRIMARY KEY, value TEXT)")
+    conn.executemany(f"INSERT OR REPLACE INTO {META_TABLE} (key, value) VALUES (?, ?)", [
+        ("generation", str(time.time_ns())),
+        ("mode", mode),
+        ("rows_written", str(rows_written)),
+        ("completed_at", pd.Timestamp.now().isoformat()),
+    ])
+
+def write_column_snapshot(conn):
+    """
+    Save the analytics columns as a .npy snapshot stamped with this run's
+    generation. The database is already live at this point, so a failure only
+    means workers fall back to building the columns from SQLite.
+    """
+    try:
+        generation = conn.execute(f"SELECT value FROM {META_TABLE} WHERE key = 'generation'").fetchone()[0]
+        store = ColumnarStore.from_sqlite(conn, TABLE_NAME)
+        path = store.save_snapshot(COLUMN_SNAPSHOT_DIR, generation)
+        print(f"Column snapshot written to {path} ({store.memory_bytes() / 1024 / 1024:.1f} MiB)")
+    except Exception as e:
+        print(f"WARNING: Could not write column snapshot: {e}")
+
+def remove_shadow_database():
+    """Delete a leftover shadow database (and its journal files) from an earlier run."""
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        if os.path.exists(SHADOW_DB_FILE_PATH + suffix):
+            os.remove(SHADOW_DB_FILE_PATH + suffix)
+
+def copy_live_to_shadow():
+    """Copy the live database into the shadow file with SQLite's online backup API."""
+    source = sqlite3.connect(DB_FILE_PATH)
+    target = sqlite3.connect(SHADOW_DB_FILE_PATH)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+def swap_in_shadow():
+    """
+    Publish the finished shadow database as the live one.
+
+    When a live database exists it is overwritten in place with SQLite's
+    online backup API rather than renamed over: readers keep their snapshot
+    until the backup commits, and no stale WAL or shared-memory file is ever
+    paired with a different database file. The API sees the change through
+    PRAGMA data_version and reloads.
+    """
+    if not os.path.exists(DB_FILE_PATH):
+        os.replace(SHADOW_DB_FILE_PATH, DB_FILE_PATH)
+        return
+
+    source = sqlite3.connect(SHADOW_DB_FILE_PATH)
+    target = sqlite3.connect(DB_FILE_PATH, timeout=60)
+    try:
+        # One step: the whole copy is a single write transaction on the live file
+        source.backup(target)
+        # Fold the copy into the main file now if no reader still needs the old pages
+        busy, log_frames, checkpointed = target.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        if busy or log_frames != checkpointed:
+            # Safe to leave: the frames are committed, and readers still on the
+            # old snapshot read around them; a later checkpoint finishes the job
+            print(f"WARNING: WAL checkpoint incomplete ({checkpointed}/{log_frames} frames) - "
+                  f"it will finish once readers move on")
+    finally:
+        target.close()
+        source.close()
+    remove_shadow_database()
+
 def load_and_clean_data():
     """Load the CSV file and clean the data."""
     print("Loading CSV data into memory...")
@@ -44,7 +412,7 @@ def load_and_clean_data():
         print(f"Columns: {list(df.columns[:10])}...")  # Show first 10 columns
         
         # Clean column names (remove spaces, special characters)
-        df.columns = df.columns.str.strip().str.replace(' ', '_').str.replace('-', '_')
+        df.columns = clean_column_names(df.columns)
         
         # Handle missing values
         print("Handling missing values...")
@@ -68,10 +436,17 @@ def load_and_clean_data():
         print(f"Error loading CSV file: {e}")
         raise
 
-def ingest_data():
+def ingest_data(streaming=True, incremental=False):
     """
     Reads data from a CSV file, creates a SQLite database, and ingests the data into a table.
     Multiple indexes are created for faster queries.
+
+    In streaming mode (the default) the CSV is read in chunks, so memory use
+    stays flat regardless of file size. Pass streaming=False to load the
+    whole file into memory first.
+
+    With incremental=True the live database is copied and only rows whose
+    (id, month_of_loan) is new or whose content changed are rewritten.
     """
     print("=" * 60)
     print("Siddhi Credit Scoring - Data Ingestion Script")
@@ -81,72 +456,101 @@ def ingest_data():
         # Step 1: Validate CSV file
         validate_csv_file()
         
-        # Step 2: Load and clean data
-        df = load_and_clean_data()
+        # Step 2: Prepare cleaned chunks
+        if streaming:
+            dtypes, fill_values, total_rows = scan_csv_statistics()
+            chunks = iter_clean_chunks(dtypes, fill_values)
+            total_chunks = (total_rows + CHUNK_SIZE - 1) // CHUNK_SIZE
+        else:
+            df = load_and_clean_data()
+            total_rows = len(df)
+            chunks = (df[i:i + CHUNK_SIZE] for i in range(0, total_rows, CHUNK_SIZE))
+            total_chunks = (total_rows + CHUNK_SIZE - 1) // CHUNK_SIZE
+        
+        # Step 3: Start from a clean shadow database
+        if incremental and not os.path.exists(DB_FILE_PATH):
+            print("No existing database found - running a full ingestion instead")
+            incremental = False
+        remove_shadow_database()
+        if incremental:
+            print(f"Copying {DB_FILE_PATH} to {SHADOW_DB_FILE_PATH}...")
+            copy_live_to_shadow()
         
-        # Step 3: Remove existing database if it exists
-        if os.path.exists(DB_FILE_PATH):
-            os.remove(DB_FILE_PATH)
-            print("Removed existing database file")
+        # Step 4: Open a bulk-load connection
+        print(f"Connecting to shadow SQLite database at {SHADOW_DB_FILE_PATH}...")
+        conn = open_bulk_load_connection(SHADOW_DB_FILE_PATH)
         
-        # Step 4: Create database connection
-        engine = create_engine(f"sqlite:///{DB_FILE_PATH}")
-        print(f"Connecting to SQLite database at {DB_FILE_PATH}...")
+        if incremental:
+            existing_columns = [row[1] for row in conn.execute(f"PRAGMA table_info({TABLE_NAME})")]
+            # Upserts look rows up by (id, month_of_loan), so make sure the indexes exist first
+            create_indexes(conn, existing_columns)
+            conn.execute("""
+                CREATE TEMP TABLE incoming_hashes (
+                    pos INTEGER, id INTEGER, month_of_loan INTEGER, row_hash INTEGER
+                )
+            """)
 
-        # Step 5: Write DataFrame to SQLite database in chunks
+        # Step 5: Write all chunks inside a single transaction
         print(f"Writing data to the '{TABLE_NAME}' table in chunks...")
-        chunk_size = 50000  # Process in smaller chunks for large datasets
-        total_rows = len(df)
-        chunks = [df[i:i + chunk_size] for i in range(0, total_rows, chunk_size)]
-        
-        # Remove existing database first
-        engine.dispose()
+        load_started = time.time()
+        rows_read = 0
+        rows_written = 0
+        columns = []
+        conn.execute("BEGIN")
+        create_row_hashes_table(conn)
+        for i, chunk in enumerate(chunks, 1):
+            if i == 1:
+                columns = list(chunk.columns)
+                if not all(key in columns for key in KEY_COLUMNS):
+                    raise ValueError(f"CSV must contain the key columns {KEY_COLUMNS}")
+                if incremental and columns != existing_columns:
+                    raise ValueError("CSV columns differ from the existing table - run a full ingestion instead")
+                if not incremental:
+                    create_table(conn, chunk)
+            rows_read += len(chunk)
+            if incremental:
+                rows_written += upsert_changed_rows(conn, chunk)
+            else:
+                bulk_insert(conn, chunk)
+                store_row_hashes(conn, chunk, row_hashes(chunk))
+                rows_written += len(chunk)
+            elapsed = max(time.time() - load_started, 1e-9)
+            print(f"Chunk {i}/{total_chunks} processed ({len(chunk)} rows, {rows_read / elapsed:,.0f} rows/sec, "
+                  f"{rows_written} rows written so far)")
+        write_ingest_meta(conn, "incremental" if incremental else "full", rows_written)
+        conn.execute("COMMIT")
+        load_seconds = time.time() - load_started
+        print(f"Data written successfully: {rows_read} rows read, {rows_written} rows written in {load_seconds:.1f}s "
+              f"({rows_read / max(load_seconds, 1e-9):,.0f} rows/sec)")
+
+        # Step 6: Create indexes for faster lookups, after the data is loaded
+        print("Creating indexes for faster queries...")
+        index_started = time.time()
+        conn.execute("BEGIN")
+        create_indexes(conn, columns)
+        if not search_index_exists(conn):
+            print("Building full-text search index...")
+            create_search_index(conn, columns)
         
-        # Use direct SQLite connection for better performance
-        conn = sqlite3.connect(DB_FILE_PATH)
+        # Composite/covering indexes for the API's query shapes, then ANALYZE
+        planned = create_planned_indexes(conn, TABLE_NAME)
+        if planned:
+            print(f"Created workload indexes: {', '.join(index['name'] for index in planned)}")
+        conn.execute("COMMIT")
+        print(f"Indexes created in {time.time() - index_started:.1f}s")
         
-        # Write first chunk to create table
-        chunks[0].to_sql(TABLE_NAME, conn, if_exists='replace', index=False)
-        print(f"Chunk 1/{len(chunks)} written ({len(chunks[0])} rows)")
+        # Readers (the API) use WAL journaling from here on
+        conn.execute("PRAGMA locking_mode=NORMAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.close()
         
-        # Append remaining chunks
-        for i, chunk in enumerate(chunks[1:], 2):
-            chunk.to_sql(TABLE_NAME, conn, if_exists='append', index=False)
-            print(f"Chunk {i}/{len(chunks)} written ({len(chunk)} rows)")
+        # Step 7: Swap the finished database in
+        swap_in_shadow()
+        print(f"Swapped {SHADOW_DB_FILE_PATH} into {DB_FILE_PATH}")
         
-        conn.close()
-        print("Data written successfully.")
-
-        # Step 6: Create indexes for faster lookups
         with sqlite3.connect(DB_FILE_PATH) as conn:
             cursor = conn.cursor()
             
-            print("Creating indexes for faster queries...")
-            
-            # Primary index on id column
-            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_id ON {TABLE_NAME} (id)")
-            
-            # Additional useful indexes based on common query patterns
-            if 'loan_amnt' in df.columns:
-                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_loan_amnt ON {TABLE_NAME} (loan_amnt)")
-            
-            if 'grade' in df.columns:
-                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_grade ON {TABLE_NAME} (grade)")
-            
-            if 'is_defaulted' in df.columns:
-                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_is_defaulted ON {TABLE_NAME} (is_defaulted)")
-            
-            if 'initial_fico_score' in df.columns:
-                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_credit_score ON {TABLE_NAME} (initial_fico_score)")
-            
-            if 'purpose' in df.columns:
-                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_purpose ON {TABLE_NAME} (purpose)")
-            
-            if 'home_ownership' in df.columns:
-                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_home_ownership ON {TABLE_NAME} (home_ownership)")
-            
-            conn.commit()
-            
             # Verify the data was inserted correctly
             cursor.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}")
             row_count = cursor.fetchone()[0]
@@ -163,6 +567,9 @@ def ingest_data():
             print(f"Total columns: {len(columns)}")
             print("Indexes created successfully.")
             
+            # Step 8: Column snapshot for the API's in-memory analytics
+            write_column_snapshot(conn)
+            
         print("\n" + "=" * 60)
         print("SUCCESS: Data ingestion completed!")
         print("You can now start your FastAPI server with: python main.py")
@@ -176,4 +583,10 @@ def ingest_data():
         raise
 
 if __name__ == "__main__":
-    ingest_data()
+    parser = argparse.ArgumentParser(description="Ingest the Siddhi superdataset CSV into SQLite")
+    parser.add_argument("--in-memory", action="store_true",
+                        help="Load the whole CSV into memory instead of streaming it in chunks")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only apply new or changed (id, month_of_loan) rows to the existing database")
+    args = parser.parse_args()
+    ingest_data(streaming=not args.in_memory, incremental=args.incremental)
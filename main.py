@@ -7,63 +7,646 @@ This backend provides API endpoints for the Siddhi web application
 to interact with the SQLite database containing beneficiary data.
 """
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, text
+from fastapi.responses import Response, StreamingResponse
 import pandas as pd
 from typing import Optional, List, Dict, Any
 import sqlite3
+import threading
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import time
 import os
-import pickle
+import json
+import base64
+import hashlib
+from collections import OrderedDict
 import numpy as np
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+try:
+    import orjson
+except ImportError:  # optional: FastJSONResponse falls back to the json module
+    orjson = None
+
+from analytics import load_aggregate_cube, build_analytics_snapshot
+from columnar import ColumnarStore, read_snapshot_manifest
+from index_planner import explain_workload, keyset_clauses, TIMELINE_COLUMNS
+import export
+import inference
+import model_registry
+import risk_sweep
+from compression import CompressionMiddleware
 
 # Define the path to the SQLite database
 DB_FILE_PATH = "siddhi_db.sqlite"
 TABLE_NAME = "beneficiaries"
 
-# Define the path to the AI model
-MODEL_PATH = r"D:\Datasets\NEW\credit_model.pkl"
+# Define the path to the AI model. The versioned artifact exported by
+# model_registry.py is preferred; the pickle file is only a fallback.
+MODEL_PATH = os.environ.get("MODEL_PATH", r"D:\Datasets\NEW\credit_model.pkl")
+MODEL_ARTIFACT_DIR = os.environ.get("MODEL_ARTIFACT_DIR", os.path.splitext(MODEL_PATH)[0] + "_artifact")
 
-# Global variable to store the loaded model
+# Global variable to store the loaded model (a model_registry.LoadedModel,
+# only set when scoring in this process)
 loaded_model = None
 
-def load_ai_model():
-    """Load the AI model from pickle file"""
-    global loaded_model
-    if loaded_model is None:
+# Type, feature importances and feature names of the loaded model
+model_info = None
+_model_lock = threading.Lock()
+
+# After a failed load, requests wait this long before trying again, so a
+# broken model doesn't start (and tear down) inference workers per request
+MODEL_LOAD_RETRY_SECONDS = 60.0
+model_load_error = None
+model_load_failed_at = None
+
+# Model inference runs in this many worker processes, each holding its own
+# preloaded copy of the model (0 scores in the API process instead)
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", min(4, os.cpu_count() or 1)))
+inference_pool = None
+
+# Categorical columns the model expects to be label encoded
+CATEGORICAL_COLUMNS = [
+    'grade', 'sub_grade', 'home_ownership', 'verification_status',
+    'purpose', 'application_type', 'financial_state'
+]
+
+# Batch scoring limits
+MAX_BATCH_SIZE = 10000
+MAX_SENSITIVITY_STEPS = 101  # values per varied feature
+PREDICT_CHUNK_SIZE = 2000
+
+# Categorical encoding tables are stored next to the model file
+ENCODERS_PATH = os.path.splitext(MODEL_PATH)[0] + "_encoders.json"
+
+# Global variable to store the loaded encoding tables
+category_encoders = None
+
+class CategoryEncoder:
+    """
+    Precompiled label encoding for one categorical column.
+
+    Codes follow LabelEncoder semantics (index into the sorted distinct values
+    seen in training data). Values that were never seen map to a fallback code.
+    """
+
+    def __init__(self, classes: List[str], fallback: int = 0):
+        self.classes = list(classes)
+        self.fallback = fallback
+        self.lookup = {value: code for code, value in enumerate(self.classes)}
+
+    def encode_value(self, value) -> int:
+        """Encode a single value in O(1)."""
+        return self.lookup.get(str(value), self.fallback)
+
+    def encode(self, values: pd.Series) -> np.ndarray:
+        """Encode a column of values in one vectorized hash lookup."""
+        codes = pd.Categorical(values.astype(str), categories=self.classes).codes.astype(np.int64)
+        codes[codes < 0] = self.fallback
+        return codes
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"classes": self.classes, "fallback": self.fallback}
+
+def build_category_encoders() -> Dict[str, CategoryEncoder]:
+    """
+    Build encoding tables from the distinct values in the beneficiaries table.
+    Unseen categories fall back to the most frequent value of the column.
+    """
+    encoders = {}
+    conn = get_db_connection()
+    table_columns = set(get_table_columns())
+
+    for col in CATEGORICAL_COLUMNS:
+        if col not in table_columns:
+            print(f"WARNING: Categorical column '{col}' not found in {TABLE_NAME}")
+            continue
+
+        cursor = conn.execute(f"SELECT {col}, COUNT(*) FROM {TABLE_NAME} WHERE {col} IS NOT NULL GROUP BY {col}")
+        value_counts = {}
+        for value, count in cursor.fetchall():
+            value_counts[str(value)] = value_counts.get(str(value), 0) + count
+
+        classes = sorted(value_counts)
+        most_frequent = max(value_counts, key=value_counts.get) if value_counts else None
+        fallback = classes.index(most_frequent) if most_frequent is not None else 0
+        encoders[col] = CategoryEncoder(classes, fallback)
+
+    return encoders
+
+def load_category_encoders():
+    """
+    Load the categorical encoding tables, building and saving them from the
+    database the first time.
+    """
+    global category_encoders
+    if category_encoders is None:
         try:
-            if not os.path.exists(MODEL_PATH):
-                print(f"WARNING: Model file not found at {MODEL_PATH}")
+            # A model artifact carries the encoders it was trained with
+            manifest = model_registry.read_artifact_manifest(MODEL_ARTIFACT_DIR)
+            if manifest is not None and manifest.get("encoders"):
+                category_encoders = {
+                    col: CategoryEncoder(table["classes"], table["fallback"])
+                    for col, table in manifest["encoders"].items()
+                }
+                print(f"✅ Categorical encoders loaded from model artifact {manifest['version']}")
+                return category_encoders
+
+            if os.path.exists(ENCODERS_PATH):
+                with open(ENCODERS_PATH, 'r') as f:
+                    artifact = json.load(f)
+                category_encoders = {
+                    col: CategoryEncoder(table["classes"], table["fallback"])
+                    for col, table in artifact["columns"].items()
+                }
+                print(f"✅ Categorical encoders loaded from {ENCODERS_PATH}")
+                return category_encoders
+
+            if not os.path.exists(DB_FILE_PATH):
+                print(f"WARNING: Encoders not found at {ENCODERS_PATH} and no database to build them from")
                 return None
-            
-            with open(MODEL_PATH, 'rb') as f:
-                loaded_model = pickle.load(f)
-            print("✅ AI Model loaded successfully!")
-            return loaded_model
+
+            category_encoders = build_category_encoders()
+            try:
+                with open(ENCODERS_PATH, 'w') as f:
+                    json.dump({
+                        "version": 1,
+                        "columns": {col: encoder.to_dict() for col, encoder in category_encoders.items()}
+                    }, f, indent=2)
+                print(f"✅ Categorical encoders built from database and saved to {ENCODERS_PATH}")
+            except OSError as e:
+                print(f"WARNING: Could not save encoders to {ENCODERS_PATH}: {str(e)}")
+            return category_encoders
         except Exception as e:
-            print(f"❌ Error loading model: {str(e)}")
+            print(f"❌ Error loading categorical encoders: {str(e)}")
             return None
-    return loaded_model
+    return category_encoders
+
+def load_ai_model():
+    """
+    Load the AI model together with its categorical encoders and return its
+    description. With INFERENCE_WORKERS > 0 the model is loaded by the
+    inference worker processes and only its description is kept here.
+    """
+    global loaded_model, model_info, inference_pool, model_load_error, model_load_failed_at
+    with _model_lock:
+        if model_info is None:
+            if model_load_failed_at is not None and time.time() - model_load_failed_at < MODEL_LOAD_RETRY_SECONDS:
+                return None
+            try:
+                if not model_registry.model_available(MODEL_ARTIFACT_DIR, MODEL_PATH):
+                    print(f"WARNING: No model artifact in {MODEL_ARTIFACT_DIR} and no model file at {MODEL_PATH}")
+                    return None
+                
+                started = time.time()
+                if INFERENCE_WORKERS > 0:
+                    pool = inference.InferencePool(MODEL_ARTIFACT_DIR, MODEL_PATH, INFERENCE_WORKERS)
+                    try:
+                        info = pool.start()
+                    except Exception:
+                        pool.shutdown()
+                        raise
+                    inference_pool = pool
+                    print(f"✅ AI Model loaded in {INFERENCE_WORKERS} inference workers in {time.time() - started:.2f}s")
+                else:
+                    loaded_model = model_registry.load_model(MODEL_ARTIFACT_DIR, MODEL_PATH)
+                    info = inference.describe_model(loaded_model)
+                if info["feature_ranking"] is None and info["feature_importances"] is not None:
+                    # No recorded feature names: the model was trained on the API's input order
+                    feature_names = list(LoanApplicationInput.model_fields)
+                    importances = info["feature_importances"]
+                    if len(importances) == len(feature_names):
+                        order = np.argsort(importances, kind='stable')[::-1]
+                        info["feature_ranking"] = [(feature_names[idx], float(importances[idx])) for idx in order]
+                print(f"✅ Model {info['version']} ({info['format']}) loaded in {info['load_seconds'] * 1000:.1f} ms, "
+                      f"warm-up {(info['warmup_seconds'] or 0) * 1000:.1f} ms")
+                model_info = info
+                model_load_error = None
+                model_load_failed_at = None
+                # Cached predictions belong to the previous model
+                prediction_cache.clear()
+                load_category_encoders()
+                return model_info
+            except Exception as e:
+                print(f"❌ Error loading model: {str(e)} (retrying in {MODEL_LOAD_RETRY_SECONDS:.0f}s)")
+                model_load_error = str(e)
+                model_load_failed_at = time.time()
+                return None
+        return model_info
+
+def model_load_status() -> Optional[Dict[str, Any]]:
+    """The last model load failure, if the model is still not loaded."""
+    if model_info is not None or model_load_failed_at is None:
+        return None
+    return {
+        "error": model_load_error,
+        "failed_at": pd.Timestamp(model_load_failed_at, unit='s').isoformat(),
+        "retry_in_seconds": round(max(0.0, model_load_failed_at + MODEL_LOAD_RETRY_SECONDS - time.time()), 1)
+    }
+
+# SQLite connection settings shared by every endpoint
+SQLITE_CACHE_SIZE_KB = 64 * 1024           # page cache per connection
+SQLITE_MMAP_SIZE = 512 * 1024 * 1024       # memory-map the database file
+SQLITE_CACHED_STATEMENTS = 256             # prepared statements kept per connection
+
+# Per-thread connection pool: each worker thread keeps one open connection.
+# Bumping the pool epoch makes every thread reopen on its next request.
+_db_local = threading.local()
+_db_connections = []
+_db_connections_lock = threading.Lock()
+_db_pool_epoch = 0
+_wal_enabled = False
+
+def enable_wal_mode():
+    """Switch the database to WAL journaling once so readers never block each other."""
+    global _wal_enabled
+    with _db_connections_lock:
+        if _wal_enabled:
+            return
+        try:
+            conn = sqlite3.connect(f"file:{DB_FILE_PATH}?mode=rw", uri=True)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+            finally:
+                conn.close()
+            _wal_enabled = True
+        except sqlite3.OperationalError as e:
+            print(f"WARNING: Could not enable WAL mode: {str(e)}")
+
+def open_db_connection() -> sqlite3.Connection:
+    """
+    Open a tuned, read-only connection to the existing database file.
+    enable_wal_mode() switches the journal mode on its own writable connection.
+    """
+    conn = sqlite3.connect(
+        f"file:{DB_FILE_PATH}?mode=ro",
+        uri=True,
+        check_same_thread=False,
+        cached_statements=SQLITE_CACHED_STATEMENTS
+    )
+    conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA query_only=ON")
+    return conn
+
+def get_db_connection() -> sqlite3.Connection:
+    """
+    Return the calling thread's pooled connection, opening it on first use.
+    Statements with identical SQL text are reused from the connection's cache.
+    """
+    conn = getattr(_db_local, "conn", None)
+    if conn is not None and _db_local.epoch != _db_pool_epoch:
+        # The pool was invalidated: this thread drops its stale connection
+        with _db_connections_lock:
+            if conn in _db_connections:
+                _db_connections.remove(conn)
+        conn.close()
+        conn = None
+    if conn is None:
+        enable_wal_mode()
+        conn = open_db_connection()
+        _db_local.conn = conn
+        _db_local.epoch = _db_pool_epoch
+        with _db_connections_lock:
+            _db_connections.append(conn)
+    return conn
+
+def invalidate_db_connections():
+    """Make every thread reopen its connection on its next request (e.g. after the file was replaced)."""
+    global _db_pool_epoch, _wal_enabled
+    with _db_connections_lock:
+        _db_pool_epoch += 1
+        _wal_enabled = False
+    reset_table_columns()
+
+def close_db_connections():
+    """Close every pooled connection (used on shutdown)."""
+    global _db_pool_epoch
+    with _db_connections_lock:
+        for conn in _db_connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _db_connections.clear()
+        _db_pool_epoch += 1
+    reset_table_columns()
+
+# Column names of the beneficiaries table, read once per connection pool
+_table_columns = None
+
+def reset_table_columns():
+    """Forget the cached column list (the schema may have changed)."""
+    global _table_columns
+    _table_columns = None
+
+def get_table_columns() -> List[str]:
+    """Return the column names of the beneficiaries table."""
+    global _table_columns
+    if _table_columns is None:
+        cursor = get_db_connection().execute(f"PRAGMA table_info({TABLE_NAME})")
+        _table_columns = [row[1] for row in cursor.fetchall()]
+    return _table_columns
+
+# How often requests re-check the database file for changes (seconds)
+DB_STATE_CHECK_INTERVAL = 1.0
+
+class DatabaseState:
+    """
+    In-process readiness state for the database.
+
+    The row count is computed once and only recomputed when the database file
+    is replaced (inode/mtime/size change) or another connection commits
+    (PRAGMA data_version change). Every detected change bumps `generation`,
+    which caches elsewhere use for invalidation. `ingest_generation` is the
+    stamp ingestion wrote into the file, the same in every API process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ready = False
+        self.error = "Database state not checked yet."
+        self.row_count = 0
+        self.generation = 0
+        self.ingest_generation = None
+        self.file_signature = None
+        self.data_version = None
+        self.refreshed_at = None
+        self.checked_at = 0.0
+        self._conn = None
+
+    def _close_connection(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+            self._conn = None
+
+    def _mark_unavailable(self, error: str):
+        if self.ready or self.error != error:
+            self.generation += 1
+        self.ready = False
+        self.error = error
+        self.row_count = 0
+        self.ingest_generation = None
+        self.file_signature = None
+        self.data_version = None
+        self._close_connection()
+        invalidate_db_connections()
+
+    def refresh(self, force: bool = False):
+        """Re-check the database, recounting rows only if it changed."""
+        with self.lock:
+            now = time.time()
+            if not force and now - self.checked_at < DB_STATE_CHECK_INTERVAL:
+                return self
+            self.checked_at = now
+
+            if not os.path.exists(DB_FILE_PATH):
+                self._mark_unavailable("Database not found. Please run ingest_data.py first to create the database.")
+                return self
+
+            stat = os.stat(DB_FILE_PATH)
+            file_signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            file_replaced = self.file_signature is not None and file_signature[0] != self.file_signature[0]
+
+            try:
+                if file_replaced:
+                    # The file was swapped out: drop every connection to the old one
+                    self._close_connection()
+                    invalidate_db_connections()
+                if self._conn is None:
+                    self._conn = sqlite3.connect(f"file:{DB_FILE_PATH}?mode=ro", uri=True, check_same_thread=False)
+                data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+                if (not force and self.ready and file_signature == self.file_signature
+                        and data_version == self.data_version):
+                    return self
+
+                row_count = self._conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}").fetchone()[0]
+                ingest_generation = read_ingest_generation(self._conn)
+            except sqlite3.OperationalError:
+                self._mark_unavailable(f"Table '{TABLE_NAME}' not found. Please run ingest_data.py first.")
+                return self
+
+            self.file_signature = file_signature
+            self.data_version = data_version
+            self.row_count = row_count
+            self.ingest_generation = ingest_generation
+            self.refreshed_at = now
+            self.generation += 1
+            self.ready = row_count > 0
+            self.error = None if self.ready else "Database is empty. Please run ingest_data.py first."
+            reset_table_columns()
+            return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "total_records": self.row_count,
+            "generation": self.generation,
+            "count_refreshed_at": pd.Timestamp(self.refreshed_at, unit='s').isoformat() if self.refreshed_at else None,
+            "count_age_seconds": round(time.time() - self.refreshed_at, 3) if self.refreshed_at else None
+        }
+
+db_state = DatabaseState()
+
+# Engine behind the dashboard aggregates: "sqlite" runs one GROUP BY in
+# SQLite, "columnar" keeps the columns in memory as NumPy arrays
+ANALYTICS_ENGINE = os.environ.get("ANALYTICS_ENGINE", "sqlite").lower()
+
+# Memory-mapped column snapshot written by ingest_data.py, and the table
+# holding the generation stamp of the ingestion run that produced the database
+COLUMN_SNAPSHOT_DIR = "siddhi_db_columns"
+INGEST_META_TABLE = "ingest_meta"
+
+def read_ingest_generation(conn: sqlite3.Connection) -> Optional[str]:
+    """Generation stamp recorded by the last ingestion run, if any."""
+    try:
+        row = conn.execute(f"SELECT value FROM {INGEST_META_TABLE} WHERE key = 'generation'").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+def load_columnar_store() -> ColumnarStore:
+    """
+    Memory-map the ingestion snapshot when it was written for the current
+    database, otherwise build the arrays from SQLite.
+    """
+    conn = get_db_connection()
+    ingest_generation = read_ingest_generation(conn)
+    manifest = read_snapshot_manifest(COLUMN_SNAPSHOT_DIR)
+    if ingest_generation and manifest and manifest.get("generation") == ingest_generation:
+        try:
+            store = ColumnarStore.load_snapshot(COLUMN_SNAPSHOT_DIR)
+            # Ingestion may have published a newer snapshot in the meantime
+            if store.generation == ingest_generation:
+                return store
+        except (OSError, ValueError) as e:
+            print(f"WARNING: Could not load column snapshot: {str(e)}")
+    return ColumnarStore.from_sqlite(conn, TABLE_NAME)
+
+class AnalyticsCache:
+    """
+    Dashboard aggregates computed in one pass over the table and reused until
+    the database generation changes (i.e. until ingestion rewrites the data).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generation = None
+        self.snapshot = None
+        self.built_at = None
+        self.build_seconds = None
+
+    def load_cube(self) -> pd.DataFrame:
+        if ANALYTICS_ENGINE != "columnar":
+            return load_aggregate_cube(get_db_connection(), TABLE_NAME)
+
+        # Only the small cube is kept; the store (and any memory-mapped
+        # column files) is released once it has been aggregated
+        return load_columnar_store().aggregate_cube()
+
+    def get(self) -> Dict[str, Any]:
+        generation = db_state.generation
+        snapshot = self.snapshot
+        if snapshot is not None and self.generation == generation:
+            return snapshot
 
-# Create a connection to the SQLite database
-engine = create_engine(f"sqlite:///{DB_FILE_PATH}")
+        with self.lock:
+            # Another request may have rebuilt it while we waited
+            if self.snapshot is not None and self.generation == generation:
+                return self.snapshot
 
-# Helper function to convert numpy types to native Python types
-def convert_numpy_types(obj):
+            started = time.time()
+            cube = self.load_cube()
+            self.snapshot = build_analytics_snapshot(cube)
+            self.generation = generation
+            self.built_at = time.time()
+            self.build_seconds = self.built_at - started
+            return self.snapshot
+
+analytics_cache = AnalyticsCache()
+
+def _json_safe(obj):
     """
-    Recursively convert numpy types to native Python types for JSON serialization.
+    Prepare content for the json module fallback the way orjson encodes it:
+    numpy scalars and arrays become native values and NaN/Infinity become null.
     """
     if isinstance(obj, dict):
-        return {key: convert_numpy_types(value) for key, value in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_numpy_types(item) for item in obj]
-    elif hasattr(obj, 'item'):  # numpy scalar
-        return obj.item()
-    elif hasattr(obj, 'tolist'):  # numpy array
-        return obj.tolist()
-    else:
-        return obj
+        return {key: _json_safe(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_json_safe(item) for item in obj]
+    if isinstance(obj, np.ndarray):
+        return _json_safe(obj.tolist())
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, float) and not np.isfinite(obj):
+        return None
+    return obj
+
+class FastJSONResponse(Response):
+    """
+    JSON response rendered straight to bytes. Routes return it directly so
+    FastAPI skips its jsonable_encoder walk; orjson is used when installed.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        return json.dumps(_json_safe(content), allow_nan=False, ensure_ascii=False,
+                          separators=(",", ":")).encode("utf-8")
+
+# Row layouts for list endpoints: a list of objects, or column names plus row arrays
+ROW_LAYOUT_PATTERN = "^(records|columns)$"
+
+def rows_payload(columns: List[str], rows: List[tuple], layout: str = "records"):
+    """Shape cursor rows for the response without going through pandas."""
+    if layout == "columns":
+        return {"columns": columns, "rows": rows}
+    return [dict(zip(columns, row)) for row in rows]
+
+# Read-only responses carry an ETag and are revalidated on every use; the
+# rendered bodies are kept in memory until the database changes
+HTTP_CACHE_CONTROL = "no-cache"
+RESPONSE_CACHE_SIZE = 1024
+_process_started = int(time.time())
+
+class ResponseCache:
+    """
+    Rendered JSON bodies of read-only endpoints, reused until the database
+    generation changes, plus ETag / If-None-Match handling.
+
+    The ETag comes from the ingestion generation stamp, so every API process
+    serving the same database file hands out the same tag.
+    """
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_SIZE):
+        self.lock = threading.Lock()
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def etag(self) -> str:
+        stamp = db_state.ingest_generation or f"{_process_started}-{db_state.generation}"
+        return f'W/"{stamp}"'
+
+    @staticmethod
+    def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        # Weak comparison: W/"x" and "x" are the same tag
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    def respond(self, key: tuple, if_none_match: Optional[str], build) -> Response:
+        """
+        The memoized body (calling `build()` for a JSON response on a miss),
+        or 304 if the client's copy is current. The body is resolved first so
+        errors raised by `build()`, such as a 404, are never masked by a 304.
+        """
+        etag = self.etag()
+        headers = {"ETag": etag, "Cache-Control": HTTP_CACHE_CONTROL}
+        cache_key = (db_state.generation,) + key
+        with self.lock:
+            body = self.entries.get(cache_key)
+            if body is not None:
+                self.entries.move_to_end(cache_key)
+                self.hits += 1
+        if body is None:
+            response = build()
+            if not isinstance(response, Response):
+                response = FastJSONResponse(response)
+            body = response.body
+            with self.lock:
+                self.misses += 1
+                self.entries[cache_key] = body
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+
+        if self.etag_matches(if_none_match, etag):
+            with self.lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified
+        }
+
+response_cache = ResponseCache()
 
 # Pydantic models for request/response validation
 class BeneficiaryFilter(BaseModel):
@@ -124,6 +707,25 @@ class PredictionResponse(BaseModel):
     top_factors: List[Dict[str, Any]]
     risk_level: str
 
+class BatchPredictionInput(BaseModel):
+    """Input model for batch AI prediction"""
+    applications: List[LoanApplicationInput] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+    include_factors: bool = True
+    explain: str = Field("global", pattern="^(global|contributions)$")
+
+class SensitivityRange(BaseModel):
+    """A numeric feature to vary: explicit values, or `steps` evenly spaced values from min to max"""
+    feature: str
+    values: Optional[List[float]] = Field(None, min_length=1, max_length=MAX_SENSITIVITY_STEPS)
+    min: Optional[float] = None
+    max: Optional[float] = None
+    steps: int = Field(11, ge=2, le=MAX_SENSITIVITY_STEPS)
+
+class SensitivityInput(BaseModel):
+    """Input model for what-if analysis: one base application and one or two features to vary"""
+    application: LoanApplicationInput
+    ranges: List[SensitivityRange] = Field(..., min_length=1, max_length=2)
+
 app = FastAPI(
     title="Siddhi Credit Scoring API",
     description="API for accessing beneficiary loan data and analytics",
@@ -145,31 +747,115 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def check_database():
-    """Check if database exists and has data"""
-    if not os.path.exists(DB_FILE_PATH):
-        raise HTTPException(
-            status_code=500, 
-            detail=f"Database not found. Please run ingest_data.py first to create the database."
-        )
+# gzip/brotli for response bodies above compression.COMPRESSION_MIN_SIZE
+app.add_middleware(CompressionMiddleware)
+
+# Handlers are async and hand their blocking work to one of these bounded
+# executors, so slow analytics or model calls queue behind each other instead
+# of starving cheap lookups. Each executor thread keeps its pooled connection.
+LIGHT_DB_WORKERS = 16    # single-row lookups, pages, searches
+HEAVY_DB_WORKERS = 4     # aggregates and full-table work
+MODEL_WORKERS = max(2, INFERENCE_WORKERS)  # feature encoding and model calls
+
+class HandlerExecutor:
+    """
+    A bounded thread pool that can be started again after a shutdown, so the
+    app survives more than one lifespan in a process (test clients, reloads).
+    The pool itself is created by start(), or on first use.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def start(self) -> ThreadPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                   thread_name_prefix=self.thread_name_prefix)
+            return self.executor
+
+    def submit(self, fn, *args, **kwargs):
+        return self.start().submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+light_db_executor = HandlerExecutor(LIGHT_DB_WORKERS, "db-light")
+heavy_db_executor = HandlerExecutor(HEAVY_DB_WORKERS, "db-heavy")
+model_executor = HandlerExecutor(MODEL_WORKERS, "model")
+
+def run_in(executor: HandlerExecutor):
+    """
+    Turn a blocking handler into an async one that runs on `executor`.
+    functools.wraps keeps the original signature for FastAPI's parameter parsing.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+        return wrapper
+    return decorator
+
+@app.on_event("shutdown")
+def shutdown_database_pool():
+    """
+    Stop the executors, the inference workers and pooled SQLite connections
+    when the server stops. The model state is cleared with them, so the next
+    startup (or get_model_or_503) loads it again.
+    """
+    global prediction_batcher, inference_pool, loaded_model, model_info, model_load_error, model_load_failed_at
+    if prediction_batcher is not None:
+        prediction_batcher.close()
+        prediction_batcher = None
+    for executor in (light_db_executor, heavy_db_executor, model_executor):
+        executor.shutdown(wait=True, cancel_futures=True)
+    with _model_lock:
+        if inference_pool is not None:
+            inference_pool.shutdown()
+        inference_pool = None
+        loaded_model = None
+        model_info = None
+        model_load_error = None
+        model_load_failed_at = None
+    close_db_connections()
+
+@app.on_event("startup")
+def startup_database_state():
+    """Compute database readiness and row count once at startup."""
+    for executor in (light_db_executor, heavy_db_executor, model_executor):
+        executor.start()
+    if os.path.exists(DB_FILE_PATH):
+        enable_wal_mode()
+    db_state.refresh(force=True)
+    if db_state.ready:
+        print(f"✅ Database ready with {db_state.row_count} rows")
+        try:
+            analytics_cache.get()
+            print(f"✅ Analytics aggregates computed in {analytics_cache.build_seconds:.2f}s ({ANALYTICS_ENGINE} engine)")
+        except Exception as e:
+            print(f"WARNING: Could not precompute analytics aggregates: {str(e)}")
+    else:
+        print(f"WARNING: {db_state.error}")
     
-    try:
-        with sqlite3.connect(DB_FILE_PATH) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}")
-            count = cursor.fetchone()[0]
-            if count == 0:
-                raise HTTPException(
-                    status_code=500,
-                    detail="Database is empty. Please run ingest_data.py first."
-                )
-    except sqlite3.OperationalError:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Table '{TABLE_NAME}' not found. Please run ingest_data.py first."
-        )
+    # Preload the model so the first prediction doesn't pay the load latency
+    load_ai_model()
+
+def check_database():
+    """Check if database exists and has data, using the cached readiness state"""
+    state = db_state.refresh()
+    if not state.ready:
+        raise HTTPException(status_code=500, detail=state.error)
+    return state
 
 @app.get("/")
+@run_in(light_db_executor)
 def read_root():
     """Root endpoint with API information"""
     check_database()
@@ -189,265 +875,541 @@ def read_root():
         ]
     }
 
+# Keyset pagination: rows are ordered by (sort column, rowid) so each page
+# continues from the last row of the previous one instead of using OFFSET.
+# rowid is the tie-breaker because id repeats once per month_of_loan.
+def encode_page_cursor(sort_by: Optional[str], sort_order: str, sort_value, rowid: int) -> str:
+    """Encode the last row of a page as an opaque cursor token."""
+    payload = json.dumps({"s": sort_by, "o": sort_order, "v": sort_value, "r": rowid}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_page_cursor(cursor: str, sort_by: Optional[str], sort_order: str) -> tuple:
+    """Decode a cursor token into (sort_value, rowid), checking it matches the requested ordering."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort_value, rowid = payload["v"], int(payload["r"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    
+    if payload.get("s") != sort_by or payload.get("o") != sort_order:
+        raise HTTPException(status_code=400, detail="Pagination cursor does not match sort_by/sort_order")
+    return sort_value, rowid
+
+def build_keyset_clauses(sort_by: Optional[str], sort_order: str, cursor: Optional[str]) -> tuple:
+    """
+    Return (keyset condition or None, condition params, ORDER BY clause).
+    Ingestion fills missing values, so sort columns contain no NULLs.
+    The clauses come from index_planner, so /index_report explains these exact queries.
+    """
+    keyset_condition, order_clause = keyset_clauses(sort_by, sort_order)
+    if not cursor:
+        return None, [], order_clause
+    
+    sort_value, rowid = decode_page_cursor(cursor, sort_by, sort_order)
+    if sort_by:
+        return keyset_condition, [sort_value, rowid], order_clause
+    return keyset_condition, [rowid], order_clause
+
+FIELDS_DESCRIPTION = "Comma-separated columns to return (default: all)"
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Validate a fields= projection against the table's columns; None means every column."""
+    if not fields:
+        return None
+    table_columns = get_table_columns()
+    selected = []
+    for field in fields.split(","):
+        field = field.strip()
+        if not field or field in selected:
+            continue
+        # Validate column exists (basic SQL injection protection)
+        if field not in table_columns:
+            raise HTTPException(status_code=400, detail=f"Invalid field: {field}")
+        selected.append(field)
+    return selected or None
+
+def select_list(fields: Optional[List[str]], table_alias: Optional[str] = None) -> str:
+    """SELECT list for a projection, so only the requested columns are read."""
+    prefix = f"{table_alias}." if table_alias else ""
+    if not fields:
+        return f"{prefix}*"
+    return ", ".join(f"{prefix}{field}" for field in fields)
+
+def fetch_keyset_page(where_conditions: List[str], params: List[Any], sort_by: Optional[str],
+                      sort_order: str, page: int, page_size: int, cursor: Optional[str],
+                      fields: Optional[List[str]] = None) -> tuple:
+    """
+    Fetch one page of rows, continuing from `cursor` when given and falling
+    back to OFFSET paging from `page` otherwise. Only `fields` are selected
+    when given. Returns (columns, rows, next_cursor, has_next).
+    """
+    keyset_condition, keyset_params, order_clause = build_keyset_clauses(sort_by, sort_order, cursor)
+    conditions = where_conditions + ([keyset_condition] if keyset_condition else [])
+    
+    # The cursor needs the rowid and sort value even when they aren't projected
+    hidden_columns = ["rowid AS _rowid"] + ([f"{sort_by} AS _sort_value"] if sort_by else [])
+    query = f"SELECT {', '.join(hidden_columns)}, {select_list(fields)} FROM {TABLE_NAME}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += order_clause
+    
+    # Fetch one extra row to learn whether another page exists
+    query += " LIMIT ? OFFSET ?"
+    offset = 0 if cursor else (page - 1) * page_size
+    db_cursor = get_db_connection().execute(query, params + keyset_params + [page_size + 1, offset])
+    rows = db_cursor.fetchall()
+    
+    # Drop the leading cursor columns, keeping them only for the next cursor
+    hidden = len(hidden_columns)
+    columns = [column[0] for column in db_cursor.description][hidden:]
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    
+    next_cursor = None
+    if has_next:
+        last_row = rows[-1]
+        sort_value = last_row[1] if sort_by else None
+        next_cursor = encode_page_cursor(sort_by, sort_order, sort_value, last_row[0])
+    
+    return columns, [row[hidden:] for row in rows], next_cursor, has_next
+
+def build_filter_conditions(filters: BeneficiaryFilter) -> tuple:
+    """Translate a BeneficiaryFilter into WHERE conditions and bound params."""
+    where_conditions = []
+    params = []
+    
+    if filters.grade:
+        where_conditions.append("grade = ?")
+        params.append(filters.grade)
+    
+    if filters.loan_amnt_min is not None:
+        where_conditions.append("loan_amnt >= ?")
+        params.append(filters.loan_amnt_min)
+    
+    if filters.loan_amnt_max is not None:
+        where_conditions.append("loan_amnt <= ?")
+        params.append(filters.loan_amnt_max)
+    
+    if filters.credit_score_min is not None:
+        where_conditions.append("initial_fico_score >= ?")
+        params.append(filters.credit_score_min)
+    
+    if filters.credit_score_max is not None:
+        where_conditions.append("initial_fico_score <= ?")
+        params.append(filters.credit_score_max)
+    
+    if filters.purpose:
+        where_conditions.append("purpose = ?")
+        params.append(filters.purpose)
+    
+    if filters.home_ownership:
+        where_conditions.append("home_ownership = ?")
+        params.append(filters.home_ownership)
+    
+    if filters.is_defaulted is not None:
+        where_conditions.append("is_defaulted = ?")
+        params.append(filters.is_defaulted)
+    
+    return where_conditions, params
+
+def filter_sort_column(filters: BeneficiaryFilter) -> Optional[str]:
+    """
+    Keyset order for filtered pages. With a range filter the pages follow the
+    range column, so the planned (equality..., range) index returns them
+    already sorted; otherwise they follow rowid.
+    """
+    if filters.credit_score_min is not None or filters.credit_score_max is not None:
+        return "initial_fico_score"
+    if filters.loan_amnt_min is not None or filters.loan_amnt_max is not None:
+        return "loan_amnt"
+    return None
+
+# Filtered row counts, cached per database generation
+FILTER_COUNT_CACHE_SIZE = 256
+_filter_count_cache = OrderedDict()
+_filter_count_lock = threading.Lock()
+
+def count_filtered_rows(where_conditions: List[str], params: List[Any]) -> int:
+    """Count rows matching the filter, reusing the count until the database changes."""
+    if not where_conditions:
+        return db_state.row_count
+    
+    key = (db_state.generation, tuple(where_conditions), tuple(params))
+    with _filter_count_lock:
+        if key in _filter_count_cache:
+            _filter_count_cache.move_to_end(key)
+            return _filter_count_cache[key]
+    
+    count_query = f"SELECT COUNT(*) FROM {TABLE_NAME} WHERE " + " AND ".join(where_conditions)
+    total_count = get_db_connection().execute(count_query, params).fetchone()[0]
+    
+    with _filter_count_lock:
+        _filter_count_cache[key] = total_count
+        while len(_filter_count_cache) > FILTER_COUNT_CACHE_SIZE:
+            _filter_count_cache.popitem(last=False)
+    return total_count
+
 @app.get("/beneficiaries")
+@run_in(light_db_executor)
 def get_beneficiaries(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(100, ge=1, le=1000, description="Items per page"),
     sort_by: Optional[str] = Query(None, description="Column to sort by"),
-    sort_order: str = Query("asc", pattern="^(asc|desc)$", description="Sort order")
+    sort_order: str = Query("asc", pattern="^(asc|desc)$", description="Sort order"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page (overrides page)"),
+    include_total: bool = Query(True, description="Include total item and page counts"),
+    layout: str = Query("records", pattern=ROW_LAYOUT_PATTERN, description="Row layout: records or columns"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """
     Retrieves a paginated list of beneficiaries from the database with sorting support.
+    Pass the returned next_cursor to fetch the following page. Unsorted pages
+    and columns with a (column, rowid) index are index range reads; other
+    columns are sorted by SQLite for each page.
     """
     check_database()
     
     try:
-        offset = (page - 1) * page_size
-        
-        # Build the query with optional sorting
-        query = f"SELECT * FROM {TABLE_NAME}"
-        
         if sort_by:
             # Validate sort column exists (basic SQL injection protection)
-            with sqlite3.connect(DB_FILE_PATH) as conn:
-                cursor = conn.cursor()
-                cursor.execute(f"PRAGMA table_info({TABLE_NAME})")
-                columns = [row[1] for row in cursor.fetchall()]
-                
-                if sort_by not in columns:
-                    raise HTTPException(status_code=400, detail=f"Invalid sort column: {sort_by}")
-                
-                query += f" ORDER BY {sort_by} {sort_order.upper()}"
+            if sort_by not in get_table_columns():
+                raise HTTPException(status_code=400, detail=f"Invalid sort column: {sort_by}")
         
-        query += f" LIMIT {page_size} OFFSET {offset}"
+        columns, rows, next_cursor, has_next = fetch_keyset_page([], [], sort_by, sort_order, page, page_size, cursor,
+                                                                 parse_fields(fields))
         
-        df = pd.read_sql(query, engine)
-        
-        # Get total count for pagination
-        count_query = f"SELECT COUNT(*) as total FROM {TABLE_NAME}"
-        total_count = pd.read_sql(count_query, engine)['total'][0]
-        
-        # Convert DataFrame to records and handle numpy types
-        data_records = df.to_dict(orient="records")
-        data_records = convert_numpy_types(data_records)
-        
-        return {
-            "data": data_records,
-            "pagination": {
-                "page": page,
-                "page_size": page_size,
-                "total_items": int(total_count),
-                "total_pages": (total_count + page_size - 1) // page_size,
-                "has_next": (page * page_size) < total_count,
-                "has_prev": page > 1
-            }
+        pagination = {
+            "page": page,
+            "page_size": page_size,
+            "has_next": has_next,
+            "has_prev": bool(cursor) or page > 1,
+            "next_cursor": next_cursor
         }
+        if include_total:
+            # Total count for pagination comes from the cached database state
+            total_count = db_state.row_count
+            pagination["total_items"] = int(total_count)
+            pagination["total_pages"] = (total_count + page_size - 1) // page_size
+        
+        return FastJSONResponse({
+            "data": rows_payload(columns, rows, layout),
+            "pagination": pagination
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/beneficiary/{beneficiary_id}")
-def get_beneficiary(beneficiary_id: int):
+@run_in(light_db_executor)
+def get_beneficiary(beneficiary_id: int, if_none_match: Optional[str] = Header(None)):
     """
     Retrieves a single beneficiary by their ID with enhanced error handling.
     """
     check_database()
     
-    try:
+    def build():
         # Use parameterized query to prevent SQL injection
         query = f"SELECT * FROM {TABLE_NAME} WHERE id = ?"
         
-        with sqlite3.connect(DB_FILE_PATH) as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, (beneficiary_id,))
-            row = cursor.fetchone()
-            
-            if not row:
-                raise HTTPException(status_code=404, detail=f"Beneficiary with ID {beneficiary_id} not found")
-            
-            # Get column names
-            cursor.execute(f"PRAGMA table_info({TABLE_NAME})")
-            columns = [column[1] for column in cursor.fetchall()]
-            
-            # Convert row to dictionary
-            beneficiary_data = dict(zip(columns, row))
-            
-            return beneficiary_data
+        cursor = get_db_connection().execute(query, (beneficiary_id,))
+        row = cursor.fetchone()
+        
+        if not row:
+            raise HTTPException(status_code=404, detail=f"Beneficiary with ID {beneficiary_id} not found")
+        
+        # Get column names from the cursor instead of another PRAGMA round trip
+        columns = [column[0] for column in cursor.description]
+        
+        # Convert row to dictionary
+        return dict(zip(columns, row))
+    
+    try:
+        return response_cache.respond(("beneficiary", beneficiary_id), if_none_match, build)
             
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+@app.get("/beneficiary/{beneficiary_id}/timeline")
+@run_in(light_db_executor)
+def get_beneficiary_timeline(beneficiary_id: int):
+    """
+    Retrieves a beneficiary's full monthly history as column arrays, ordered
+    by month_of_loan. The columns are carried by the (id, month_of_loan)
+    covering index, so the history is one contiguous index range read.
+    """
+    check_database()
+    
+    try:
+        table_columns = get_table_columns()
+        if 'month_of_loan' not in table_columns:
+            raise HTTPException(status_code=500, detail="Table has no month_of_loan column")
+        columns = ['month_of_loan'] + [col for col in TIMELINE_COLUMNS if col in table_columns]
+        
+        query = f"""
+            SELECT {', '.join(columns)} FROM {TABLE_NAME}
+            WHERE id = ?
+            ORDER BY month_of_loan
+        """
+        rows = get_db_connection().execute(query, (beneficiary_id,)).fetchall()
+        
+        if not rows:
+            raise HTTPException(status_code=404, detail=f"Beneficiary with ID {beneficiary_id} not found")
+        
+        return {
+            "id": beneficiary_id,
+            "months": len(rows),
+            "columns": {col: list(values) for col, values in zip(columns, zip(*rows))}
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
 @app.get("/kpi_summary")
-def get_kpi_summary():
+@run_in(heavy_db_executor)
+def get_kpi_summary(if_none_match: Optional[str] = Header(None)):
     """
     Retrieves comprehensive Key Performance Indicators (KPIs) from the database.
     """
     check_database()
     
     try:
-        with sqlite3.connect(DB_FILE_PATH) as conn:
-            # Total beneficiaries
-            total_beneficiaries = pd.read_sql(f"SELECT COUNT(*) as count FROM {TABLE_NAME}", conn)['count'][0]
-            
-            # Average credit score
-            avg_credit = pd.read_sql(f"SELECT AVG(initial_fico_score) as avg_credit FROM {TABLE_NAME}", conn)['avg_credit'][0]
-            
-            # Total loan amount
-            total_loan_amount = pd.read_sql(f"SELECT SUM(loan_amnt) as total FROM {TABLE_NAME}", conn)['total'][0]
-            
-            # Average loan amount
-            avg_loan_amount = pd.read_sql(f"SELECT AVG(loan_amnt) as avg FROM {TABLE_NAME}", conn)['avg'][0]
-            
-            # Default rate
-            default_count = pd.read_sql(f"SELECT COUNT(*) as count FROM {TABLE_NAME} WHERE is_defaulted = 1", conn)['count'][0]
-            default_rate = (default_count / total_beneficiaries * 100) if total_beneficiaries > 0 else 0
-            
-            # Loan grade distribution
-            grade_distribution = pd.read_sql(f"SELECT grade, COUNT(*) as count FROM {TABLE_NAME} GROUP BY grade ORDER BY grade", conn)
-            
-            # Purpose distribution (top 5)
-            purpose_distribution = pd.read_sql(f"SELECT purpose, COUNT(*) as count FROM {TABLE_NAME} GROUP BY purpose ORDER BY count DESC LIMIT 5", conn)
-            
-            # Home ownership distribution
-            home_ownership_dist = pd.read_sql(f"SELECT home_ownership, COUNT(*) as count FROM {TABLE_NAME} GROUP BY home_ownership ORDER BY count DESC", conn)
-            
-            return {
-                "overview": {
-                    "total_beneficiaries": int(total_beneficiaries),
-                    "total_loan_amount": float(total_loan_amount or 0),
-                    "avg_loan_amount": float(avg_loan_amount or 0),
-                    "avg_credit_score": float(avg_credit or 0),
-                    "default_rate_percent": float(default_rate)
-                },
-                "distributions": {
-                    "grade": convert_numpy_types(grade_distribution.to_dict('records')),
-                    "purpose": convert_numpy_types(purpose_distribution.to_dict('records')),
-                    "home_ownership": convert_numpy_types(home_ownership_dist.to_dict('records'))
-                },
-                "risk_metrics": {
-                    "total_defaults": int(default_count),
-                    "default_rate": float(default_rate)
-                }
-            }
-            
+        return response_cache.respond(
+            ("kpi_summary",), if_none_match, lambda: FastJSONResponse(analytics_cache.get()["kpi_summary"])
+        )
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calculating KPIs: {str(e)}")
 
+# Full-text search index built by ingest_data.py over the searchable text columns
+SEARCH_TABLE_NAME = f"{TABLE_NAME}_fts"
+
+# Trigram matching needs at least this many characters
+MIN_FTS_QUERY_LENGTH = 3
+
+def search_index_available(conn: sqlite3.Connection) -> bool:
+    """Check whether ingestion built the FTS5 search index."""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE_NAME,)
+    ).fetchone()
+    return row is not None
+
+def id_prefix_ranges(prefix: str, max_id: int) -> List[tuple]:
+    """
+    Translate an id prefix into half-open integer ranges, e.g. '12' ->
+    [12, 13), [120, 130), [1200, 1300), ... up to the largest id, so a prefix
+    lookup is served by the id index.
+    """
+    value = int(prefix)
+    if prefix != str(value):
+        # Ids are stored without leading zeros
+        return []
+    if value == 0:
+        return [(0, 1)]
+    
+    ranges = []
+    low, high = value, value + 1
+    while low <= max_id:
+        ranges.append((low, high))
+        low, high = low * 10, high * 10
+    return ranges
+
 @app.get("/search_beneficiaries")
+@run_in(light_db_executor)
 def search_beneficiaries(
     query: str = Query(..., description="Search query"),
     page: int = Query(1, ge=1),
-    page_size: int = Query(50, ge=1, le=500)
+    page_size: int = Query(50, ge=1, le=500),
+    layout: str = Query("records", pattern=ROW_LAYOUT_PATTERN, description="Row layout: records or columns"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)
 ):
     """
-    Search beneficiaries by ID, name, or other text fields.
+    Search beneficiaries by ID prefix, or by purpose, home ownership and grade text.
+    Numeric queries use the id index; text queries use the FTS5 trigram index.
     """
     check_database()
     
     try:
         offset = (page - 1) * page_size
+        conn = get_db_connection()
+        query = query.strip()
+        selected = parse_fields(fields)
         
-        # Search in multiple columns - adjust based on your actual column names
-        search_query = f"""
-        SELECT * FROM {TABLE_NAME} 
-        WHERE CAST(id AS TEXT) LIKE ? 
-           OR purpose LIKE ? 
-           OR home_ownership LIKE ?
-           OR grade LIKE ?
-        LIMIT {page_size} OFFSET {offset}
-        """
+        # isdigit() alone accepts non-ASCII digits such as '²' that int() rejects
+        if query.isascii() and query.isdigit():
+            # Id lookups: prefix ranges on the id index
+            search_mode = "id_prefix"
+            max_id = conn.execute(f"SELECT MAX(id) FROM {TABLE_NAME}").fetchone()[0] or 0
+            ranges = id_prefix_ranges(query, int(max_id))
+            where_clause = " OR ".join("(id >= ? AND id < ?)" for _ in ranges) or "0"
+            search_query = f"""
+            SELECT {select_list(selected)}, COUNT(*) OVER () AS _total_matches FROM {TABLE_NAME}
+            WHERE {where_clause}
+            LIMIT ? OFFSET ?
+            """
+            params = [bound for id_range in ranges for bound in id_range]
+        elif len(query) >= MIN_FTS_QUERY_LENGTH and search_index_available(conn):
+            # Text lookups: substring match through the trigram index
+            search_mode = "full_text"
+            search_query = f"""
+            SELECT {select_list(selected, "b")}, COUNT(*) OVER () AS _total_matches
+            FROM {SEARCH_TABLE_NAME} f
+            JOIN {TABLE_NAME} b ON b.rowid = f.rowid
+            WHERE {SEARCH_TABLE_NAME} MATCH ?
+            LIMIT ? OFFSET ?
+            """
+            params = ['"' + query.replace('"', '""') + '"']
+        else:
+            # Very short queries (or no search index): scan the text columns
+            search_mode = "scan"
+            search_query = f"""
+            SELECT {select_list(selected)}, COUNT(*) OVER () AS _total_matches FROM {TABLE_NAME} 
+            WHERE CAST(id AS TEXT) LIKE ? 
+               OR purpose LIKE ? 
+               OR home_ownership LIKE ?
+               OR grade LIKE ?
+            LIMIT ? OFFSET ?
+            """
+            search_term = f"%{query}%"
+            params = [search_term, search_term, search_term, search_term]
         
-        search_term = f"%{query}%"
-        df = pd.read_sql(search_query, engine, params=[search_term, search_term, search_term, search_term])
+        db_cursor = conn.execute(search_query, params + [page_size, offset])
+        rows = db_cursor.fetchall()
         
-        return {
+        # The window count (last column) gives the total number of matches in the same pass
+        columns = [column[0] for column in db_cursor.description][:-1]
+        total_matches = rows[0][-1] if rows else (0 if offset == 0 else None)
+        rows = [row[:-1] for row in rows]
+        
+        return FastJSONResponse({
             "query": query,
-            "results": convert_numpy_types(df.to_dict(orient="records")),
-            "count": len(df)
-        }
+            "results": rows_payload(columns, rows, layout),
+            "count": len(rows),
+            "total_matches": total_matches,
+            "search_mode": search_mode
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/filter_beneficiaries")
-def filter_beneficiaries(filters: BeneficiaryFilter, page: int = 1, page_size: int = 100):
+@run_in(light_db_executor)
+def filter_beneficiaries(filters: BeneficiaryFilter, page: int = 1, page_size: int = 100,
+                         cursor: Optional[str] = None, include_total: bool = True,
+                         layout: str = Query("records", pattern=ROW_LAYOUT_PATTERN),
+                         fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION)):
     """
-    Filter beneficiaries based on multiple criteria.
+    Filter beneficiaries based on multiple criteria. Rows come in rowid
+    order, or in order of the range column when a range filter is given.
+    Pass the returned next_cursor to fetch the following page in constant time.
     """
     check_database()
     
     try:
         # Build WHERE clause based on filters
-        where_conditions = []
-        params = []
-        
-        if filters.grade:
-            where_conditions.append("grade = ?")
-            params.append(filters.grade)
-        
-        if filters.loan_amnt_min is not None:
-            where_conditions.append("loan_amnt >= ?")
-            params.append(filters.loan_amnt_min)
-        
-        if filters.loan_amnt_max is not None:
-            where_conditions.append("loan_amnt <= ?")
-            params.append(filters.loan_amnt_max)
+        where_conditions, params = build_filter_conditions(filters)
         
-        if filters.credit_score_min is not None:
-            where_conditions.append("initial_fico_score >= ?")
-            params.append(filters.credit_score_min)
+        columns, rows, next_cursor, has_next = fetch_keyset_page(where_conditions, params, filter_sort_column(filters),
+                                                                 "asc", page, page_size, cursor, parse_fields(fields))
         
-        if filters.credit_score_max is not None:
-            where_conditions.append("initial_fico_score <= ?")
-            params.append(filters.credit_score_max)
-        
-        if filters.purpose:
-            where_conditions.append("purpose = ?")
-            params.append(filters.purpose)
-        
-        if filters.home_ownership:
-            where_conditions.append("home_ownership = ?")
-            params.append(filters.home_ownership)
+        pagination = {
+            "page": page,
+            "page_size": page_size,
+            "has_next": has_next,
+            "next_cursor": next_cursor
+        }
+        if include_total:
+            total_count = count_filtered_rows(where_conditions, params)
+            pagination["total_items"] = int(total_count)
+            pagination["total_pages"] = (total_count + page_size - 1) // page_size
         
-        if filters.is_defaulted is not None:
-            where_conditions.append("is_defaulted = ?")
-            params.append(filters.is_defaulted)
+        return FastJSONResponse({
+            "data": rows_payload(columns, rows, layout),
+            "pagination": pagination,
+            "filters_applied": filters.dict(exclude_none=True)
+        })
         
-        # Build the query
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Rows fetched from the export cursor at a time
+EXPORT_BATCH_SIZE = 5000
+
+def iter_cursor_batches(conn: sqlite3.Connection, cursor: sqlite3.Cursor, batch_size: Optional[int] = None):
+    """Yield row batches from a cursor, closing its dedicated connection when done."""
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+@app.post("/export_beneficiaries")
+@run_in(light_db_executor)
+def export_beneficiaries(filters: BeneficiaryFilter,
+                         export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv|arrow)$",
+                                                    description="ndjson, csv or arrow (IPC stream)")):
+    """
+    Stream every beneficiary matching the filters in one response, read from a
+    single cursor in batches so memory stays bounded however large the cohort.
+    """
+    check_database()
+    
+    if export_format == "arrow" and export.pa is None:
+        raise HTTPException(status_code=501, detail="Arrow export requires pyarrow to be installed")
+    
+    try:
+        where_conditions, params = build_filter_conditions(filters)
         query = f"SELECT * FROM {TABLE_NAME}"
         if where_conditions:
             query += " WHERE " + " AND ".join(where_conditions)
         
-        # Add pagination
-        offset = (page - 1) * page_size
-        query += f" LIMIT {page_size} OFFSET {offset}"
-        
-        df = pd.read_sql(query, engine, params=params)
-        
-        # Get total count for filters
-        count_query = f"SELECT COUNT(*) as total FROM {TABLE_NAME}"
-        if where_conditions:
-            count_query += " WHERE " + " AND ".join(where_conditions)
+        # A dedicated connection: the stream outlives this request thread and
+        # its single read transaction gives a consistent snapshot of the data
+        conn = open_db_connection()
+        try:
+            cursor = conn.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            declared_types = {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({TABLE_NAME})")}
+        except Exception:
+            conn.close()
+            raise
         
-        total_count = pd.read_sql(count_query, engine, params=params)['total'][0]
+        batches = iter_cursor_batches(conn, cursor)
+        if export_format == "csv":
+            content = export.iter_csv(columns, batches)
+        elif export_format == "arrow":
+            content = export.iter_arrow(columns, declared_types, batches)
+        else:
+            content = export.iter_ndjson(columns, batches)
         
-        return {
-            "data": convert_numpy_types(df.to_dict(orient="records")),
-            "pagination": {
-                "page": page,
-                "page_size": page_size,
-                "total_items": int(total_count),
-                "total_pages": (total_count + page_size - 1) // page_size
-            },
-            "filters_applied": filters.dict(exclude_none=True)
-        }
+        media_type, extension = export.EXPORT_FORMATS[export_format]
+        return StreamingResponse(
+            content,
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{TABLE_NAME}.{extension}"'}
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/portfolio_trends")
+@run_in(heavy_db_executor)
 def get_portfolio_trends():
     """
     Get portfolio health trends over time - simulated monthly data based on actual portfolio metrics.
@@ -455,261 +1417,408 @@ def get_portfolio_trends():
     check_database()
     
     try:
-        with sqlite3.connect(DB_FILE_PATH) as conn:
-            # Get base metrics
-            base_metrics = pd.read_sql(f"""
-                SELECT 
-                    AVG(initial_fico_score) as avg_credit_score,
-                    AVG(CAST(is_defaulted AS FLOAT)) * 100 as default_rate,
-                    COUNT(*) as total_loans,
-                    AVG(loan_amnt) as avg_loan_amount
-                FROM {TABLE_NAME}
-            """, conn)
-            
-            # Get grade distribution for health calculation
-            grade_health = pd.read_sql(f"""
-                SELECT grade, 
-                       COUNT(*) as count,
-                       AVG(CAST(is_defaulted AS FLOAT)) * 100 as default_rate
-                FROM {TABLE_NAME} 
-                GROUP BY grade
-                ORDER BY grade
-            """, conn)
-            
-            # Calculate weighted health score (higher is better)
-            # Assign weights: A=10, B=8, C=6, D=4, E=2, F=1, G=0.5
-            grade_weights = {'A': 10, 'B': 8, 'C': 6, 'D': 4, 'E': 2, 'F': 1, 'G': 0.5}
-            total_weighted = sum(row['count'] * grade_weights.get(row['grade'], 5) for _, row in grade_health.iterrows())
-            total_count = grade_health['count'].sum()
-            base_health_score = (total_weighted / total_count) if total_count > 0 else 6.0
-            
-            # Generate trend data for the last 6 months
-            months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun']
-            trends = []
-            
-            for i, month in enumerate(months):
-                # Add some realistic variation around the base score
-                variation = np.random.normal(0, 0.2)  # Small random variation
-                trend_factor = 0.05 * i  # Slight upward trend
-                health_score = max(1.0, min(10.0, base_health_score + trend_factor + variation))
-                
-                trends.append({
-                    "month": month,
-                    "score": round(health_score, 1),
-                    "avg_credit": round(base_metrics.iloc[0]['avg_credit_score'] + i * 2, 0),
-                    "default_rate": round(max(0, base_metrics.iloc[0]['default_rate'] - i * 0.1), 2)
-                })
+        # Base metrics and grade distribution come from the cached aggregates
+        portfolio_base = analytics_cache.get()["portfolio_base"]
+        base_metrics = pd.DataFrame([portfolio_base], columns=['avg_credit_score', 'default_rate', 'total_loans', 'avg_loan_amount'])
+        grade_health = pd.DataFrame(portfolio_base["grade_health"], columns=['grade', 'count', 'default_rate'])
+        
+        # Calculate weighted health score (higher is better)
+        # Assign weights: A=10, B=8, C=6, D=4, E=2, F=1, G=0.5
+        grade_weights = {'A': 10, 'B': 8, 'C': 6, 'D': 4, 'E': 2, 'F': 1, 'G': 0.5}
+        total_weighted = sum(row['count'] * grade_weights.get(row['grade'], 5) for _, row in grade_health.iterrows())
+        total_count = grade_health['count'].sum()
+        base_health_score = (total_weighted / total_count) if total_count > 0 else 6.0
+        
+        # Generate trend data for the last 6 months
+        months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun']
+        trends = []
+        
+        for i, month in enumerate(months):
+            # Add some realistic variation around the base score
+            variation = np.random.normal(0, 0.2)  # Small random variation
+            trend_factor = 0.05 * i  # Slight upward trend
+            health_score = max(1.0, min(10.0, base_health_score + trend_factor + variation))
             
-            return {
-                "portfolio_health": trends,
-                "current_metrics": {
-                    "health_score": round(base_health_score, 1),
-                    "avg_credit_score": round(base_metrics.iloc[0]['avg_credit_score'], 0),
-                    "default_rate": round(base_metrics.iloc[0]['default_rate'], 2),
-                    "total_loans": int(base_metrics.iloc[0]['total_loans'])
-                }
+            trends.append({
+                "month": month,
+                "score": round(health_score, 1),
+                "avg_credit": round(base_metrics.iloc[0]['avg_credit_score'] + i * 2, 0),
+                "default_rate": round(max(0, base_metrics.iloc[0]['default_rate'] - i * 0.1), 2)
+            })
+        
+        return {
+            "portfolio_health": trends,
+            "current_metrics": {
+                "health_score": round(base_health_score, 1),
+                "avg_credit_score": round(base_metrics.iloc[0]['avg_credit_score'], 0),
+                "default_rate": round(base_metrics.iloc[0]['default_rate'], 2),
+                "total_loans": int(base_metrics.iloc[0]['total_loans'])
             }
-            
+        }
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/loan_analytics")
-def get_loan_analytics():
+@run_in(heavy_db_executor)
+def get_loan_analytics(if_none_match: Optional[str] = Header(None)):
     """
     Get loan-specific analytics and trends.
     """
     check_database()
     
     try:
-        with sqlite3.connect(DB_FILE_PATH) as conn:
-            # Loan amount distribution by grade
-            loan_by_grade = pd.read_sql(f"""
-                SELECT grade, 
-                       COUNT(*) as loan_count,
-                       AVG(loan_amnt) as avg_amount,
-                       SUM(loan_amnt) as total_amount,
-                       MIN(loan_amnt) as min_amount,
-                       MAX(loan_amnt) as max_amount
-                FROM {TABLE_NAME} 
-                GROUP BY grade 
-                ORDER BY grade
-            """, conn)
-            
-            # Loan purpose analysis
-            purpose_analysis = pd.read_sql(f"""
-                SELECT purpose,
-                       COUNT(*) as loan_count,
-                       AVG(loan_amnt) as avg_amount,
-                       AVG(initial_fico_score) as avg_credit,
-                       AVG(CAST(is_defaulted AS FLOAT)) * 100 as default_rate
-                FROM {TABLE_NAME}
-                GROUP BY purpose
-                ORDER BY loan_count DESC
-                LIMIT 10
-            """, conn)
-            
-            # Term analysis
-            term_analysis = pd.read_sql(f"""
-                SELECT term,
-                       COUNT(*) as loan_count,
-                       AVG(loan_amnt) as avg_amount,
-                       AVG(int_rate) as avg_interest_rate
-                FROM {TABLE_NAME}
-                GROUP BY term
-                ORDER BY term
-            """, conn)
-            
-            return {
-                "loan_by_grade": convert_numpy_types(loan_by_grade.to_dict('records')),
-                "purpose_analysis": convert_numpy_types(purpose_analysis.to_dict('records')),
-                "term_analysis": convert_numpy_types(term_analysis.to_dict('records'))
-            }
-            
+        return response_cache.respond(
+            ("loan_analytics",), if_none_match, lambda: FastJSONResponse(analytics_cache.get()["loan_analytics"])
+        )
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/risk_analytics")
-def get_risk_analytics():
+@run_in(heavy_db_executor)
+def get_risk_analytics(if_none_match: Optional[str] = Header(None)):
     """
     Get risk-related analytics and default predictions.
     """
     check_database()
     
     try:
-        with sqlite3.connect(DB_FILE_PATH) as conn:
-            # Default rate by grade
-            default_by_grade = pd.read_sql(f"""
-                SELECT grade,
-                       COUNT(*) as total_loans,
-                       SUM(is_defaulted) as defaults,
-                       AVG(CAST(is_defaulted AS FLOAT)) * 100 as default_rate,
-                       AVG(initial_fico_score) as avg_credit
-                FROM {TABLE_NAME}
-                GROUP BY grade
-                ORDER BY grade
-            """, conn)
-            
-            # Risk by credit score ranges
-            credit_risk = pd.read_sql(f"""
-                SELECT 
-                    CASE 
-                        WHEN initial_fico_score < 580 THEN 'Poor (< 580)'
-                        WHEN initial_fico_score < 670 THEN 'Fair (580-669)'
-                        WHEN initial_fico_score < 740 THEN 'Good (670-739)'
-                        WHEN initial_fico_score < 800 THEN 'Very Good (740-799)'
-                        ELSE 'Excellent (800+)'
-                    END as credit_range,
-                    COUNT(*) as loan_count,
-                    AVG(CAST(is_defaulted AS FLOAT)) * 100 as default_rate,
-                    AVG(loan_amnt) as avg_loan_amount
-                FROM {TABLE_NAME}
-                GROUP BY credit_range
-                ORDER BY MIN(initial_fico_score)
-            """, conn)
-            
-            # Home ownership risk analysis
-            home_ownership_risk = pd.read_sql(f"""
-                SELECT home_ownership,
-                       COUNT(*) as total_loans,
-                       AVG(CAST(is_defaulted AS FLOAT)) * 100 as default_rate,
-                       AVG(loan_amnt) as avg_loan_amount,
-                       AVG(annual_inc) as avg_income
-                FROM {TABLE_NAME}
-                GROUP BY home_ownership
-                ORDER BY default_rate DESC
-            """, conn)
-            
-            return {
-                "default_by_grade": convert_numpy_types(default_by_grade.to_dict('records')),
-                "credit_risk_analysis": convert_numpy_types(credit_risk.to_dict('records')),
-                "home_ownership_risk": convert_numpy_types(home_ownership_risk.to_dict('records'))
-            }
-            
+        return response_cache.respond(
+            ("risk_analytics",), if_none_match, lambda: FastJSONResponse(analytics_cache.get()["risk_analytics"])
+        )
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def describe_table_columns() -> Dict[str, Any]:
+    """Name, type and constraints of every column in the beneficiaries table."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA table_info({TABLE_NAME})")
+    columns_info = cursor.fetchall()
+    
+    columns = []
+    for col_info in columns_info:
+        columns.append({
+            "name": col_info[1],
+            "type": col_info[2],
+            "not_null": bool(col_info[3]),
+            "primary_key": bool(col_info[5])
+        })
+    
+    return {
+        "table_name": TABLE_NAME,
+        "columns": columns,
+        "total_columns": len(columns)
+    }
+
 @app.get("/columns")
-def get_columns():
+@run_in(light_db_executor)
+def get_columns(if_none_match: Optional[str] = Header(None)):
     """
     Get all available columns in the beneficiaries table.
     """
     check_database()
     
     try:
-        with sqlite3.connect(DB_FILE_PATH) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"PRAGMA table_info({TABLE_NAME})")
-            columns_info = cursor.fetchall()
-            
-            columns = []
-            for col_info in columns_info:
-                columns.append({
-                    "name": col_info[1],
-                    "type": col_info[2],
-                    "not_null": bool(col_info[3]),
-                    "primary_key": bool(col_info[5])
-                })
-            
-            return {
-                "table_name": TABLE_NAME,
-                "columns": columns,
-                "total_columns": len(columns)
-            }
-            
+        return response_cache.respond(("columns",), if_none_match, describe_table_columns)
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/index_report")
+@run_in(heavy_db_executor)
+def get_index_report():
+    """
+    EXPLAIN QUERY PLAN for each query shape the API issues, flagging any that
+    fall back to a full table scan or sort through a temporary B-tree.
+    """
+    check_database()
+    
+    try:
+        report = explain_workload(get_db_connection(), TABLE_NAME)
+        return {
+            "table_name": TABLE_NAME,
+            "full_scans": [entry["name"] for entry in report if entry["full_scan"]],
+            "temp_b_tree_sorts": [entry["name"] for entry in report if entry["temp_b_tree"]],
+            "queries": report
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def build_feature_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Build the model input DataFrame for one or many applications in a single columnar pass.
+    """
+    return encode_feature_frame(pd.DataFrame.from_records(records))
+
+def encode_feature_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Encode the categorical columns of a raw feature frame in place."""
+    # Encode each categorical column in one vectorized lookup
+    encoders = load_category_encoders()
+    if encoders is None:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Categorical encoders not available. Run ingest_data.py or provide {ENCODERS_PATH}."
+        )
+
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and col in encoders:
+            df[col] = encoders[col].encode(df[col])
+
+    return df
+
+def predict_default_probabilities(df: pd.DataFrame) -> np.ndarray:
+    """
+    Score a feature frame in the inference workers (or in this process when
+    there are none). Returns the probability of default for every row.
+    """
+    if inference_pool is not None:
+        return inference_pool.predict(df, PREDICT_CHUNK_SIZE)
+    return inference.predict_probabilities(loaded_model.model, df, PREDICT_CHUNK_SIZE)
+
+def explain_default_probabilities(df: pd.DataFrame) -> Dict[str, Any]:
+    """Score a feature frame together with per-application feature contributions."""
+    if inference_pool is not None:
+        return inference_pool.explain(df, PREDICT_CHUNK_SIZE)
+    return inference.explain_probabilities(loaded_model, df, PREDICT_CHUNK_SIZE)
+
+def score_applications(records: List[Dict[str, Any]]) -> np.ndarray:
+    """Encode and score a list of applications (one micro-batch of /predict calls)."""
+    return predict_default_probabilities(build_feature_frame(records))
+
+# Merges concurrent /predict calls into micro-batches scored with one model call;
+# created per app lifespan
+prediction_batcher = None
+
+def get_prediction_batcher() -> inference.MicroBatcher:
+    global prediction_batcher
+    if prediction_batcher is None:
+        prediction_batcher = inference.MicroBatcher(score_applications, model_executor)
+    return prediction_batcher
+
+# Repeated /predict payloads are answered from memory for this long
+PREDICTION_CACHE_SIZE = 4096
+PREDICTION_CACHE_TTL = 600.0  # seconds
+
+class PredictionCache:
+    """
+    LRU cache of /predict results with a time-to-live.
+
+    Entries are keyed by the model version and a hash of the application's
+    encoded feature vector, so payloads that differ only in ways the model
+    cannot see (e.g. an unseen category vs. its fallback) share an entry.
+    """
+
+    def __init__(self, max_size: int = PREDICTION_CACHE_SIZE, ttl: float = PREDICTION_CACHE_TTL):
+        self.lock = threading.Lock()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, model_version: str, kind: str, input_data: Dict[str, Any]) -> Optional[tuple]:
+        """Key for an application, or None if the encoders are not loaded yet."""
+        encoders = category_encoders
+        if encoders is None:
+            return None
+        values = []
+        for col, value in input_data.items():
+            if col in encoders:
+                values.append(float(encoders[col].encode_value(value)))
+            elif isinstance(value, (int, float)):
+                values.append(float(value))
+            else:
+                # No encoder for this column (e.g. it was missing from the database
+                # the encoders were built from): key on the raw value
+                values.append(str(value))
+        canonical = json.dumps(values, separators=(",", ":"))
+        digest = hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+        return (model_version, kind, digest)
+
+    def get(self, key: Optional[tuple]):
+        if key is None:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Optional[tuple], value):
+        if key is None:
+            return
+        with self.lock:
+            self.entries[key] = (time.time(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def to_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
+
+prediction_cache = PredictionCache()
+
+def get_top_feature_importances(info: Dict[str, Any], top_n: int = 5) -> List[tuple]:
+    """
+    Return (feature_name, importance) pairs for the model's most important
+    features, from the ranking computed once when the model was loaded.
+    """
+    return (info.get("feature_ranking") or [])[:top_n]
+
+def format_top_factors(top_importances: List[tuple], input_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Attach an application's values to the ranked feature importances."""
+    return [
+        {
+            "feature": feature_name,
+            "value": str(input_data.get(feature_name)),
+            "importance": importance,
+            "impact": "HIGH" if importance > 0.1 else "MEDIUM" if importance > 0.05 else "LOW"
+        }
+        for feature_name, importance in top_importances
+    ]
+
+# |contribution| above which a factor is HIGH / MEDIUM impact, per explanation
+# method (tree-path contributions are probabilities, XGBoost's are log-odds)
+CONTRIBUTION_IMPACT_THRESHOLDS = {
+    "tree_path": (0.05, 0.02),
+    "xgboost_contribs": (0.5, 0.2),
+}
+
+def format_contribution_factors(explained: Dict[str, Any], row: int, input_data: Dict[str, Any],
+                                top_n: int = 5) -> List[Dict[str, Any]]:
+    """Rank one application's features by how much they moved its score."""
+    contributions = explained["contributions"][row]
+    high, medium = CONTRIBUTION_IMPACT_THRESHOLDS[explained["method"]]
+    top_indices = np.argsort(np.abs(contributions), kind='stable')[::-1][:top_n]
+    factors = []
+    for idx in top_indices:
+        feature_name = explained["feature_names"][idx]
+        contribution = float(contributions[idx])
+        factors.append({
+            "feature": feature_name,
+            "value": str(input_data.get(feature_name)),
+            "contribution": contribution,
+            "direction": "increases risk" if contribution > 0 else "decreases risk",
+            "impact": "HIGH" if abs(contribution) > high else "MEDIUM" if abs(contribution) > medium else "LOW"
+        })
+    return factors
+
+def require_contributions(info: Dict[str, Any]):
+    """Raise 400 if the loaded model cannot produce per-application contributions."""
+    if info.get("explanation_method") is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Per-application contributions are not available for {info['model_type']} models"
+        )
+
+# Default probability below which an application is low / medium risk
+LOW_RISK_THRESHOLD = 0.15
+MEDIUM_RISK_THRESHOLD = 0.40
+
+def assess_risk(probability_default: float) -> Dict[str, str]:
+    """Map a default probability to assessment, recommendation and risk level."""
+    if probability_default < LOW_RISK_THRESHOLD:
+        return {"assessment": "LOW RISK", "recommendation": "APPROVE", "risk_level": "low"}
+    elif probability_default < MEDIUM_RISK_THRESHOLD:
+        return {"assessment": "MEDIUM RISK", "recommendation": "MANUAL REVIEW", "risk_level": "medium"}
+    else:
+        return {"assessment": "HIGH RISK", "recommendation": "DENY", "risk_level": "high"}
+
+def risk_levels(probabilities: np.ndarray) -> np.ndarray:
+    """Vectorized assess_risk: the risk level of every probability."""
+    probabilities = np.asarray(probabilities)
+    return np.select(
+        [probabilities < LOW_RISK_THRESHOLD, probabilities < MEDIUM_RISK_THRESHOLD],
+        ["low", "medium"],
+        default="high"
+    )
+
+def build_prediction_response(probability_default: float, top_factors: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Format a single prediction result."""
+    risk = assess_risk(probability_default)
+    return {
+        "prediction_probability": round(probability_default * 100, 2),  # Convert to percentage
+        "assessment": risk["assessment"],
+        "recommendation": risk["recommendation"],
+        "top_factors": top_factors,
+        "risk_level": risk["risk_level"]
+    }
+
+def get_model_or_503():
+    """Load the model, raising 503 if it is not available. Returns the model description."""
+    info = load_ai_model()
+    if info is None:
+        failure = model_load_status()
+        detail = "AI Model not available. Please check model path configuration."
+        if failure is not None:
+            detail = f"AI Model failed to load: {failure['error']} (retrying in {failure['retry_in_seconds']}s)"
+        raise HTTPException(status_code=503, detail=detail)
+    return info
+
 @app.post("/predict")
-def predict_loan_default(application: LoanApplicationInput):
+async def predict_loan_default(
+    application: LoanApplicationInput,
+    explain: str = Query("global", pattern="^(global|contributions)$",
+                         description="Top factors from the global importance ranking or this application's contributions")
+):
     """
     Predict loan default risk using the loaded AI model.
     Returns probability, assessment, and key factors.
+    Concurrent calls are merged into micro-batches before scoring.
     """
     try:
         # Load the model if not already loaded
-        model = load_ai_model()
-        
-        if model is None:
-            raise HTTPException(
-                status_code=503, 
-                detail="AI Model not available. Please check model path configuration."
-            )
+        info = model_info or await asyncio.get_running_loop().run_in_executor(model_executor, get_model_or_503)
         
         # Convert input to dictionary (Pydantic V2)
         input_data = application.model_dump()
+        cache_key = prediction_cache.make_key(info["version"], explain, input_data)
+        cached = prediction_cache.get(cache_key)
         
-        # Create a DataFrame with the input data (model expects DataFrame)
-        df = pd.DataFrame([input_data])
-        
-        # XGBoost requires categorical variables to be encoded
-        # Define categorical columns that need encoding
-        categorical_columns = [
-            'grade', 'sub_grade', 'home_ownership', 'verification_status',
-            'purpose', 'application_type', 'financial_state'
-        ]
-        
-        # Encode categorical variables using LabelEncoder or simple mapping
-        from sklearn.preprocessing import LabelEncoder
-        
-        # Create label encoders and encode the categorical columns
-        for col in categorical_columns:
-            if col in df.columns:
-                le = LabelEncoder()
-                # Fit and transform the column
-                df[col] = le.fit_transform(df[col].astype(str))
+        if explain == "contributions":
+            require_contributions(info)
+            explained = cached
+            if explained is None:
+                explained = await asyncio.get_running_loop().run_in_executor(
+                    model_executor, lambda: explain_default_probabilities(build_feature_frame([input_data]))
+                )
+                prediction_cache.put(cache_key, explained)
+            response = build_prediction_response(
+                float(explained["probabilities"][0]),
+                format_contribution_factors(explained, 0, input_data)
+            )
+            response["explanation_method"] = explained["method"]
+            return response
         
         # Make prediction
-        # Assuming the model returns probability of default
         try:
-            # If model has predict_proba method
-            if hasattr(model, 'predict_proba'):
-                prediction_proba = model.predict_proba(df)
-                # Assuming binary classification: [prob_no_default, prob_default]
-                probability_default = float(prediction_proba[0][1])
-            else:
-                # If only predict method is available
-                prediction = model.predict(df)
-                probability_default = float(prediction[0])
+            probability_default = cached
+            if probability_default is None:
+                probability_default = float((await get_prediction_batcher().submit([input_data]))[0])
+                prediction_cache.put(cache_key, probability_default)
+        except HTTPException:
+            raise
         except Exception as pred_error:
             # Enhanced error message for debugging
             import traceback
@@ -717,9 +1826,8 @@ def predict_loan_default(application: LoanApplicationInput):
                 "error_type": type(pred_error).__name__,
                 "error_message": str(pred_error),
                 "traceback": traceback.format_exc(),
-                "dataframe_shape": df.shape,
-                "dataframe_columns": list(df.columns),
-                "model_type": type(model).__name__
+                "input_columns": list(input_data.keys()),
+                "model_type": info["model_type"]
             }
             print("PREDICTION ERROR DETAILS:", error_details)
             raise HTTPException(
@@ -730,50 +1838,140 @@ def predict_loan_default(application: LoanApplicationInput):
         # Get feature importance for explanation (if available)
         top_factors = []
         try:
-            if hasattr(model, 'feature_importances_'):
-                feature_names = list(input_data.keys())
-                importances = model.feature_importances_
-                
-                # Get top 5 most important features
-                top_indices = np.argsort(importances)[-5:][::-1]
-                
-                for idx in top_indices:
-                    feature_name = feature_names[idx]
-                    feature_value = input_data[feature_name]
-                    importance = float(importances[idx])
-                    
-                    top_factors.append({
-                        "feature": feature_name,
-                        "value": str(feature_value),
-                        "importance": importance,
-                        "impact": "HIGH" if importance > 0.1 else "MEDIUM" if importance > 0.05 else "LOW"
-                    })
+            top_importances = get_top_feature_importances(info)
+            top_factors = format_top_factors(top_importances, input_data)
         except Exception as importance_error:
             print(f"Could not extract feature importance: {str(importance_error)}")
         
-        # Determine assessment
-        if probability_default < 0.15:
-            assessment = "LOW RISK"
-            recommendation = "APPROVE"
-            risk_level = "low"
-        elif probability_default < 0.40:
-            assessment = "MEDIUM RISK"
-            recommendation = "MANUAL REVIEW"
-            risk_level = "medium"
-        else:
-            assessment = "HIGH RISK"
-            recommendation = "DENY"
-            risk_level = "high"
+        return build_prediction_response(probability_default, top_factors)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+def sensitivity_axis(spec: SensitivityRange) -> np.ndarray:
+    """The values one varied feature takes, cast to the feature's type."""
+    field = LoanApplicationInput.model_fields.get(spec.feature)
+    if field is None:
+        raise HTTPException(status_code=400, detail=f"Unknown feature: {spec.feature}")
+    if spec.feature in CATEGORICAL_COLUMNS or field.annotation not in (int, float):
+        raise HTTPException(status_code=400, detail=f"Feature '{spec.feature}' is not numeric")
+    
+    if spec.values is not None:
+        values = np.array(spec.values, dtype=np.float64)
+    elif spec.min is not None and spec.max is not None:
+        values = np.linspace(spec.min, spec.max, spec.steps)
+    else:
+        raise HTTPException(status_code=400, detail=f"Give either values or min and max for '{spec.feature}'")
+    
+    if field.annotation is int:
+        values = np.round(values).astype(np.int64)
+    return values
+
+@app.post("/predict/sensitivity")
+@run_in(model_executor)
+def predict_sensitivity(request: SensitivityInput):
+    """
+    Score a base application with one or two features swept over a grid.
+    The whole grid is encoded once and scored in a single vectorized call;
+    probabilities come back as a list (one feature) or a matrix indexed
+    [first feature value][second feature value].
+    """
+    try:
+        get_model_or_503()
+        
+        features = [spec.feature for spec in request.ranges]
+        if len(set(features)) != len(features):
+            raise HTTPException(status_code=400, detail="Each feature can only be varied once")
+        axes = [sensitivity_axis(spec) for spec in request.ranges]
+        
+        # Encode the base application once, then tile it into the grid
+        input_data = request.application.model_dump()
+        base = build_feature_frame([input_data])
+        shape = tuple(len(axis) for axis in axes)
+        grid = base.loc[base.index.repeat(int(np.prod(shape)) + 1)].reset_index(drop=True)
+        for feature, values in zip(features, np.meshgrid(*axes, indexing='ij')):
+            # Row 0 stays the unmodified base application
+            grid.loc[1:, feature] = values.ravel()
+        
+        try:
+            probabilities = predict_default_probabilities(grid)
+        except Exception as pred_error:
+            print(f"SENSITIVITY PREDICTION ERROR ({grid.shape}): {pred_error}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Prediction error: {str(pred_error)}. Check server logs for details."
+            )
+        
+        surface = probabilities[1:].reshape(shape)
+        return FastJSONResponse({
+            "base": build_prediction_response(float(probabilities[0]), []),
+            "features": features,
+            "values": [axis.tolist() for axis in axes],
+            "prediction_probability": np.round(surface * 100, 2).tolist(),  # Convert to percentage
+            "risk_level": risk_levels(surface).tolist(),
+            "scenarios": int(surface.size)
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+@app.post("/predict/batch")
+@run_in(model_executor)
+def predict_loan_default_batch(batch: BatchPredictionInput):
+    """
+    Predict loan default risk for many applications in one call.
+    Applications are encoded in a single columnar pass and scored in chunks.
+    Results are returned in the same order as the input.
+    """
+    try:
+        info = get_model_or_503()
+        
+        records = [application.model_dump() for application in batch.applications]
+        df = build_feature_frame(records)
+        
+        use_contributions = batch.include_factors and batch.explain == "contributions"
+        if use_contributions:
+            require_contributions(info)
+        
+        try:
+            if use_contributions:
+                # One vectorized pass scores and explains the whole batch
+                explained = explain_default_probabilities(df)
+                probabilities = explained["probabilities"]
+            else:
+                probabilities = predict_default_probabilities(df)
+        except Exception as pred_error:
+            print(f"BATCH PREDICTION ERROR ({info['model_type']}, shape {df.shape}): {pred_error}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Prediction error: {str(pred_error)}. Check server logs for details."
+            )
+        
+        # The importance ranking is global and cached at model load
+        top_importances = get_top_feature_importances(info) if batch.include_factors else []
+        
+        results = []
+        risk_counts = {"low": 0, "medium": 0, "high": 0}
+        for row, (input_data, probability_default) in enumerate(zip(records, probabilities.tolist())):
+            if use_contributions:
+                top_factors = format_contribution_factors(explained, row, input_data)
+            else:
+                top_factors = format_top_factors(top_importances, input_data)
+            result = build_prediction_response(probability_default, top_factors)
+            risk_counts[result["risk_level"]] += 1
+            results.append(result)
         
-        # Format response
         response = {
-            "prediction_probability": round(probability_default * 100, 2),  # Convert to percentage
-            "assessment": assessment,
-            "recommendation": recommendation,
-            "top_factors": top_factors,
-            "risk_level": risk_level
+            "results": results,
+            "total": len(results),
+            "risk_level_counts": risk_counts
         }
-        
+        if use_contributions:
+            response["explanation_method"] = explained["method"]
         return response
         
     except HTTPException:
@@ -781,23 +1979,200 @@ def predict_loan_default(application: LoanApplicationInput):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
+def run_risk_sweep(progress=None) -> Dict[str, Any]:
+    """
+    Re-score the latest month of every beneficiary into the risk_scores table.
+    Chunks are scored in the inference workers when they are running.
+    """
+    info = load_ai_model()
+    if info is None:
+        raise RuntimeError("AI Model not available. Please check model path configuration.")
+    if load_category_encoders() is None:
+        raise RuntimeError(f"Categorical encoders not available. Run ingest_data.py or provide {ENCODERS_PATH}.")
+
+    feature_columns = list(LoanApplicationInput.model_fields)
+    missing = [col for col in feature_columns if col not in get_table_columns()]
+    if missing:
+        raise RuntimeError(f"Columns missing from {TABLE_NAME}: {missing}")
+
+    enable_wal_mode()
+    read_conn = open_db_connection()
+    # A separate file: the sweep's commits don't touch the beneficiaries database
+    write_conn = risk_sweep.open_scores_connection()
+    try:
+        return risk_sweep.run_sweep(
+            read_conn, write_conn, TABLE_NAME, feature_columns,
+            score_chunk=lambda df: predict_default_probabilities(encode_feature_frame(df.copy())),
+            risk_levels=risk_levels,
+            model_version=info["version"],
+            progress=progress
+        )
+    finally:
+        read_conn.close()
+        write_conn.close()
+
+class RiskSweepJob:
+    """Runs one risk sweep at a time on a background thread and tracks its progress."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.status = "idle"
+        self.started_at = None
+        self.finished_at = None
+        self.progress = None
+        self.result = None
+        self.error = None
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self) -> bool:
+        """Start a sweep; returns False if one is already running."""
+        with self.lock:
+            if self.running:
+                return False
+            self.status = "running"
+            self.started_at = time.time()
+            self.finished_at = None
+            self.progress = None
+            self.result = None
+            self.error = None
+            self.thread = threading.Thread(target=self._run, name="risk-sweep", daemon=True)
+            self.thread.start()
+            return True
+
+    def _update_progress(self, stats: Dict[str, Any]):
+        self.progress = {key: stats[key] for key in ("scored", "chunks", "rows_per_second")}
+
+    def _run(self):
+        try:
+            self.result = run_risk_sweep(progress=self._update_progress)
+            self.status = "completed"
+            print(f"✅ Risk sweep scored {self.result['scored']} beneficiaries in {self.result['seconds']:.2f}s")
+        except Exception as e:
+            self.error = str(e)
+            self.status = "failed"
+            print(f"❌ Risk sweep failed: {str(e)}")
+        finally:
+            self.finished_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "started_at": pd.Timestamp(self.started_at, unit='s').isoformat() if self.started_at else None,
+            "finished_at": pd.Timestamp(self.finished_at, unit='s').isoformat() if self.finished_at else None,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error
+        }
+
+risk_sweep_job = RiskSweepJob()
+
+# Beneficiary columns shown next to each score: the behavioural stress signals
+RISK_SCORE_CONTEXT_COLUMNS = ['grade', 'purpose', 'loan_amnt', 'financial_state', 'missed_payments_last_3m',
+                              'months_in_stress_or_crisis_l6m', 'consumption_trend_last_6m']
+
+@app.post("/risk_sweep", status_code=202)
+@run_in(light_db_executor)
+def start_risk_sweep():
+    """
+    Start re-scoring every beneficiary's latest loan month in the background.
+    Poll GET /risk_sweep for progress.
+    """
+    check_database()
+    get_model_or_503()
+    
+    if not risk_sweep_job.start():
+        raise HTTPException(status_code=409, detail="A risk sweep is already running")
+    return risk_sweep_job.to_dict()
+
+@app.get("/risk_sweep")
+@run_in(light_db_executor)
+def get_risk_sweep_status():
+    """Status of the current or last risk sweep."""
+    return risk_sweep_job.to_dict()
+
+@app.get("/risk_scores/top")
+@run_in(light_db_executor)
+def get_top_risk_scores(
+    limit: int = Query(50, ge=1, le=1000, description="Number of borrowers"),
+    risk_level: Optional[str] = Query(None, pattern="^(low|medium|high)$", description="Only this risk level"),
+    layout: str = Query("records", pattern=ROW_LAYOUT_PATTERN, description="Row layout: records or columns")
+):
+    """
+    The highest-risk borrowers from the last risk sweep, read in score order
+    from the risk_scores index together with their latest month's details.
+    """
+    check_database()
+    
+    try:
+        table_columns = get_table_columns()
+        context_columns = [col for col in RISK_SCORE_CONTEXT_COLUMNS if col in table_columns]
+        
+        where_clause = "WHERE risk_level = ?" if risk_level else ""
+        params = [risk_level] if risk_level else []
+        select_columns = ", ".join(
+            ["r.id", "r.month_of_loan", "r.score", "r.risk_level", "r.model_version", "r.scored_at"]
+            + [f"b.{col}" for col in context_columns]
+        )
+        query = f"""
+            SELECT {select_columns}
+            FROM (
+                SELECT * FROM {risk_sweep.RISK_SCORES_SCHEMA}.{risk_sweep.RISK_SCORES_TABLE}
+                {where_clause}
+                ORDER BY score DESC
+                LIMIT ?
+            ) r
+            LEFT JOIN {TABLE_NAME} b ON b.rowid = (
+                SELECT rowid FROM {TABLE_NAME}
+                WHERE id = r.id AND month_of_loan = r.month_of_loan
+                LIMIT 1
+            )
+            ORDER BY r.score DESC
+        """
+        conn = get_db_connection()
+        no_scores = HTTPException(status_code=404, detail="No risk scores yet. Run POST /risk_sweep first.")
+        if not risk_sweep.attach_scores(conn):
+            raise no_scores
+        try:
+            cursor = conn.execute(query, params + [limit])
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                raise no_scores
+            raise
+        rows = cursor.fetchall()
+        columns = [column[0] for column in cursor.description]
+        
+        return FastJSONResponse({
+            "data": rows_payload(columns, rows, layout),
+            "count": len(rows)
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
 @app.get("/health")
+@run_in(light_db_executor)
 def health_check():
     """
     Health check endpoint to verify API and database status.
     """
     try:
-        check_database()
-        
-        with sqlite3.connect(DB_FILE_PATH) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}")
-            row_count = cursor.fetchone()[0]
+        state = check_database()
         
         return {
             "status": "healthy",
             "database_connected": True,
-            "total_records": row_count,
+            **state.to_dict(),
+            "analytics_engine": ANALYTICS_ENGINE,
+            "model": {key: model_info[key] for key in ("version", "format", "model_type")} if model_info else None,
+            "model_error": model_load_status(),
+            "prediction_cache": prediction_cache.to_dict(),
+            "response_cache": response_cache.to_dict(),
             "timestamp": pd.Timestamp.now().isoformat()
         }
         
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Model Registry for Siddhi Credit Scoring
+
+Loads the credit model from a versioned artifact instead of unpickling it.
+An artifact directory looks like the column snapshot written by ingestion:
+
+    <artifact_dir>/manifest.json        -> points at the current version
+    <artifact_dir>/<version>/manifest.json
+    <artifact_dir>/<version>/trees.npz  (or model.json for XGBoost)
+
+The version manifest records the feature order, the categorical encoders and
+the model format:
+
+* "tree_arrays": scikit-learn tree ensembles (RandomForest, ExtraTrees,
+  DecisionTree classifiers) flattened into plain NumPy arrays and evaluated
+  with a vectorized traversal. Loading is an np.load with allow_pickle=False,
+  so no code runs and cold starts take milliseconds.
+* "xgboost_json": XGBoost's native booster dump.
+
+Any other model is loaded from the pickle file as a fallback. Every load ends
+with a warm-up prediction and reports how long it took.
+
+Export a pickled model to an artifact with:
+
+    python model_registry.py export credit_model.pkl --encoders credit_model_encoders.json
+"""
+
+import argparse
+import json
+import os
+import pickle
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+ARTIFACT_FORMAT_VERSION = 1
+ARTIFACT_MANIFEST = "manifest.json"
+TREE_ARRAYS_FILE = "trees.npz"
+XGBOOST_FILE = "model.json"
+
+
+class TreeEnsembleModel:
+    """
+    A forest of binary decision trees stored as flat arrays: node i of the
+    ensemble splits on feature[i] at threshold[i] and continues at left[i] or
+    right[i]; leaves (left == -1) hold the class-1 probability in value[i].
+    predict_proba averages the leaf probabilities over the trees, exactly like
+    scikit-learn's forests. Internal nodes keep their value too, which is what
+    the tree-path contributions are computed from.
+    """
+
+    def __init__(self, roots: np.ndarray, left: np.ndarray, right: np.ndarray, feature: np.ndarray,
+                 threshold: np.ndarray, value: np.ndarray, max_depth: int,
+                 feature_names: List[str], feature_importances: np.ndarray, classes: List[Any]):
+        self.roots = roots
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value
+        self.max_depth = max_depth
+        self.feature_names_in_ = np.array(feature_names, dtype=object)
+        self.feature_importances_ = feature_importances
+        self.classes_ = np.array(classes)
+
+    @classmethod
+    def from_sklearn(cls, model) -> "TreeEnsembleModel":
+        estimators = getattr(model, 'estimators_', None)
+        trees = [estimator.tree_ for estimator in estimators] if estimators is not None else [model.tree_]
+
+        roots, left, right, feature, threshold, value = [], [], [], [], [], []
+        offset = 0
+        for tree in trees:
+            is_leaf = tree.children_left == -1
+            roots.append(offset)
+            left.append(np.where(is_leaf, -1, tree.children_left + offset))
+            right.append(np.where(is_leaf, -1, tree.children_right + offset))
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            # Node values may be weighted counts or fractions depending on the
+            # scikit-learn version; normalising covers both
+            counts = tree.value[:, 0, :]
+            value.append(counts[:, 1] / counts.sum(axis=1))
+            offset += tree.node_count
+
+        return cls(
+            roots=np.array(roots, dtype=np.int32),
+            left=np.concatenate(left).astype(np.int32),
+            right=np.concatenate(right).astype(np.int32),
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            value=np.concatenate(value).astype(np.float64),
+            max_depth=max(tree.max_depth for tree in trees),
+            feature_names=[str(name) for name in model.feature_names_in_],
+            feature_importances=np.asarray(model.feature_importances_, dtype=np.float64),
+            classes=model.classes_.tolist(),
+        )
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "roots": self.roots, "left": self.left, "right": self.right, "feature": self.feature,
+            "threshold": self.threshold, "value": self.value,
+            "max_depth": np.array(self.max_depth), "feature_importances": self.feature_importances_,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, feature_names: List[str], classes: List[Any]) -> "TreeEnsembleModel":
+        return cls(
+            roots=arrays["roots"], left=arrays["left"], right=arrays["right"], feature=arrays["feature"],
+            threshold=arrays["threshold"], value=arrays["value"], max_depth=int(arrays["max_depth"]),
+            feature_names=feature_names, feature_importances=arrays["feature_importances"], classes=classes,
+        )
+
+    def _as_matrix(self, X) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            X = X[list(self.feature_names_in_)]
+        # scikit-learn trees compare float32 features against their thresholds
+        return np.asarray(X, dtype=np.float32).astype(np.float64)
+
+    def _traverse(self, X, with_contributions: bool = False):
+        """
+        Walk every row down every tree at once, one level per step. Returns the
+        leaf reached per (row, tree) and, if asked, the summed value change
+        credited to each (row, feature).
+        """
+        X = self._as_matrix(X)
+        n_rows, n_trees, n_features = len(X), len(self.roots), len(self.feature_names_in_)
+        nodes = np.broadcast_to(self.roots, (n_rows, n_trees)).copy()
+        rows = np.arange(n_rows)[:, None]
+        contributions = np.zeros(n_rows * n_features) if with_contributions else None
+        row_offsets = rows * n_features
+
+        for _ in range(self.max_depth):
+            left = self.left[nodes]
+            internal = left != -1
+            if not internal.any():
+                break
+            feature = self.feature[nodes]
+            go_left = X[rows, feature] <= self.threshold[nodes]
+            children = np.where(internal, np.where(go_left, left, self.right[nodes]), nodes)
+            if with_contributions:
+                # Leaves map to themselves, so they contribute nothing
+                delta = self.value[children] - self.value[nodes]
+                contributions += np.bincount((row_offsets + feature).ravel(), weights=delta.ravel(),
+                                             minlength=n_rows * n_features)
+            nodes = children
+
+        if with_contributions:
+            contributions = contributions.reshape(n_rows, n_features) / n_trees
+        return nodes, contributions
+
+    def leaf_indices(self, X) -> np.ndarray:
+        """Leaf node reached by every row in every tree, shape (rows, trees)."""
+        return self._traverse(X)[0]
+
+    def contributions(self, X) -> tuple:
+        """
+        Tree-path attributions: every split moves a row's prediction from the
+        parent node's value to the child's, and that change is credited to the
+        split feature. Returns (bias, contributions of shape (rows, features)),
+        where bias + contributions.sum(axis=1) is the predicted probability.
+        """
+        contributions = self._traverse(X, with_contributions=True)[1]
+        return float(self.value[self.roots].mean()), contributions
+
+    def predict_proba(self, X) -> np.ndarray:
+        positive = self.value[self.leaf_indices(X)].mean(axis=1)
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[(self.predict_proba(X)[:, 1] > 0.5).astype(int)]
+
+
+class LoadedModel:
+    """A model plus the metadata it was exported with."""
+
+    def __init__(self, model, feature_names: Optional[List[str]], encoders: Optional[Dict[str, Any]],
+                 version: str, model_format: str, load_seconds: float = None, warmup_seconds: float = None):
+        self.model = model
+        # Array form of the model used for per-application contributions, when it has one
+        self.explainer = None
+        self.feature_names = feature_names
+        self.encoders = encoders
+        self.version = version
+        self.model_format = model_format
+        self.load_seconds = load_seconds
+        self.warmup_seconds = warmup_seconds
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "format": self.model_format,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+        }
+
+
+def read_artifact_manifest(artifact_dir: str) -> Optional[Dict[str, Any]]:
+    """The current version's manifest, or None if no artifact has been exported."""
+    try:
+        with open(os.path.join(artifact_dir, ARTIFACT_MANIFEST)) as f:
+            pointer = json.load(f)
+        with open(os.path.join(artifact_dir, pointer["path"], ARTIFACT_MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def model_available(artifact_dir: str, pickle_path: str) -> bool:
+    return read_artifact_manifest(artifact_dir) is not None or os.path.exists(pickle_path)
+
+
+def export_artifact(model, artifact_dir: str, encoders: Optional[Dict[str, Any]] = None,
+                    version: Optional[str] = None) -> str:
+    """
+    Write `model` as a new artifact version and make it current. Tree
+    ensembles are only exported as arrays after checking that the arrays
+    reproduce the model's predictions.
+    """
+    version = version or time.strftime("%Y%m%d-%H%M%S")
+    version_dir = os.path.join(artifact_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    feature_names = [str(name) for name in getattr(model, 'feature_names_in_', [])] or None
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "version": version,
+        "model_type": type(model).__name__,
+        "feature_names": feature_names,
+        "encoders": encoders,
+        "created_at": pd.Timestamp.now().isoformat(),
+    }
+
+    if hasattr(model, 'get_booster'):
+        model.get_booster().save_model(os.path.join(version_dir, XGBOOST_FILE))
+        manifest.update(format="xgboost_json", file=XGBOOST_FILE, classes=np.asarray(model.classes_).tolist())
+    elif _is_sklearn_tree_classifier(model) and feature_names:
+        tree_model = TreeEnsembleModel.from_sklearn(model)
+        check = pd.DataFrame(np.random.default_rng(0).normal(size=(256, len(feature_names))) * 1000,
+                             columns=feature_names)
+        if not np.allclose(tree_model.predict_proba(check)[:, 1], model.predict_proba(check)[:, 1]):
+            raise ValueError("Tree arrays do not reproduce the model's predictions")
+        np.savez(os.path.join(version_dir, TREE_ARRAYS_FILE), **tree_model.to_arrays())
+        manifest.update(format="tree_arrays", file=TREE_ARRAYS_FILE, classes=tree_model.classes_.tolist())
+    else:
+        raise ValueError(f"No artifact format for {type(model).__name__}; keep serving it from the pickle file")
+
+    with open(os.path.join(version_dir, ARTIFACT_MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    pointer_path = os.path.join(artifact_dir, ARTIFACT_MANIFEST)
+    with open(pointer_path + ".tmp", "w") as f:
+        json.dump({"path": version}, f)
+    os.replace(pointer_path + ".tmp", pointer_path)
+    return version_dir
+
+
+def _is_sklearn_tree_classifier(model) -> bool:
+    estimators = getattr(model, 'estimators_', None)
+    if estimators is not None and not isinstance(estimators, list):
+        # Gradient boosting keeps a 2-D array of regressors; not supported
+        return False
+    trees = estimators if estimators is not None else [model]
+    return (hasattr(model, 'predict_proba') and len(getattr(model, 'classes_', [])) == 2
+            and all(hasattr(tree, 'tree_') for tree in trees))
+
+
+def _load_artifact(artifact_dir: str, manifest: Dict[str, Any]) -> LoadedModel:
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported model artifact format: {manifest.get('format_version')}")
+
+    path = os.path.join(artifact_dir, manifest["version"], manifest["file"])
+    if manifest["format"] == "tree_arrays":
+        with np.load(path, allow_pickle=False) as arrays:
+            model = TreeEnsembleModel.from_arrays(arrays, manifest["feature_names"], manifest["classes"])
+    elif manifest["format"] == "xgboost_json":
+        import xgboost
+        model = xgboost.XGBClassifier()
+        model.load_model(path)
+    else:
+        raise ValueError(f"Unknown model artifact format: {manifest['format']}")
+
+    return LoadedModel(model, manifest.get("feature_names"), manifest.get("encoders"),
+                       manifest["version"], manifest["format"])
+
+
+def warm_up(loaded: LoadedModel):
+    """Run one prediction so lazy initialisation happens before the first request."""
+    feature_names = loaded.feature_names or [
+        str(name) for name in getattr(loaded.model, 'feature_names_in_', [])
+    ]
+    if not feature_names:
+        return
+    started = time.time()
+    sample = pd.DataFrame(np.zeros((1, len(feature_names))), columns=feature_names)
+    if hasattr(loaded.model, 'predict_proba'):
+        loaded.model.predict_proba(sample)
+    else:
+        loaded.model.predict(sample)
+    loaded.warmup_seconds = time.time() - started
+
+
+def load_model(artifact_dir: str, pickle_path: str) -> LoadedModel:
+    """
+    Load the current artifact from `artifact_dir`, falling back to unpickling
+    `pickle_path` when there is none, then warm the model up.
+    """
+    started = time.time()
+    manifest = read_artifact_manifest(artifact_dir)
+    if manifest is not None:
+        loaded = _load_artifact(artifact_dir, manifest)
+    else:
+        with open(pickle_path, 'rb') as f:
+            model = pickle.load(f)
+        feature_names = [str(name) for name in getattr(model, 'feature_names_in_', [])] or None
+        stat = os.stat(pickle_path)
+        loaded = LoadedModel(model, feature_names, None, f"pickle-{stat.st_mtime_ns}", "pickle")
+    if isinstance(loaded.model, TreeEnsembleModel):
+        loaded.explainer = loaded.model
+    elif _is_sklearn_tree_classifier(loaded.model) and loaded.feature_names:
+        loaded.explainer = TreeEnsembleModel.from_sklearn(loaded.model)
+    loaded.load_seconds = time.time() - started
+    warm_up(loaded)
+    return loaded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage Siddhi credit model artifacts")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Export a pickled model as a versioned artifact")
+    export_parser.add_argument("pickle_path")
+    export_parser.add_argument("--encoders", help="Categorical encoders JSON to bundle with the model")
+    export_parser.add_argument("--out", help="Artifact directory (default: <pickle name>_artifact)")
+    export_parser.add_argument("--version", help="Version label (default: a timestamp)")
+    args = parser.parse_args()
+
+    with open(args.pickle_path, 'rb') as f:
+        source_model = pickle.load(f)
+    encoder_tables = None
+    if args.encoders:
+        with open(args.encoders) as f:
+            encoder_tables = json.load(f)["columns"]
+    out_dir = args.out or os.path.splitext(args.pickle_path)[0] + "_artifact"
+    written = export_artifact(source_model, out_dir, encoder_tables, args.version)
+    print(f"Model artifact written to {written}")
+
+    reloaded = load_model(out_dir, args.pickle_path)
+    print(f"Reloaded {reloaded.model_format} artifact in {reloaded.load_seconds * 1000:.1f} ms "
+          f"(warm-up {reloaded.warmup_seconds * 1000:.1f} ms)")
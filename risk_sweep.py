@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Portfolio Risk Sweep for Siddhi Credit Scoring
+
+Re-scores every beneficiary's latest loan month through the credit model and
+stores the results in a `risk_scores` table indexed on score, so the
+dashboard can list the highest-risk borrowers without scoring on demand.
+
+The scores live in their own database file, attached read-only by the API,
+so a sweep's writes never change the beneficiaries database and never
+invalidate the caches keyed on it.
+
+The latest month per id is read in id-ordered chunks through the
+(id, month_of_loan) index, each chunk is scored as one vectorized batch (in
+the inference worker processes when the API runs them), and the scores are
+written to a staging table that replaces `risk_scores` in one transaction
+at the end, so readers never see a half-finished sweep.
+
+Ingestion leaves the scores in place, but they describe the data as of
+`scored_at`; run the sweep again afterwards:
+
+    python risk_sweep.py
+"""
+
+import os
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+RISK_SCORES_DB_FILE_PATH = "siddhi_db_risk.sqlite"
+RISK_SCORES_SCHEMA = "risk"  # name the scores database is attached under
+RISK_SCORES_TABLE = "risk_scores"
+RISK_SCORES_STAGING_TABLE = "risk_scores_staging"
+
+# Beneficiaries scored per batch
+SWEEP_CHUNK_SIZE = 20000
+
+
+def iter_latest_months(conn: sqlite3.Connection, table_name: str, columns: List[str],
+                       chunk_size: int = SWEEP_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Yield the latest month_of_loan row of every id, `chunk_size` ids at a
+    time, continuing from the last id seen (keyset paging on the id index).
+    """
+    keys = ["id", "month_of_loan"]
+    select_columns = ", ".join(f"b.{col}" for col in keys + [col for col in columns if col not in keys])
+    query = f"""
+        SELECT {select_columns}
+        FROM (
+            SELECT id, MAX(month_of_loan) AS latest_month
+            FROM {table_name}
+            WHERE id > ?
+            GROUP BY id
+            ORDER BY id
+            LIMIT ?
+        ) latest
+        JOIN {table_name} b ON b.id = latest.id AND b.month_of_loan = latest.latest_month
+        ORDER BY b.id
+    """
+    last_id = -1
+    while True:
+        cursor = conn.execute(query, (last_id, chunk_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        chunk = pd.DataFrame.from_records(rows, columns=[column[0] for column in cursor.description])
+        # An id can have duplicate rows for its latest month; score it once
+        chunk = chunk.drop_duplicates(subset="id", keep="last")
+        yield chunk
+        last_id = int(chunk["id"].iloc[-1])
+
+
+def open_scores_connection(path: Optional[str] = None) -> sqlite3.Connection:
+    """Writable connection to the scores database, in WAL mode so readers are never blocked."""
+    path = path or RISK_SCORES_DB_FILE_PATH
+    conn = sqlite3.connect(path, timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def attach_scores(conn: sqlite3.Connection, path: Optional[str] = None) -> bool:
+    """
+    Attach the scores database read-only to a beneficiaries connection (opened
+    with uri=True) as RISK_SCORES_SCHEMA. Returns False if no sweep has run yet.
+    """
+    path = path or RISK_SCORES_DB_FILE_PATH
+    attached = [row[1] for row in conn.execute("PRAGMA database_list")]
+    if RISK_SCORES_SCHEMA in attached:
+        return True
+    if not os.path.exists(path):
+        return False
+    conn.execute(f"ATTACH DATABASE ? AS {RISK_SCORES_SCHEMA}", (f"file:{path}?mode=ro",))
+    return True
+
+
+def create_staging_table(conn: sqlite3.Connection):
+    conn.execute(f"DROP TABLE IF EXISTS {RISK_SCORES_STAGING_TABLE}")
+    conn.execute(f"""
+        CREATE TABLE {RISK_SCORES_STAGING_TABLE} (
+            id INTEGER PRIMARY KEY,
+            month_of_loan INTEGER,
+            score REAL,
+            risk_level TEXT,
+            model_version TEXT,
+            scored_at TEXT
+        )
+    """)
+
+
+def publish_scores(conn: sqlite3.Connection):
+    """Swap the finished staging table in as risk_scores, with its score index."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {RISK_SCORES_TABLE}")
+        conn.execute(f"ALTER TABLE {RISK_SCORES_STAGING_TABLE} RENAME TO {RISK_SCORES_TABLE}")
+        conn.execute(f"CREATE INDEX idx_risk_scores_score ON {RISK_SCORES_TABLE} (score DESC)")
+        conn.execute(f"CREATE INDEX idx_risk_scores_level_score ON {RISK_SCORES_TABLE} (risk_level, score DESC)")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def run_sweep(read_conn: sqlite3.Connection, write_conn: sqlite3.Connection, table_name: str,
+              feature_columns: List[str], score_chunk: Callable[[pd.DataFrame], np.ndarray],
+              risk_levels: Callable[[np.ndarray], np.ndarray], model_version: str,
+              chunk_size: int = SWEEP_CHUNK_SIZE, progress: Callable[[Dict[str, Any]], None] = None) -> Dict[str, Any]:
+    """
+    Score the latest month of every beneficiary and publish the results.
+    `read_conn` reads `table_name`; `write_conn` is the scores database.
+
+    `score_chunk` turns a frame of raw feature columns into default
+    probabilities; `risk_levels` maps probabilities to low/medium/high.
+    """
+    started = time.time()
+    scored_at = pd.Timestamp.now().isoformat()
+    stats = {"scored": 0, "chunks": 0, "risk_level_counts": {"low": 0, "medium": 0, "high": 0}}
+
+    create_staging_table(write_conn)
+    write_conn.commit()
+
+    for chunk in iter_latest_months(read_conn, table_name, feature_columns, chunk_size):
+        probabilities = score_chunk(chunk[feature_columns])
+        levels = risk_levels(probabilities)
+
+        write_conn.executemany(
+            f"INSERT INTO {RISK_SCORES_STAGING_TABLE} VALUES (?, ?, ?, ?, ?, ?)",
+            zip(chunk["id"].tolist(), chunk["month_of_loan"].tolist(), probabilities.tolist(),
+                levels.tolist(), [model_version] * len(chunk), [scored_at] * len(chunk))
+        )
+        write_conn.commit()
+
+        stats["scored"] += len(chunk)
+        stats["chunks"] += 1
+        for level, count in zip(*np.unique(levels, return_counts=True)):
+            stats["risk_level_counts"][str(level)] += int(count)
+        elapsed = max(time.time() - started, 1e-9)
+        stats["rows_per_second"] = round(stats["scored"] / elapsed, 1)
+        if progress is not None:
+            progress(stats)
+
+    publish_scores(write_conn)
+    stats["seconds"] = round(time.time() - started, 3)
+    stats["model_version"] = model_version
+    stats["scored_at"] = scored_at
+    return stats
+
+
+if __name__ == "__main__":
+    import main
+
+    if main.load_ai_model() is None:
+        raise SystemExit("Model not available - check MODEL_PATH / MODEL_ARTIFACT_DIR")
+    try:
+        result = main.run_risk_sweep(
+            progress=lambda stats: print(f"Scored {stats['scored']} beneficiaries "
+                                         f"({stats['rows_per_second']:,.0f} rows/sec)")
+        )
+        print(f"Risk sweep finished in {result['seconds']:.1f}s: {result['risk_level_counts']}")
+    finally:
+        if main.inference_pool is not None:
+            main.inference_pool.shutdown()
@@ -0,0 +1,131 @@
+"""Shared fixtures for the Siddhi Credit Scoring tests."""
+
+import os
+import pickle
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The application modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ingest_data
+import inference
+import main
+import model_registry
+
+CATEGORY_VALUES = {
+    'grade': list("ABCDEFG"),
+    'sub_grade': [f"{grade}{level}" for grade in "ABCDEFG" for level in range(1, 6)],
+    'home_ownership': ["MORTGAGE", "OWN", "RENT"],
+    'verification_status': ["Not Verified", "Source Verified", "Verified"],
+    'purpose': ["car", "credit_card", "debt_consolidation", "education", "home_improvement"],
+    'application_type': ["Individual", "Joint App"],
+    'financial_state': ["Crisis", "Stable", "Stressed"],
+}
+
+
+def make_applications(count, seed=0):
+    """Random LoanApplicationInput records."""
+    rng = np.random.default_rng(seed)
+    records = []
+    for _ in range(count):
+        record = {}
+        for name, field in main.LoanApplicationInput.model_fields.items():
+            if name in CATEGORY_VALUES:
+                record[name] = str(rng.choice(CATEGORY_VALUES[name]))
+            elif field.annotation is int:
+                record[name] = int(rng.integers(0, 12))
+            else:
+                record[name] = float(np.round(rng.uniform(0, 100), 2))
+        records.append(record)
+    return records
+
+
+def make_portfolio(ids, months=3, seed=0):
+    """Beneficiary rows with every API column: one row per (id, month_of_loan)."""
+    records = []
+    for offset, application in enumerate(make_applications(len(ids), seed=seed)):
+        rng = np.random.default_rng((seed, offset))
+        application["initial_fico_score"] = int(rng.integers(550, 850))
+        for month in range(1, months + 1):
+            records.append({
+                **application,
+                "id": ids[offset],
+                "month_of_loan": month,
+                "principal_remaining": round(application["loan_amnt"] * (1 - month / (months + 1)), 2),
+                "financial_state": str(rng.choice(CATEGORY_VALUES["financial_state"])),
+                "missed_payments_last_3m": int(rng.integers(0, 4)),
+                "is_defaulted": int(rng.random() < 0.2),
+            })
+    return pd.DataFrame.from_records(records)
+
+
+@pytest.fixture
+def api_database(tmp_path, monkeypatch):
+    """
+    Point ingest_data.py and main.py at a database in a temporary directory,
+    with fresh process state. Returns a function that ingests a DataFrame.
+    """
+    db_path = str(tmp_path / "siddhi_db.sqlite")
+    snapshot_dir = str(tmp_path / "columns")
+    monkeypatch.setattr(ingest_data, "DB_FILE_PATH", db_path)
+    monkeypatch.setattr(ingest_data, "SHADOW_DB_FILE_PATH", db_path + ".shadow")
+    monkeypatch.setattr(ingest_data, "COLUMN_SNAPSHOT_DIR", snapshot_dir)
+    monkeypatch.setattr(main, "DB_FILE_PATH", db_path)
+    monkeypatch.setattr(main, "COLUMN_SNAPSHOT_DIR", snapshot_dir)
+    monkeypatch.setattr(main, "DB_STATE_CHECK_INTERVAL", 0.0)
+    monkeypatch.setattr(main, "db_state", main.DatabaseState())
+    monkeypatch.setattr(main, "analytics_cache", main.AnalyticsCache())
+    monkeypatch.setattr(main, "response_cache", main.ResponseCache())
+    monkeypatch.setattr(main, "_filter_count_cache", type(main._filter_count_cache)())
+    main.invalidate_db_connections()
+
+    def ingest(df, incremental=False):
+        csv_path = tmp_path / "input.csv"
+        df.to_csv(csv_path, index=False)
+        monkeypatch.setattr(ingest_data, "CSV_FILE_PATH", str(csv_path))
+        ingest_data.ingest_data(incremental=incremental)
+        return db_path
+
+    yield ingest
+    main.close_db_connections()
+
+
+@pytest.fixture(scope="session")
+def trained_model(tmp_path_factory):
+    """A small random forest trained on encoded random applications, loaded through the registry."""
+    sklearn_ensemble = pytest.importorskip("sklearn.ensemble")
+    encoders = {col: main.CategoryEncoder(sorted(values)) for col, values in CATEGORY_VALUES.items()}
+
+    df = pd.DataFrame.from_records(make_applications(600, seed=1))
+    for col, encoder in encoders.items():
+        df[col] = encoder.encode(df[col])
+    rng = np.random.default_rng(2)
+    risk = df["dti"] / 100 + df["missed_payments_last_3m"] / 12 + (df["financial_state"] == 0)
+    labels = (risk + rng.normal(0, 0.3, len(df)) > 1.0).astype(int)
+
+    model = sklearn_ensemble.RandomForestClassifier(n_estimators=8, max_depth=5, random_state=0)
+    model.fit(df, labels)
+
+    pickle_path = tmp_path_factory.mktemp("model") / "credit_model.pkl"
+    with open(pickle_path, "wb") as f:
+        pickle.dump(model, f)
+    loaded = model_registry.load_model(str(pickle_path.parent / "no_artifact"), str(pickle_path))
+    return loaded, encoders
+
+
+@pytest.fixture
+def scoring_model(trained_model, monkeypatch):
+    """Install the trained model in main for in-process scoring (no worker pool, no database)."""
+    loaded, encoders = trained_model
+    monkeypatch.setattr(main, "INFERENCE_WORKERS", 0)
+    monkeypatch.setattr(main, "inference_pool", None)
+    monkeypatch.setattr(main, "loaded_model", loaded)
+    monkeypatch.setattr(main, "model_info", inference.describe_model(loaded))
+    monkeypatch.setattr(main, "category_encoders", encoders)
+    monkeypatch.setattr(main, "prediction_cache", main.PredictionCache())
+    monkeypatch.setattr(main, "prediction_batcher", None)
+    return loaded
@@ -0,0 +1,209 @@
+"""
+Tests for the dashboard aggregates: every engine must return the payloads the
+original per-endpoint SQL queries returned.
+"""
+
+import json
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from analytics import load_aggregate_cube
+from columnar import SNAPSHOT_MANIFEST, ColumnarStore, read_snapshot_manifest
+from conftest import make_portfolio
+
+TABLE = "beneficiaries"
+
+
+def baseline_payloads(db_path):
+    """The /kpi_summary, /loan_analytics, /risk_analytics and /portfolio_trends queries as first written."""
+    conn = sqlite3.connect(db_path)
+    sql = lambda query: pd.read_sql(query.format(table=TABLE), conn)
+    records = lambda df: df.to_dict('records')
+
+    total = sql("SELECT COUNT(*) as count FROM {table}")['count'][0]
+    defaults = sql("SELECT COUNT(*) as count FROM {table} WHERE is_defaulted = 1")['count'][0]
+    default_rate = (defaults / total * 100) if total > 0 else 0
+    kpi_summary = {
+        "overview": {
+            "total_beneficiaries": int(total),
+            "total_loan_amount": float(sql("SELECT SUM(loan_amnt) as total FROM {table}")['total'][0] or 0),
+            "avg_loan_amount": float(sql("SELECT AVG(loan_amnt) as avg FROM {table}")['avg'][0] or 0),
+            "avg_credit_score": float(sql("SELECT AVG(initial_fico_score) as avg_credit FROM {table}")['avg_credit'][0] or 0),
+            "default_rate_percent": float(default_rate)
+        },
+        "distributions": {
+            "grade": records(sql("SELECT grade, COUNT(*) as count FROM {table} GROUP BY grade ORDER BY grade")),
+            "purpose": records(sql("SELECT purpose, COUNT(*) as count FROM {table} GROUP BY purpose ORDER BY count DESC LIMIT 5")),
+            "home_ownership": records(sql("SELECT home_ownership, COUNT(*) as count FROM {table} GROUP BY home_ownership ORDER BY count DESC"))
+        },
+        "risk_metrics": {"total_defaults": int(defaults), "default_rate": float(default_rate)}
+    }
+
+    loan_analytics = {
+        "loan_by_grade": records(sql("""
+            SELECT grade, COUNT(*) as loan_count, AVG(loan_amnt) as avg_amount, SUM(loan_amnt) as total_amount,
+                   MIN(loan_amnt) as min_amount, MAX(loan_amnt) as max_amount
+            FROM {table} GROUP BY grade ORDER BY grade""")),
+        "purpose_analysis": records(sql("""
+            SELECT purpose, COUNT(*) as loan_count, AVG(loan_amnt) as avg_amount, AVG(initial_fico_score) as avg_credit,
+                   AVG(CAST(is_defaulted AS FLOAT)) * 100 as default_rate
+            FROM {table} GROUP BY purpose ORDER BY loan_count DESC LIMIT 10""")),
+        "term_analysis": records(sql("""
+            SELECT term, COUNT(*) as loan_count, AVG(loan_amnt) as avg_amount, AVG(int_rate) as avg_interest_rate
+            FROM {table} GROUP BY term ORDER BY term""")),
+    }
+
+    risk_analytics = {
+        "default_by_grade": records(sql("""
+            SELECT grade, COUNT(*) as total_loans, SUM(is_defaulted) as defaults,
+                   AVG(CAST(is_defaulted AS FLOAT)) * 100 as default_rate, AVG(initial_fico_score) as avg_credit
+            FROM {table} GROUP BY grade ORDER BY grade""")),
+        "credit_risk_analysis": records(sql("""
+            SELECT CASE
+                       WHEN initial_fico_score < 580 THEN 'Poor (< 580)'
+                       WHEN initial_fico_score < 670 THEN 'Fair (580-669)'
+                       WHEN initial_fico_score < 740 THEN 'Good (670-739)'
+                       WHEN initial_fico_score < 800 THEN 'Very Good (740-799)'
+                       ELSE 'Excellent (800+)'
+                   END as credit_range,
+                   COUNT(*) as loan_count, AVG(CAST(is_defaulted AS FLOAT)) * 100 as default_rate,
+                   AVG(loan_amnt) as avg_loan_amount
+            FROM {table} GROUP BY credit_range ORDER BY MIN(initial_fico_score)""")),
+        "home_ownership_risk": records(sql("""
+            SELECT home_ownership, COUNT(*) as total_loans, AVG(CAST(is_defaulted AS FLOAT)) * 100 as default_rate,
+                   AVG(loan_amnt) as avg_loan_amount, AVG(annual_inc) as avg_income
+            FROM {table} GROUP BY home_ownership ORDER BY default_rate DESC""")),
+    }
+
+    base = sql("""
+        SELECT AVG(initial_fico_score) as avg_credit_score, AVG(CAST(is_defaulted AS FLOAT)) * 100 as default_rate,
+               COUNT(*) as total_loans, AVG(loan_amnt) as avg_loan_amount
+        FROM {table}""").iloc[0]
+    grade_health = sql("SELECT grade, COUNT(*) as count FROM {table} GROUP BY grade ORDER BY grade")
+    weights = {'A': 10, 'B': 8, 'C': 6, 'D': 4, 'E': 2, 'F': 1, 'G': 0.5}
+    health = sum(row['count'] * weights.get(row['grade'], 5) for _, row in grade_health.iterrows()) / grade_health['count'].sum()
+    portfolio_trends = {
+        "portfolio_health": [
+            {"avg_credit": round(base['avg_credit_score'] + i * 2, 0),
+             "default_rate": round(max(0, base['default_rate'] - i * 0.1), 2)}
+            for i in range(6)
+        ],
+        "current_metrics": {
+            "health_score": round(health, 1),
+            "avg_credit_score": round(base['avg_credit_score'], 0),
+            "default_rate": round(base['default_rate'], 2),
+            "total_loans": int(base['total_loans'])
+        }
+    }
+    conn.close()
+    return {"/kpi_summary": kpi_summary, "/loan_analytics": loan_analytics,
+            "/risk_analytics": risk_analytics, "/portfolio_trends": portfolio_trends}
+
+
+def assert_matches(actual, expected, path="payload"):
+    """Compare JSON payloads, with floats compared approximately."""
+    if isinstance(expected, dict):
+        assert set(actual) >= set(expected), path
+        for key in expected:
+            assert_matches(actual[key], expected[key], f"{path}.{key}")
+    elif isinstance(expected, list):
+        assert len(actual) == len(expected), path
+        for index, (got, want) in enumerate(zip(actual, expected)):
+            assert_matches(got, want, f"{path}[{index}]")
+    elif isinstance(expected, (float, np.floating)):
+        assert actual == pytest.approx(float(expected), rel=1e-9, abs=1e-9), path
+    elif isinstance(expected, (int, np.integer)):
+        assert actual == int(expected), path
+    else:
+        assert actual == expected, path
+
+
+def fetch_payloads(client):
+    payloads = {}
+    for endpoint in ("/kpi_summary", "/loan_analytics", "/risk_analytics", "/portfolio_trends"):
+        response = client.get(endpoint)
+        assert response.status_code == 200, response.text
+        payloads[endpoint] = response.json()
+    # The health scores carry random noise; the other trend fields are deterministic
+    for month in payloads["/portfolio_trends"]["portfolio_health"]:
+        month.pop("score")
+        month.pop("month")
+    return payloads
+
+
+@pytest.fixture
+def analytics_db(api_database):
+    # Distinct group sizes and default rates, so ORDER BY count / default_rate
+    # has no ties that the engines could break differently
+    df = make_portfolio(list(range(1, 121)), months=2, seed=11)
+    df.loc[df.index[:30], "purpose"] = "debt_consolidation"
+    df.loc[df.index[30:45], "home_ownership"] = "RENT"
+    df.loc[(df["purpose"] == "education") & (df["id"] % 7 == 0), "purpose"] = "car"
+    for column in ("purpose", "home_ownership"):
+        assert df[column].value_counts().is_unique
+    assert df.groupby("home_ownership")["is_defaulted"].mean().is_unique
+    return api_database(df)
+
+
+def sorted_cube(cube):
+    dimensions = ['grade', 'purpose', 'term', 'home_ownership', 'credit_range']
+    return cube.sort_values(dimensions).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("engine", ["sqlite", "columnar"])
+def test_cached_payloads_match_the_original_queries(analytics_db, engine, monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "ANALYTICS_ENGINE", engine)
+    # No snapshot: the columnar engine loads its arrays from SQLite
+    monkeypatch.setattr(main, "COLUMN_SNAPSHOT_DIR", str(tmp_path / "no_snapshot"))
+    expected = baseline_payloads(analytics_db)
+    assert_matches(fetch_payloads(TestClient(main.app)), expected)
+
+
+def test_columnar_cube_equals_the_sql_cube(analytics_db):
+    conn = sqlite3.connect(analytics_db)
+    expected = load_aggregate_cube(conn, TABLE)
+    # Small chunks exercise merging the per-chunk category codes
+    cube = ColumnarStore.from_sqlite(conn, TABLE, chunk_size=37).aggregate_cube()
+    conn.close()
+
+    assert list(cube.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(sorted_cube(cube), sorted_cube(expected), check_dtype=False)
+
+
+def test_ingested_snapshot_matches_the_sql_cube(analytics_db):
+    conn = sqlite3.connect(analytics_db)
+    expected = load_aggregate_cube(conn, TABLE)
+    ingest_generation = main.read_ingest_generation(conn)
+    conn.close()
+
+    assert read_snapshot_manifest(main.COLUMN_SNAPSHOT_DIR)["generation"] == ingest_generation
+    store = ColumnarStore.load_snapshot(main.COLUMN_SNAPSHOT_DIR)
+    assert all(isinstance(array, np.memmap) for array in store.columns.values())
+    pd.testing.assert_frame_equal(sorted_cube(store.aggregate_cube()), sorted_cube(expected), check_dtype=False)
+
+
+def test_columnar_engine_serves_from_the_snapshot(analytics_db, monkeypatch):
+    monkeypatch.setattr(main, "ANALYTICS_ENGINE", "columnar")
+
+    def no_sqlite_load(*args, **kwargs):
+        raise AssertionError("the current snapshot should have been used")
+
+    monkeypatch.setattr(ColumnarStore, "from_sqlite", classmethod(no_sqlite_load))
+    assert_matches(fetch_payloads(TestClient(main.app)), baseline_payloads(analytics_db))
+
+
+def test_stale_snapshot_is_not_used(analytics_db, monkeypatch):
+    # A snapshot written for another ingest must not be served
+    manifest = read_snapshot_manifest(main.COLUMN_SNAPSHOT_DIR)
+    manifest["generation"] = "stale"
+    with open(os.path.join(main.COLUMN_SNAPSHOT_DIR, SNAPSHOT_MANIFEST), "w") as f:
+        json.dump(manifest, f)
+
+    store = main.load_columnar_store()
+    assert not any(isinstance(array, np.memmap) for array in store.columns.values())
@@ -0,0 +1,121 @@
+"""Tests for compression.py: content negotiation and the ASGI compression middleware."""
+
+import asyncio
+import gzip
+import zlib
+
+import pytest
+
+import compression
+from compression import CompressionMiddleware, choose_encoding
+
+BODY = b'{"rows":[' + b",".join(b'{"id":%d,"grade":"B"}' % i for i in range(200)) + b"]}"
+
+
+def make_app(status=200, body=BODY, chunks=None, content_type=b"application/json"):
+    """An ASGI app sending `body` in one message, or `chunks` as a stream."""
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", content_type), (b"vary", b"Origin")]})
+        if chunks is None:
+            await send({"type": "http.response.body", "body": body})
+            return
+        for index, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": index < len(chunks) - 1})
+    return app
+
+
+def call(app, accept_encoding="gzip", minimum_size=compression.COMPRESSION_MIN_SIZE):
+    """Run one request through the middleware and return the messages it sent."""
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    asyncio.run(CompressionMiddleware(app, minimum_size)(scope, receive, send))
+    return messages
+
+
+def headers_of(messages):
+    return dict(messages[0]["headers"])
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip", "gzip"),
+    ("gzip, br", "br" if compression.brotli is not None else "gzip"),
+    ("br;q=0, gzip;q=0.5", "gzip"),
+    ("gzip;q=0", None),
+    ("*;q=0", None),
+    ("identity", None),
+    ("", None),
+])
+def test_choose_encoding(accept_encoding, expected):
+    assert choose_encoding(accept_encoding) == expected
+
+
+def test_q_zero_excludes_an_encoding_matched_by_wildcard():
+    assert choose_encoding("*, gzip;q=0") == ("br" if compression.brotli is not None else None)
+
+
+def test_large_body_is_gzipped():
+    messages = call(make_app())
+    headers = headers_of(messages)
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"vary"] == b"Origin, Accept-Encoding"
+    assert int(headers[b"content-length"]) == len(messages[1]["body"])
+    assert gzip.decompress(messages[1]["body"]) == BODY
+
+
+def test_small_body_passes_through():
+    messages = call(make_app(body=b'{"ok":true}'))
+    assert b"content-encoding" not in headers_of(messages)
+    assert messages[1]["body"] == b'{"ok":true}'
+
+
+@pytest.mark.parametrize("status", [204, 304])
+def test_bodiless_statuses_pass_through(status):
+    messages = call(make_app(status=status, body=b""))
+    assert messages[0]["status"] == status
+    assert b"content-encoding" not in headers_of(messages)
+
+
+def test_incompressible_content_type_passes_through():
+    messages = call(make_app(content_type=b"image/png"))
+    assert b"content-encoding" not in headers_of(messages)
+    assert messages[1]["body"] == BODY
+
+
+def test_identity_request_is_not_compressed():
+    messages = call(make_app(), accept_encoding="gzip;q=0")
+    assert b"content-encoding" not in headers_of(messages)
+    assert messages[1]["body"] == BODY
+
+
+def test_streamed_chunks_are_flushed_as_they_arrive():
+    chunks = [b'{"id":%d}\n' % i for i in range(5)]
+    messages = call(make_app(chunks=chunks, content_type=b"application/x-ndjson"))
+    assert headers_of(messages)[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers_of(messages)
+
+    # Every chunk decodes completely as soon as it is received
+    decoder = zlib.decompressobj(31)
+    bodies = [message["body"] for message in messages[1:]]
+    for chunk, body in zip(chunks, bodies):
+        assert decoder.decompress(body) == chunk
+    assert decoder.eof
+    assert [message["more_body"] for message in messages[1:]] == [True] * 4 + [False]
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli is not installed")
+def test_streamed_chunks_with_brotli():
+    chunks = [b'{"id":%d}\n' % i for i in range(5)]
+    messages = call(make_app(chunks=chunks, content_type=b"application/x-ndjson"), accept_encoding="br")
+    assert headers_of(messages)[b"content-encoding"] == b"br"
+
+    decoder = compression.brotli.Decompressor()
+    for chunk, message in zip(chunks, messages[1:]):
+        assert decoder.process(message["body"]) == chunk
@@ -0,0 +1,77 @@
+"""Tests for index_planner.py: planning the workload's indexes."""
+
+import sqlite3
+
+import index_planner
+import main
+from conftest import make_portfolio
+
+TABLE_COLUMNS = ["id", "month_of_loan", "grade", "purpose", "home_ownership", "term", "loan_amnt",
+                 "initial_fico_score", "is_defaulted", "int_rate", "annual_inc"] + index_planner.TIMELINE_COLUMNS
+
+
+def test_keyset_page_index_is_not_covered_by_a_longer_prefix():
+    planned = {index["name"]: index["columns"] for index in index_planner.plan_indexes(TABLE_COLUMNS)}
+    # (grade, purpose, is_defaulted, initial_fico_score) cannot serve ORDER BY rowid after the equality columns
+    assert planned["idx_plan_filter_grade_purpose_default_fico"][:3] == ["grade", "purpose", "is_defaulted"]
+    assert planned["idx_plan_page_grade_purpose_default"] == ["grade", "purpose", "is_defaulted"]
+
+
+def test_keyset_page_index_is_skipped_when_an_exact_index_exists():
+    planned = index_planner.plan_indexes(TABLE_COLUMNS, existing=[["purpose", "is_defaulted"], ["loan_amnt"]])
+    names = [index["name"] for index in planned]
+    assert "idx_plan_page_purpose_default" not in names
+    assert "idx_plan_sort_loan_amount" not in names
+
+
+def test_filtered_pages_use_their_page_index():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(f"CREATE TABLE beneficiaries ({', '.join(TABLE_COLUMNS)})")
+    conn.execute("CREATE INDEX idx_loan_amnt ON beneficiaries (loan_amnt)")
+    index_planner.create_planned_indexes(conn, "beneficiaries")
+
+    plan = [row[3] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM beneficiaries WHERE grade = ? AND purpose = ? AND is_defaulted = ? "
+        "AND rowid > ? ORDER BY rowid LIMIT 101", [None] * 4
+    )]
+    assert plan == ["SEARCH beneficiaries USING INDEX idx_plan_page_grade_purpose_default "
+                    "(grade=? AND purpose=? AND is_defaulted=? AND rowid>?)"]
+    conn.close()
+
+
+def test_workload_sql_pages_like_the_api():
+    shape = next(shape for shape in index_planner.WORKLOAD if shape["name"] == "sort_loan_amount")
+    keyset_condition, _, order_clause = main.build_keyset_clauses(
+        "loan_amnt", "asc", main.encode_page_cursor("loan_amnt", "asc", 1000.0, 1)
+    )
+    sql = index_planner.workload_sql(shape, "beneficiaries")
+    assert f"WHERE {keyset_condition}{order_clause} LIMIT ? OFFSET ?" in sql
+
+
+def test_explain_flags_temp_b_tree_sorts():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(f"CREATE TABLE beneficiaries ({', '.join(TABLE_COLUMNS)})")
+    conn.execute("CREATE INDEX idx_grade ON beneficiaries (grade)")
+    report = {entry["name"]: entry for entry in index_planner.explain_workload(conn, "beneficiaries")}
+
+    # Sorting by an unindexed column scans the table and sorts it
+    assert report["sort_loan_amount"]["full_scan"]
+    assert report["sort_loan_amount"]["temp_b_tree"]
+    # The index finds the rows but the page order (by FICO score) still needs a sort
+    assert not report["filter_grade_fico"]["full_scan"]
+    assert report["filter_grade_fico"]["temp_b_tree"]
+    conn.close()
+
+
+def test_ingested_database_serves_every_keyset_page_from_an_index(api_database):
+    db_path = api_database(make_portfolio(list(range(1, 61))))
+    conn = sqlite3.connect(db_path)
+    report = index_planner.explain_workload(conn, "beneficiaries")
+    conn.close()
+
+    keyset_shapes = {shape["name"] for shape in index_planner.WORKLOAD if shape.get("keyset")}
+    assert keyset_shapes == {entry["name"] for entry in report if entry["name"] in keyset_shapes}
+    for entry in report:
+        assert entry["full_scan"] is False, entry
+        if entry["name"] in keyset_shapes:
+            assert entry["temp_b_tree"] is False, entry
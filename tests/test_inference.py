@@ -0,0 +1,65 @@
+"""Tests for inference.py: micro-batching of concurrent predictions."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import inference
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown()
+
+
+def run_concurrently(batcher, submissions):
+    async def main():
+        try:
+            return await asyncio.gather(*(batcher.submit(records) for records in submissions),
+                                        return_exceptions=True)
+        finally:
+            batcher.close()
+    return asyncio.run(main())
+
+
+def test_concurrent_submissions_share_one_scoring_call(executor):
+    calls = []
+
+    def score(records):
+        calls.append(len(records))
+        return np.array([record["x"] * 10.0 for record in records])
+
+    batcher = inference.MicroBatcher(score, executor, max_rows=64, max_wait=0.05)
+    submissions = [[{"x": 1}], [{"x": 2}, {"x": 3}], [{"x": 4}, {"x": 5}, {"x": 6}]]
+    results = run_concurrently(batcher, submissions)
+
+    assert calls == [6]
+    assert results == [[10.0], [20.0, 30.0], [40.0, 50.0, 60.0]]
+
+
+def test_batches_are_capped_at_max_rows(executor):
+    calls = []
+
+    def score(records):
+        calls.append(len(records))
+        return np.array([float(record["x"]) for record in records])
+
+    batcher = inference.MicroBatcher(score, executor, max_rows=2, max_wait=0.05)
+    results = run_concurrently(batcher, [[{"x": value}] for value in range(5)])
+
+    assert results == [[float(value)] for value in range(5)]
+    assert sum(calls) == 5 and max(calls) <= 2
+
+
+def test_scoring_errors_reach_every_submitter_in_the_batch(executor):
+    def score(records):
+        raise ValueError("model exploded")
+
+    batcher = inference.MicroBatcher(score, executor, max_wait=0.05)
+    results = run_concurrently(batcher, [[{"x": 1}], [{"x": 2}]])
+
+    assert all(isinstance(result, ValueError) and str(result) == "model exploded" for result in results)
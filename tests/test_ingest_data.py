@@ -0,0 +1,110 @@
+"""Tests for ingest_data.py: publishing the shadow database and incremental upserts."""
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ingest_data
+
+
+def make_beneficiaries(ids, months=3, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = len(ids) * months
+    return pd.DataFrame({
+        "id": np.repeat(ids, months),
+        "month_of_loan": np.tile(np.arange(1, months + 1), len(ids)),
+        "grade": rng.choice(list("ABCDEFG"), rows),
+        "purpose": rng.choice(["car", "credit_card", "education"], rows),
+        "home_ownership": rng.choice(["RENT", "OWN", "MORTGAGE"], rows),
+        "term": rng.choice([36, 60], rows),
+        "loan_amnt": rng.uniform(1000, 40000, rows).round(2),
+        "initial_fico_score": rng.integers(550, 850, rows),
+        "is_defaulted": rng.integers(0, 2, rows),
+        "int_rate": rng.uniform(5, 30, rows).round(2),
+        "annual_inc": rng.uniform(10000, 200000, rows).round(2),
+    })
+
+
+@pytest.fixture
+def ingest_paths(tmp_path, monkeypatch):
+    """Point ingestion at files inside a temporary directory."""
+    db_path = str(tmp_path / "siddhi_db.sqlite")
+    monkeypatch.setattr(ingest_data, "DB_FILE_PATH", db_path)
+    monkeypatch.setattr(ingest_data, "SHADOW_DB_FILE_PATH", db_path + ".shadow")
+    monkeypatch.setattr(ingest_data, "COLUMN_SNAPSHOT_DIR", str(tmp_path / "columns"))
+
+    def ingest(df, incremental=False):
+        csv_path = tmp_path / "input.csv"
+        df.to_csv(csv_path, index=False)
+        monkeypatch.setattr(ingest_data, "CSV_FILE_PATH", str(csv_path))
+        ingest_data.ingest_data(incremental=incremental)
+        return db_path
+
+    return ingest
+
+
+def test_reingest_with_open_reader_keeps_database_intact(ingest_paths):
+    db_path = ingest_paths(make_beneficiaries(range(400)))
+
+    # Uncheckpointed WAL frames plus a reader pinning the old snapshot
+    writer = sqlite3.connect(db_path)
+    writer.execute("PRAGMA wal_autocheckpoint=0")
+    writer.execute("CREATE TABLE only_in_old_db (value INTEGER)")
+    writer.commit()
+    reader = sqlite3.connect(db_path)
+    reader.execute("BEGIN")
+    assert reader.execute("SELECT COUNT(*) FROM beneficiaries").fetchone() == (1200,)
+
+    ingest_paths(make_beneficiaries(range(400), seed=1))
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+    assert conn.execute("SELECT COUNT(*) FROM beneficiaries").fetchone() == (1200,)
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'only_in_old_db'").fetchall() == []
+    # The open reader still sees its own consistent snapshot
+    assert reader.execute("SELECT COUNT(*) FROM beneficiaries").fetchone() == (1200,)
+    for connection in (conn, reader, writer):
+        connection.close()
+
+
+def test_incremental_ingest_rewrites_only_new_and_changed_rows(ingest_paths):
+    df = make_beneficiaries(range(100))
+    db_path = ingest_paths(df)
+
+    changed = df.copy()
+    changed.loc[changed.index[:5], "loan_amnt"] += 1.0
+    added = make_beneficiaries(range(100, 110), seed=2)
+    ingest_paths(pd.concat([changed, added], ignore_index=True), incremental=True)
+
+    conn = sqlite3.connect(db_path)
+    meta = dict(conn.execute("SELECT key, value FROM ingest_meta"))
+    assert meta["mode"] == "incremental"
+    assert meta["rows_written"] == str(5 + len(added))
+    assert conn.execute("SELECT COUNT(*) FROM beneficiaries").fetchone() == (len(df) + len(added),)
+
+    first = changed.iloc[0]
+    loan_amnt = conn.execute(
+        "SELECT loan_amnt FROM beneficiaries WHERE id = ? AND month_of_loan = ?",
+        (int(first["id"]), int(first["month_of_loan"]))
+    ).fetchone()[0]
+    assert loan_amnt == pytest.approx(first["loan_amnt"])
+    conn.close()
+
+
+def test_unchanged_rows_are_not_rewritten(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "upsert.sqlite"))
+    chunk = make_beneficiaries(range(20))
+    ingest_data.create_table(conn, chunk)
+    ingest_data.create_row_hashes_table(conn)
+    conn.execute("CREATE TEMP TABLE incoming_hashes (pos INTEGER, id INTEGER, month_of_loan INTEGER, row_hash INTEGER)")
+
+    assert ingest_data.upsert_changed_rows(conn, chunk) == len(chunk)
+    assert ingest_data.upsert_changed_rows(conn, chunk) == 0
+
+    edited = chunk.copy()
+    edited.loc[edited.index[3], "grade"] = "Z"
+    assert ingest_data.upsert_changed_rows(conn, edited) == 1
+    assert conn.execute("SELECT COUNT(*) FROM beneficiaries").fetchone() == (len(chunk),)
+    conn.close()
@@ -0,0 +1,376 @@
+"""Tests for the API endpoints and helpers in main.py."""
+
+import asyncio
+import io
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+from conftest import make_applications, make_portfolio
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+
+def test_handler_executor_restarts_after_shutdown():
+    executor = main.HandlerExecutor(2, "test")
+    assert executor.submit(lambda: 1).result() == 1
+
+    executor.shutdown()
+    assert executor.executor is None
+    # A second app lifespan keeps using the same object
+    assert executor.submit(lambda: 2).result() == 2
+    executor.shutdown()
+
+
+def test_run_in_survives_executor_shutdown():
+    executor = main.HandlerExecutor(1, "test")
+
+    @main.run_in(executor)
+    def handler(value):
+        return value * 2
+
+    assert asyncio.run(handler(2)) == 4
+    executor.shutdown()
+    assert asyncio.run(handler(3)) == 6
+    executor.shutdown()
+
+
+@pytest.mark.parametrize("sort_by, sort_value", [(None, None), ("loan_amnt", 12500.5), ("grade", "B")])
+def test_page_cursor_round_trip(sort_by, sort_value):
+    cursor = main.encode_page_cursor(sort_by, "desc", sort_value, 4242)
+    assert main.decode_page_cursor(cursor, sort_by, "desc") == (sort_value, 4242)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "", main.encode_page_cursor(None, "asc", None, 1)[:-3]])
+def test_invalid_page_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        main.decode_page_cursor(cursor, None, "asc")
+    assert error.value.status_code == 400
+
+
+def test_page_cursor_must_match_the_requested_order():
+    cursor = main.encode_page_cursor("loan_amnt", "asc", 1000.0, 7)
+    for sort_by, sort_order in (("loan_amnt", "desc"), ("int_rate", "asc"), (None, "asc")):
+        with pytest.raises(HTTPException) as error:
+            main.decode_page_cursor(cursor, sort_by, sort_order)
+        assert error.value.status_code == 400
+
+
+def test_id_prefix_ranges():
+    assert main.id_prefix_ranges("12", 1500) == [(12, 13), (120, 130), (1200, 1300)]
+    assert main.id_prefix_ranges("0", 1500) == [(0, 1)]
+    # Ids are stored without leading zeros
+    assert main.id_prefix_ranges("012", 1500) == []
+
+
+def test_response_cache_checks_existence_before_not_modified():
+    cache = main.ResponseCache()
+    etag = cache.etag()
+
+    def missing():
+        raise HTTPException(status_code=404, detail="not found")
+
+    for if_none_match in ("*", etag):
+        with pytest.raises(HTTPException) as error:
+            cache.respond(("beneficiary", -1), if_none_match, missing)
+        assert error.value.status_code == 404
+
+    response = cache.respond(("beneficiary", 1), None, lambda: {"id": 1})
+    assert response.status_code == 200 and response.headers["etag"] == etag
+    assert cache.respond(("beneficiary", 1), etag, missing).status_code == 304
+    assert cache.to_dict()["hits"] == 1
+
+
+def test_json_response_writes_non_finite_values_as_null(monkeypatch):
+    # The json fallback must produce the same strict JSON as orjson
+    monkeypatch.setattr(main, "orjson", None)
+    content = {"nan": float("nan"), "inf": np.float64("inf"), "values": np.array([1.5, np.nan]),
+               "count": np.int64(3), "pair": (1, -float("inf"))}
+    assert main.FastJSONResponse(content).body == (
+        b'{"nan":null,"inf":null,"values":[1.5,null],"count":3,"pair":[1,null]}'
+    )
+
+
+@pytest.fixture
+def portfolio(api_database):
+    df = make_portfolio(list(range(1, 41)), months=3)
+    api_database(df)
+    return df
+
+
+@pytest.mark.parametrize("sort_by", ["loan_amnt", "int_rate", "id", "month_of_loan", None])
+@pytest.mark.parametrize("sort_order", ["asc", "desc"])
+def test_beneficiaries_cursor_pages_cover_every_row_in_order(portfolio, sort_by, sort_order):
+    client = TestClient(main.app)
+    params = {"page_size": 25, "sort_order": sort_order, "fields": "id,month_of_loan,loan_amnt,int_rate"}
+    if sort_by:
+        params["sort_by"] = sort_by
+
+    rows, cursor, pages = [], None, 0
+    while True:
+        response = client.get("/beneficiaries", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        rows += body["data"]
+        pages += 1
+        cursor = body["pagination"]["next_cursor"]
+        if not body["pagination"]["has_next"]:
+            break
+
+    assert pages == 5 and cursor is None
+    keys = [(row["id"], row["month_of_loan"]) for row in rows]
+    assert sorted(keys) == sorted(zip(portfolio["id"], portfolio["month_of_loan"]))
+    if sort_by:
+        values = [row[sort_by] for row in rows]
+        assert values == sorted(values, reverse=sort_order == "desc")
+
+
+def test_beneficiaries_rejects_unknown_sort_column(portfolio):
+    response = TestClient(main.app).get("/beneficiaries", params={"sort_by": "no_such_column"})
+    assert response.status_code == 400
+
+
+def test_id_pages_and_timelines_use_their_own_indexes(portfolio):
+    conn = main.get_db_connection()
+    keyset_condition, order_clause = main.keyset_clauses("id", "asc")
+    page_plan = [row[3] for row in conn.execute(
+        f"EXPLAIN QUERY PLAN SELECT * FROM beneficiaries WHERE {keyset_condition}{order_clause} LIMIT 25", (1, 1)
+    )]
+    assert page_plan == ["SEARCH beneficiaries USING INDEX idx_id (id>?)"]
+
+    timeline_plan = [row[3] for row in conn.execute(
+        f"EXPLAIN QUERY PLAN SELECT month_of_loan, {', '.join(main.TIMELINE_COLUMNS)} FROM beneficiaries "
+        "WHERE id = ? ORDER BY month_of_loan", (1,)
+    )]
+    assert timeline_plan == ["SEARCH beneficiaries USING COVERING INDEX idx_timeline (id=?)"]
+
+
+@pytest.mark.parametrize("filters", [
+    {"credit_score_min": 600, "credit_score_max": 700},
+    {"grade": "B", "credit_score_min": 500},
+    {"loan_amnt_min": 20, "loan_amnt_max": 80},
+    {"purpose": "car", "is_defaulted": 0},
+])
+def test_filtered_cursor_pages_cover_every_match(portfolio, filters):
+    client = TestClient(main.app)
+    rows, cursor = [], None
+    while True:
+        response = client.post("/filter_beneficiaries", params={"page_size": 7, **({"cursor": cursor} if cursor else {})},
+                               json=filters)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        rows += body["data"]
+        cursor = body["pagination"]["next_cursor"]
+        if not body["pagination"]["has_next"]:
+            break
+
+    expected = portfolio
+    for name, value in filters.items():
+        column = {"credit_score_min": "initial_fico_score", "credit_score_max": "initial_fico_score",
+                  "loan_amnt_min": "loan_amnt", "loan_amnt_max": "loan_amnt"}.get(name, name)
+        if name.endswith("_min"):
+            expected = expected[expected[column] >= value]
+        elif name.endswith("_max"):
+            expected = expected[expected[column] <= value]
+        else:
+            expected = expected[expected[column] == value]
+    assert len(rows) == len(expected) == body["pagination"]["total_items"]
+    assert sorted((row["id"], row["month_of_loan"]) for row in rows) == sorted(zip(expected["id"], expected["month_of_loan"]))
+
+    sort_by = main.filter_sort_column(main.BeneficiaryFilter(**filters))
+    if sort_by:
+        values = [row[sort_by] for row in rows]
+        assert values == sorted(values)
+
+
+@pytest.mark.parametrize("query, search_mode", [
+    ("1", "id_prefix"),
+    ("23", "id_prefix"),
+    ("consolidation", "full_text"),
+    ("RENT", "full_text"),
+    ("ca", "scan"),
+    ("²", "scan"),
+])
+def test_search_modes_find_every_match(portfolio, query, search_mode):
+    client = TestClient(main.app)
+    if search_mode == "id_prefix":
+        matches = portfolio[portfolio["id"].astype(str).str.startswith(query)]
+    else:
+        text = portfolio[["purpose", "home_ownership", "grade"]].astype(str)
+        if search_mode == "scan":
+            text["id"] = portfolio["id"].astype(str)
+        matches = portfolio[text.apply(lambda col: col.str.contains(query, case=False, regex=False)).any(axis=1)]
+
+    response = client.get("/search_beneficiaries", params={"query": query, "page_size": 10, "fields": "id,month_of_loan"})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["search_mode"] == search_mode
+    assert body["total_matches"] == len(matches)
+    assert body["count"] == min(10, len(matches))
+    expected = set(zip(matches["id"], matches["month_of_loan"]))
+    assert all((row["id"], row["month_of_loan"]) in expected for row in body["results"])
+    assert all(set(row) == {"id", "month_of_loan"} for row in body["results"])
+
+
+def test_timeline_returns_the_history_in_month_order(api_database):
+    # Ingest the months out of order; the timeline must still come back sorted
+    df = make_portfolio([3, 7], months=4).sample(frac=1, random_state=1)
+    api_database(df)
+    history = df[df["id"] == 7].sort_values("month_of_loan")
+
+    response = TestClient(main.app).get("/beneficiary/7/timeline")
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["id"] == 7 and body["months"] == 4
+    assert body["columns"]["month_of_loan"] == history["month_of_loan"].tolist()
+    for column in main.TIMELINE_COLUMNS:
+        assert body["columns"][column] == pytest.approx(history[column].tolist())
+
+
+def test_timeline_of_an_unknown_beneficiary_is_404(portfolio):
+    assert TestClient(main.app).get("/beneficiary/999/timeline").status_code == 404
+
+
+def read_export(export_format, content):
+    if export_format == "ndjson":
+        return pd.read_json(io.BytesIO(content), lines=True)
+    if export_format == "csv":
+        return pd.read_csv(io.BytesIO(content))
+    return pyarrow.ipc.open_stream(content).read_all().to_pandas()
+
+
+@pytest.mark.parametrize("export_format", ["ndjson", "csv", "arrow"])
+def test_export_streams_every_filtered_row(portfolio, monkeypatch, export_format):
+    if export_format == "arrow" and pyarrow is None:
+        pytest.skip("pyarrow is not installed")
+    # Small batches so the stream spans several encoder calls
+    monkeypatch.setattr(main, "EXPORT_BATCH_SIZE", 4)
+    expected = portfolio[portfolio["grade"] == "B"].sort_values(["id", "month_of_loan"])
+
+    response = TestClient(main.app).post("/export_beneficiaries", params={"format": export_format}, json={"grade": "B"})
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith(main.export.EXPORT_FORMATS[export_format][0])
+    exported = read_export(export_format, response.content).sort_values(["id", "month_of_loan"])
+
+    assert len(expected) > 4
+    assert set(exported.columns) == set(main.get_table_columns())
+    assert exported["id"].tolist() == expected["id"].tolist()
+    assert exported["month_of_loan"].tolist() == expected["month_of_loan"].tolist()
+    assert exported["loan_amnt"].tolist() == pytest.approx(expected["loan_amnt"].tolist())
+    assert (exported["grade"] == "B").all()
+
+
+@pytest.fixture
+def sweep_release(portfolio, scoring_model, tmp_path, monkeypatch):
+    """Scores go to a temporary file; the sweep waits for the returned event before running."""
+    monkeypatch.setattr(main.risk_sweep, "RISK_SCORES_DB_FILE_PATH", str(tmp_path / "risk.sqlite"))
+    monkeypatch.setattr(main, "risk_sweep_job", main.RiskSweepJob())
+    release = threading.Event()
+    run_risk_sweep = main.run_risk_sweep
+
+    def held_sweep(progress=None):
+        assert release.wait(10)
+        return run_risk_sweep(progress=progress)
+
+    monkeypatch.setattr(main, "run_risk_sweep", held_sweep)
+    return release
+
+
+def test_risk_sweep_scores_the_latest_month_of_every_beneficiary(portfolio, sweep_release):
+    client = TestClient(main.app)
+    assert client.get("/risk_scores/top").status_code == 404
+
+    started = client.post("/risk_sweep")
+    assert started.status_code == 202 and started.json()["status"] == "running"
+    assert client.post("/risk_sweep").status_code == 409
+
+    sweep_release.set()
+    main.risk_sweep_job.thread.join(10)
+    status = client.get("/risk_sweep").json()
+    assert status["status"] == "completed", status["error"]
+    assert status["result"]["scored"] == portfolio["id"].nunique()
+
+    latest = portfolio.sort_values("month_of_loan").drop_duplicates("id", keep="last").set_index("id")
+    features = list(main.LoanApplicationInput.model_fields)
+    expected = main.predict_default_probabilities(main.encode_feature_frame(latest[features].copy()))
+    expected = dict(zip(latest.index, expected))
+
+    top = client.get("/risk_scores/top", params={"limit": 10}).json()
+    assert top["count"] == 10
+    scores = [row["score"] for row in top["data"]]
+    assert scores == sorted(scores, reverse=True)
+    assert scores[0] == pytest.approx(max(expected.values()))
+    for row in top["data"]:
+        assert row["month_of_loan"] == latest.loc[row["id"], "month_of_loan"]
+        assert row["score"] == pytest.approx(expected[row["id"]])
+        assert row["grade"] == latest.loc[row["id"], "grade"]
+
+    for level, count in status["result"]["risk_level_counts"].items():
+        rows = client.get("/risk_scores/top", params={"limit": 1000, "risk_level": level}).json()["data"]
+        assert len(rows) == count
+        assert all(row["risk_level"] == level for row in rows)
+
+
+def test_sensitivity_grid_matches_scoring_each_scenario(scoring_model):
+    record = make_applications(1, seed=8)[0]
+    ranges = [{"feature": "int_rate", "values": [6.5, 12.0, 24.5]},
+              {"feature": "term", "min": 36, "max": 60, "steps": 2}]
+    response = TestClient(main.app).post("/predict/sensitivity", json={"application": record, "ranges": ranges})
+    assert response.status_code == 200, response.text
+    body = response.json()
+
+    assert body["features"] == ["int_rate", "term"]
+    assert body["values"] == [[6.5, 12.0, 24.5], [36, 60]]
+    assert body["scenarios"] == 6
+    scenarios = [{**record, "int_rate": int_rate, "term": term} for int_rate in body["values"][0] for term in body["values"][1]]
+    expected = main.predict_default_probabilities(main.build_feature_frame([record] + scenarios)) * 100
+    assert body["base"]["prediction_probability"] == pytest.approx(expected[0], abs=0.01)
+    assert np.asarray(body["prediction_probability"]) == pytest.approx(expected[1:].reshape(3, 2), abs=0.01)
+    assert body["risk_level"] == main.risk_levels(expected[1:].reshape(3, 2) / 100).tolist()
+
+
+@pytest.mark.parametrize("ranges", [
+    [{"feature": "purpose", "values": [1, 2]}],
+    [{"feature": "not_a_feature", "values": [1, 2]}],
+    [{"feature": "int_rate", "values": [5]}, {"feature": "int_rate", "values": [6]}],
+    [{"feature": "int_rate", "min": 5}],
+])
+def test_sensitivity_rejects_invalid_ranges(scoring_model, ranges):
+    record = make_applications(1, seed=8)[0]
+    response = TestClient(main.app).post("/predict/sensitivity", json={"application": record, "ranges": ranges})
+    assert response.status_code == 400
+
+
+def test_etags_revalidate_until_the_next_ingest(api_database):
+    api_database(make_portfolio(list(range(1, 21)), months=2))
+    client = TestClient(main.app)
+
+    first = client.get("/kpi_summary")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.json()["overview"]["total_beneficiaries"] == 40
+
+    for path in ("/kpi_summary", "/beneficiary/5"):
+        revalidated = client.get(path, headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304 and revalidated.content == b""
+        assert revalidated.headers["ETag"] == etag
+    # Weak comparison: the strong form of the tag matches too
+    assert client.get("/kpi_summary", headers={"If-None-Match": etag.removeprefix("W/")}).status_code == 304
+    assert main.response_cache.to_dict()["not_modified"] == 3
+
+    api_database(make_portfolio(list(range(1, 31)), months=2, seed=1))
+    changed = client.get("/kpi_summary", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["overview"]["total_beneficiaries"] == 60
+    assert client.get("/beneficiary/5", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/beneficiary/5", headers={"If-None-Match": changed.headers["ETag"]}).status_code == 304
@@ -0,0 +1,56 @@
+"""Tests for model_registry.py: artifact round trips and tree-path contributions."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import inference
+import main
+import model_registry
+from conftest import make_applications
+
+
+@pytest.fixture
+def feature_frame(trained_model):
+    loaded, encoders = trained_model
+    df = pd.DataFrame.from_records(make_applications(50, seed=5))
+    for col, encoder in encoders.items():
+        df[col] = encoder.encode(df[col])
+    return df[loaded.feature_names]
+
+
+def test_contributions_sum_to_the_probability(trained_model, feature_frame):
+    loaded, _ = trained_model
+    explained = inference.explain_probabilities(loaded, feature_frame, chunk_size=16)
+
+    assert explained["method"] == "tree_path"
+    np.testing.assert_allclose(explained["probabilities"], loaded.model.predict_proba(feature_frame)[:, 1])
+    np.testing.assert_allclose(explained["bias"] + explained["contributions"].sum(axis=1),
+                               explained["probabilities"])
+
+
+def test_artifact_reproduces_predictions_and_contributions(trained_model, feature_frame, tmp_path):
+    loaded, _ = trained_model
+    artifact_dir = str(tmp_path / "artifact")
+    model_registry.export_artifact(loaded.model, artifact_dir, version="v1")
+    from_artifact = model_registry.load_model(artifact_dir, str(tmp_path / "missing.pkl"))
+
+    assert from_artifact.model_format == "tree_arrays" and from_artifact.version == "v1"
+    np.testing.assert_allclose(from_artifact.model.predict_proba(feature_frame),
+                               loaded.model.predict_proba(feature_frame))
+    bias, contributions = from_artifact.explainer.contributions(feature_frame)
+    expected_bias, expected = loaded.explainer.contributions(feature_frame)
+    assert bias == pytest.approx(expected_bias)
+    np.testing.assert_allclose(contributions, expected)
+
+
+def test_predict_ranks_factors_by_contribution(scoring_model):
+    record = make_applications(1, seed=6)[0]
+    response = TestClient(main.app).post("/predict", params={"explain": "contributions"}, json=record).json()
+
+    explained = inference.explain_probabilities(scoring_model, main.build_feature_frame([record]))
+    assert response["prediction_probability"] == pytest.approx(explained["probabilities"][0] * 100, abs=0.01)
+    sizes = [abs(factor["contribution"]) for factor in response["top_factors"]]
+    assert sizes == sorted(sizes, reverse=True)
+    assert sizes[0] == pytest.approx(np.abs(explained["contributions"][0]).max())
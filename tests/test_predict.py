@@ -0,0 +1,126 @@
+"""Tests for the prediction endpoints and helpers in main.py."""
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from conftest import make_applications, make_portfolio
+
+
+@pytest.fixture
+def client(scoring_model):
+    return TestClient(main.app)
+
+
+def test_encoding_does_not_depend_on_the_rest_of_the_batch(scoring_model):
+    records = make_applications(20, seed=3)
+    batch = main.build_feature_frame(records)
+    for row, record in enumerate(records):
+        single = main.build_feature_frame([record])
+        pd.testing.assert_frame_equal(single, batch.iloc[[row]].reset_index(drop=True))
+
+
+def test_batch_and_single_predictions_agree(client):
+    records = make_applications(8, seed=4)
+    batch = client.post("/predict/batch", json={"applications": records}).json()
+    for record, result in zip(records, batch["results"]):
+        single = client.post("/predict", json=record).json()
+        assert single["prediction_probability"] == result["prediction_probability"]
+        assert single["risk_level"] == result["risk_level"]
+
+
+def test_prediction_cache_evicts_least_recently_used():
+    cache = main.PredictionCache(max_size=2)
+    cache.put(("v1", "probability", b"a"), 0.1)
+    cache.put(("v1", "probability", b"b"), 0.2)
+    assert cache.get(("v1", "probability", b"a")) == 0.1
+
+    cache.put(("v1", "probability", b"c"), 0.3)
+    assert cache.get(("v1", "probability", b"b")) is None
+    assert cache.get(("v1", "probability", b"a")) == 0.1
+    assert cache.get(("v1", "probability", b"c")) == 0.3
+    assert cache.to_dict()["size"] == 2
+
+
+def test_prediction_cache_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(main.time, "time", lambda: now[0])
+    cache = main.PredictionCache(ttl=10.0)
+    key = ("v1", "probability", b"a")
+    cache.put(key, 0.5)
+
+    now[0] += 9.0
+    assert cache.get(key) == 0.5
+    now[0] += 2.0
+    assert cache.get(key) is None
+    assert cache.to_dict()["size"] == 0
+
+
+def test_prediction_cache_keys_on_model_version_and_encoded_features(scoring_model):
+    record = make_applications(1, seed=5)[0]
+    key = main.prediction_cache.make_key("v1", "probability", record)
+    assert main.prediction_cache.make_key("v1", "probability", dict(record)) == key
+    assert main.prediction_cache.make_key("v2", "probability", record) != key
+    assert main.prediction_cache.make_key("v1", "probability", {**record, "dti": record["dti"] + 1}) != key
+
+
+def test_repeated_predictions_are_served_from_the_cache(client):
+    record = make_applications(1, seed=6)[0]
+    first = client.post("/predict", json=record).json()
+    assert client.post("/predict", json=record).json() == first
+    stats = main.prediction_cache.to_dict()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_failed_model_load_is_retried_only_after_a_backoff(api_database, tmp_path, monkeypatch):
+    api_database(make_portfolio([1, 2, 3]))
+    started = []
+
+    class BrokenPool:
+        def __init__(self, artifact_dir, pickle_path, workers):
+            started.append(workers)
+
+        def start(self):
+            raise ValueError("artifact is corrupt")
+
+        def shutdown(self):
+            pass
+
+    now = [1000.0]
+    pickle_path = tmp_path / "credit_model.pkl"
+    pickle_path.write_bytes(b"not a pickle")
+    monkeypatch.setattr(main.time, "time", lambda: now[0])
+    monkeypatch.setattr(main.inference, "InferencePool", BrokenPool)
+    monkeypatch.setattr(main, "MODEL_PATH", str(pickle_path))
+    monkeypatch.setattr(main, "MODEL_ARTIFACT_DIR", str(tmp_path / "no_artifact"))
+    monkeypatch.setattr(main, "INFERENCE_WORKERS", 2)
+    for name in ("model_info", "loaded_model", "inference_pool", "model_load_error", "model_load_failed_at"):
+        monkeypatch.setattr(main, name, None)
+
+    client = TestClient(main.app)
+    record = make_applications(1)[0]
+    for _ in range(3):
+        response = client.post("/predict", json=record)
+        assert response.status_code == 503
+        assert "artifact is corrupt" in response.json()["detail"]
+    assert started == [2]
+    health = client.get("/health").json()
+    assert health["model"] is None
+    assert health["model_error"]["error"] == "artifact is corrupt"
+
+    now[0] += main.MODEL_LOAD_RETRY_SECONDS
+    assert client.post("/predict", json=record).status_code == 503
+    assert started == [2, 2]
+
+
+def test_prediction_cache_keys_fields_without_an_encoder(scoring_model, monkeypatch):
+    # Encoders built from a database that lacks the purpose column
+    encoders = {col: encoder for col, encoder in main.category_encoders.items() if col != "purpose"}
+    monkeypatch.setattr(main, "category_encoders", encoders)
+    record = make_applications(1, seed=7)[0]
+
+    key = main.prediction_cache.make_key("v1", "probability", record)
+    assert key is not None
+    assert main.prediction_cache.make_key("v1", "probability", dict(record)) == key
+    assert main.prediction_cache.make_key("v1", "probability", {**record, "purpose": "education_loan"}) != key